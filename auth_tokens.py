@@ -0,0 +1,234 @@
+"""
+Access Tokens
+
+This module handles:
+- Issuing signed JWT access tokens at login and registration
+- Verifying tokens presented as `Authorization: Bearer <token>`
+- Caching verified claims in a small LRU keyed by token
+- Revoking a user's earlier tokens when their password is reset
+
+Tokens carry the user's id, email and name, so authenticated requests
+never need to look the user up in the `users` table. Repeat requests with
+the same token skip signature verification too; cached claims are still
+checked against their expiry on every hit.
+
+Each token also carries the user's token version, which a password reset
+increments. The current versions are cached per user for
+TOKEN_VERSION_TTL_SECONDS. A reset handled by this process takes effect
+at once. One handled by another worker takes effect once the cached
+version expires.
+"""
+
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+from jose import JWTError, jwt
+
+load_dotenv()
+
+# Signing key; without one a random key is generated per process, which
+# invalidates tokens on restart and across workers
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = float(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+# Verified tokens whose claims are kept in memory
+TOKEN_CLAIMS_CACHE_SIZE = int(os.getenv("TOKEN_CLAIMS_CACHE_SIZE", "1024"))
+# How long a user's token version is trusted before it is read again; the
+# longest a token survives a password reset made through another worker
+TOKEN_VERSION_TTL_SECONDS = float(os.getenv("TOKEN_VERSION_TTL_SECONDS", "30"))
+
+# HMAC keys shorter than the SHA-256 output are brute-forceable (RFC 7518 3.2)
+MIN_SECRET_KEY_BYTES = 32
+# Example values from docs and templates, known to anyone
+PLACEHOLDER_SECRET_KEYS = {"change-me", "changeme", "secret", "your-secret-key"}
+
+
+class InvalidToken(Exception):
+    """Raised when a token is malformed, badly signed, expired or revoked."""
+
+
+class AccessTokens:
+    """
+    Issues and verifies access tokens.
+
+    Handles:
+    - Signing tokens with JWT_SECRET_KEY
+    - Verifying signatures and expiry
+    - An LRU cache of verified claims, bounded to `cache_size` tokens
+    - Rejecting tokens issued before the user's current token version
+    """
+
+    def __init__(
+        self,
+        secret_key: str = JWT_SECRET_KEY,
+        algorithm: str = JWT_ALGORITHM,
+        expire_minutes: float = ACCESS_TOKEN_EXPIRE_MINUTES,
+        cache_size: int = TOKEN_CLAIMS_CACHE_SIZE,
+        version_ttl: float = TOKEN_VERSION_TTL_SECONDS,
+    ):
+        """
+        Raises:
+            ValueError: If the key is a well-known placeholder, or shorter
+                than MIN_SECRET_KEY_BYTES for an HMAC algorithm
+        """
+        if not secret_key:
+            print("[WARNING] JWT_SECRET_KEY not set, access tokens will not survive a restart")
+            secret_key = secrets.token_urlsafe(32)
+        elif secret_key.lower() in PLACEHOLDER_SECRET_KEYS:
+            raise ValueError(
+                "JWT_SECRET_KEY is a placeholder value; set a random key "
+                "(e.g. python -c \"import secrets; print(secrets.token_urlsafe(32))\")"
+            )
+        elif algorithm.startswith("HS") and len(secret_key.encode()) < MIN_SECRET_KEY_BYTES:
+            raise ValueError(f"JWT_SECRET_KEY must be at least {MIN_SECRET_KEY_BYTES} bytes")
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.expire_seconds = int(expire_minutes * 60)
+        self.cache_size = cache_size
+        self.version_ttl = version_ttl
+        # token -> verified claims, least recently used first
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        # user id -> (token version, monotonic time it stops being trusted)
+        self._versions: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()
+
+        # Counters
+        self.issued = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rejected = 0
+
+    def issue(self, user_id: int, email: str, name: Optional[str], version: int = 0) -> str:
+        """
+        Create a signed access token for a user.
+
+        Args:
+            user_id: User's primary key
+            email: User's email address (the token subject)
+            name: User's display name
+            version: User's current token version
+
+        Returns:
+            str: Encoded JWT
+        """
+        now = int(time.time())
+        claims = {
+            "sub": email,
+            "uid": user_id,
+            "name": name,
+            "ver": version,
+            "iat": now,
+            "exp": now + self.expire_seconds,
+        }
+        self.remember_version(user_id, version)
+        self.issued += 1
+        return jwt.encode(claims, self.secret_key, algorithm=self.algorithm)
+
+    def verify(self, token: str) -> dict:
+        """
+        Verify a token, using the claims cache when possible.
+
+        Args:
+            token: Encoded JWT
+
+        Returns:
+            dict: Verified claims (sub, uid, name, iat, exp)
+
+        Raises:
+            InvalidToken: If the token is malformed, badly signed or expired
+        """
+        claims = self._cache.get(token)
+        if claims is not None:
+            if claims["exp"] > time.time():
+                self._cache.move_to_end(token)
+                self.cache_hits += 1
+                return claims
+            del self._cache[token]
+
+        self.cache_misses += 1
+        try:
+            claims = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except JWTError as e:
+            self.rejected += 1
+            raise InvalidToken(str(e))
+        if "sub" not in claims or "exp" not in claims:
+            self.rejected += 1
+            raise InvalidToken("Token is missing required claims")
+
+        if self.cache_size > 0:
+            self._cache[token] = claims
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+    def known_version(self, user_id: int) -> Optional[int]:
+        """
+        A user's cached token version.
+
+        Args:
+            user_id: User's primary key
+
+        Returns:
+            Optional[int]: The version, or None if it must be read from the database
+        """
+        entry = self._versions.get(user_id)
+        if entry is None:
+            return None
+        version, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._versions[user_id]
+            return None
+        self._versions.move_to_end(user_id)
+        return version
+
+    def remember_version(self, user_id: int, version: int):
+        """
+        Cache a user's current token version.
+
+        Args:
+            user_id: User's primary key
+            version: Current token version (from the users table)
+        """
+        self._versions[user_id] = (version, time.monotonic() + self.version_ttl)
+        self._versions.move_to_end(user_id)
+        if len(self._versions) > max(self.cache_size, 1):
+            self._versions.popitem(last=False)
+
+    def check_version(self, claims: dict, version: int):
+        """
+        Reject a token issued before the user's current token version.
+
+        Args:
+            claims: Verified claims
+            version: User's current token version
+
+        Raises:
+            InvalidToken: If the token has been revoked
+        """
+        if claims.get("ver", 0) != version:
+            self.rejected += 1
+            raise InvalidToken("Token has been revoked")
+
+    def stats(self) -> dict:
+        """
+        Get token counters.
+
+        Returns:
+            dict: Tokens issued, cache hits and misses, and rejected tokens
+        """
+        return {
+            "issued": self.issued,
+            "cache_size": len(self._cache),
+            "cache_capacity": self.cache_size,
+            "versions_cached": len(self._versions),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "rejected": self.rejected,
+        }
+
+
+# Shared token issuer/verifier used by the auth endpoints
+access_tokens = AccessTokens()
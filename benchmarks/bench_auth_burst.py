@@ -0,0 +1,150 @@
+"""
+Login Burst Benchmark
+
+Fires a burst of concurrent logins and, at the same time, polls non-auth
+endpoints (available slots and health) and samples event-loop lag to
+measure how much the burst slows everything else down:
+- inline: Argon2 runs on the event loop (PASSWORD_HASH_WORKERS=0)
+- pool: Argon2 runs on the password hashing process pool
+
+Usage:
+    python benchmarks/bench_auth_burst.py --logins 100 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def percentiles(samples):
+    """Summarize latency samples in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+async def probe(client, url: str, stop: asyncio.Event, samples: list):
+    """Request a URL in a loop and record its latency, in milliseconds."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(url)
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def measure_loop_lag(stop: asyncio.Event, samples: list, tick: float = 0.01):
+    """Record how late each short sleep wakes up, in milliseconds."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(tick)
+        samples.append((loop.time() - start - tick) * 1000)
+
+
+async def login_burst(client, logins: int, concurrency: int, samples: list, statuses: dict):
+    """Run the logins with at most `concurrency` in flight."""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with limit:
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/auth/login",
+                json={"email": "bench@example.com", "password": "benchmark-password"},
+            )
+            samples.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def run_scenario(app_module, client, hasher, args):
+    """Run one login burst with the given hasher and measure everything."""
+    await hasher.start()
+    app_module.password_hasher = hasher
+    slots_date = date.today() + timedelta(days=1)
+    while slots_date.weekday() >= 5:
+        slots_date += timedelta(days=1)
+
+    stop = asyncio.Event()
+    slots, health, lag, logins, statuses = [], [], [], [], {}
+    probes = [
+        asyncio.create_task(measure_loop_lag(stop, lag)),
+        asyncio.create_task(probe(client, f"/api/available-slots?date={slots_date}", stop, slots)),
+        asyncio.create_task(probe(client, "/api/health", stop, health)),
+    ]
+    start = time.perf_counter()
+    await login_burst(client, args.logins, args.concurrency, logins, statuses)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*probes)
+    await hasher.shutdown()
+
+    return {
+        "seconds": round(elapsed, 3),
+        "login_statuses": statuses,
+        "login_latency_ms": percentiles(logins),
+        "available_slots_latency_ms": percentiles(slots),
+        "health_latency_ms": percentiles(health),
+        "event_loop_lag_ms": percentiles(lag),
+    }
+
+
+async def main(args):
+    import httpx
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as app_module
+        from password_hashing import PasswordHasher
+
+    app = app_module.app
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post(
+                "/api/auth/register",
+                json={
+                    "name": "Benchmark User",
+                    "email": "bench@example.com",
+                    "password": "benchmark-password",
+                },
+            )
+            scenarios = {
+                "inline": PasswordHasher(workers=0),
+                "pool": PasswordHasher(workers=args.workers),
+            }
+            for name, hasher in scenarios.items():
+                results[name] = await run_scenario(app_module, client, hasher, args)
+
+    print(
+        json.dumps(
+            {"cpus": os.cpu_count(), "workers": args.workers, "results": results}, indent=2
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure non-auth endpoint latency during a login burst"
+    )
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=min(2, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    database = Path(tempfile.mkdtemp()) / "bench_auth.db"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{database}"
+    asyncio.run(main(args))
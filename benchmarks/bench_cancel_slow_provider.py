@@ -0,0 +1,200 @@
+"""
+Cancellation Under a Slow Email Provider
+
+Cancels a batch of appointments while the mock Resend server answers
+slowly, and measures how responsive the event loop stays:
+- blocking_send: the cancellation email is sent inline with a blocking
+  POST, as the cancel endpoint used to do
+- outbox: the current endpoint, which queues the email in the outbox
+
+A probe task sleeps in short ticks and records how late each tick wakes
+up (event-loop lag), while a second task polls /api/health to measure
+the latency other requests see during the cancellations.
+
+Usage:
+    python benchmarks/bench_cancel_slow_provider.py --appointments 20 --latency-ms 1500
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_resend_server import MockResendServer
+
+
+def start_mock_server(latency_ms: float) -> MockResendServer:
+    """
+    Run the mock provider on its own loop and thread.
+
+    The blocking scenario stalls the app's loop, so the provider must not
+    share it.
+    """
+    server = MockResendServer(latency_ms=latency_ms)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return server
+
+
+def percentiles(samples):
+    """Summarize latency samples in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "p50": round(statistics.median(ordered), 2),
+        "p95": round(pick(0.95), 2),
+        "p99": round(pick(0.99), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+async def measure_loop_lag(stop: asyncio.Event, samples: list, tick: float = 0.01):
+    """Record how late each short sleep wakes up, in milliseconds."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(tick)
+        samples.append((loop.time() - start - tick) * 1000)
+
+
+async def probe_health(client, stop: asyncio.Event, samples: list):
+    """Poll the health endpoint and record its latency, in milliseconds."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/health")
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def seed_appointments(count: int, offset: int):
+    """Insert confirmed appointments directly, one per hour slot."""
+    from database import AsyncSessionLocal
+    from models import Appointment
+
+    base = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    async with AsyncSessionLocal() as session:
+        appointments = [
+            Appointment(
+                client_name=f"Client {i}",
+                client_email=f"client{i}@example.com",
+                appointment_time=base + timedelta(days=1 + i // 8, hours=9 + i % 8),
+                status="confirmed",
+            )
+            for i in range(offset, offset + count)
+        ]
+        session.add_all(appointments)
+        await session.commit()
+        return [appointment.id for appointment in appointments]
+
+
+async def run_scenario(name, client, email_service, appointment_ids):
+    """Cancel every appointment sequentially while probing loop latency."""
+    stop = asyncio.Event()
+    lag, health = [], []
+    probes = [
+        asyncio.create_task(measure_loop_lag(stop, lag)),
+        asyncio.create_task(probe_health(client, stop, health)),
+    ]
+    cancel_latency = []
+
+    start = time.perf_counter()
+    for appointment_id in appointment_ids:
+        request_start = time.perf_counter()
+        response = await client.put(
+            f"/api/appointments/{appointment_id}/cancel",
+            json={"cancellation_reason": "Benchmark"},
+        )
+        if name == "blocking_send":
+            # What the endpoint used to do before responding
+            message = email_service.build_appointment_cancellation_email(
+                client_email=f"client{appointment_id}@example.com",
+                client_name="Client",
+                appointment_time=datetime.now(),
+                cancellation_reason="Benchmark",
+            )
+            httpx.post(
+                email_service.RESEND_API_URL,
+                json=email_service._resend_payload(**message),
+                headers={"Authorization": f"Bearer {email_service.RESEND_API_KEY}"},
+                timeout=10,
+            )
+        response.raise_for_status()
+        cancel_latency.append((time.perf_counter() - request_start) * 1000)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await asyncio.gather(*probes)
+    return {
+        "cancellations": len(appointment_ids),
+        "seconds": round(elapsed, 3),
+        "cancel_latency_ms": percentiles(cancel_latency),
+        "event_loop_lag_ms": percentiles(lag),
+        "health_latency_ms": percentiles(health),
+    }
+
+
+async def main(args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        import email_service
+        import main as app_module
+
+    app = app_module.app
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for index, name in enumerate(("blocking_send", "outbox")):
+                ids = await seed_appointments(args.appointments, index * args.appointments)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results[name] = await run_scenario(name, client, email_service, ids)
+
+            # Let the dispatcher drain before reporting what it delivered
+            deadline = time.perf_counter() + args.drain_timeout
+            while (
+                app_module.outbox_dispatcher.stats()["sent"] < args.appointments
+                and time.perf_counter() < deadline
+            ):
+                await asyncio.sleep(0.1)
+            results["outbox"]["emails_delivered"] = app_module.outbox_dispatcher.stats()["sent"]
+
+    print(json.dumps({"latency_ms": args.latency_ms, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure cancellation latency while the email provider is slow"
+    )
+    parser.add_argument("--appointments", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=1500)
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    provider = start_mock_server(args.latency_ms)
+    database = Path(tempfile.mkdtemp()) / "bench_cancel.db"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{database}"
+    os.environ["RESEND_API_URL"] = f"{provider.url}/emails"
+    os.environ["RESEND_API_KEY"] = "benchmark"
+    asyncio.run(main(args))
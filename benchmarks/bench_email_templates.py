@@ -0,0 +1,95 @@
+"""
+Email Template Rendering Benchmark
+
+Compares rendering the appointment confirmation email with:
+- inline: the original per-call f-string (HTML only)
+- templates: the template functions from email_templates.py (HTML + text)
+
+Usage:
+    python benchmarks/bench_email_templates.py --iterations 50000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import email_service
+
+
+def inline_confirmation(client_email, client_name, appointment_time, notes=None):
+    """The confirmation email as it was rendered before email_templates.py."""
+    formatted_time = appointment_time.strftime('%B %d, %Y at %I:%M %p')
+    notes_section = f"<li><strong>Special Requests/Notes:</strong> {notes}</li>" if notes else ""
+    html_body = f"""
+<html>
+<body style="font-family: Arial, sans-serif; color: #333;">
+<h2>🌾 Appointment Confirmation - EcoHarvest Farm</h2>
+
+<p>Dear {client_name},</p>
+
+<p>Thank you for booking a consultation with EcoHarvest Farm!</p>
+
+<h3>Appointment Details:</h3>
+<ul>
+<li><strong>Date & Time:</strong> {formatted_time}</li>
+<li><strong>Duration:</strong> 1 Hour</li>
+<li><strong>Status:</strong> Confirmed</li>
+<li><strong>Client Email:</strong> {client_email}</li>
+{notes_section}
+</ul>
+
+<h3>Important Information:</h3>
+<ul>
+<li>Please arrive 5 minutes early</li>
+<li>If you need to reschedule, contact us at least 24 hours in advance</li>
+<li>20% cancellation fee applies for client-initiated cancellations</li>
+</ul>
+
+<p>We look forward to discussing your farming consultation needs!</p>
+
+<p>Best regards,<br>EcoHarvest Farm Team<br>🌾 Sustainable Farming Consultation Services</p>
+</body>
+</html>
+        """
+    return {
+        "to": client_email,
+        "subject": "🌾 Appointment Confirmation - EcoHarvest Farm",
+        "html": html_body,
+    }
+
+
+def main(args):
+    appointment_time = datetime(2030, 1, 15, 10, 0)
+    scenarios = {
+        "inline": lambda: inline_confirmation(
+            "client@example.com", "Client Name", appointment_time, "First visit"
+        ),
+        "templates": lambda: email_service.build_appointment_confirmation_email(
+            "client@example.com", "Client Name", appointment_time, "First visit"
+        ),
+    }
+
+    results = {}
+    for name, render in scenarios.items():
+        best = min(timeit.repeat(render, number=args.iterations, repeat=args.repeat))
+        results[name] = {
+            "microseconds_per_render": round(best / args.iterations * 1e6, 2),
+            "renders_per_second": round(args.iterations / best),
+        }
+
+    print(json.dumps({"iterations": args.iterations, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark email template rendering")
+    parser.add_argument("--iterations", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
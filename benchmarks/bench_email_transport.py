@@ -0,0 +1,125 @@
+"""
+Email Transport Benchmark
+
+Sends a burst of confirmation emails to the local mock Resend server and
+compares:
+- legacy: a blocking POST per email on a 2-thread executor, as the
+  removed send_email_via_resend did
+- pooled: the async ResendTransport with a shared keep-alive pool
+
+Usage:
+    python benchmarks/bench_email_transport.py --emails 300 --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_resend_server import MockResendServer
+
+
+def blocking_send(email_service, message: dict) -> bool:
+    """POST one email on a new connection, like the removed send_email_via_resend."""
+    response = httpx.post(
+        email_service.RESEND_API_URL,
+        json=email_service._resend_payload(**message),
+        headers={"Authorization": f"Bearer {email_service.RESEND_API_KEY}"},
+        timeout=10,
+    )
+    return response.status_code in (200, 201)
+
+
+async def run_legacy(email_service, messages):
+    """Send with blocking POSTs on a 2-worker thread pool, like the old email_executor."""
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    executor, lambda m=message: blocking_send(email_service, m)
+                )
+                for message in messages
+            )
+        )
+    return sum(results)
+
+
+async def run_pooled(email_service, messages, concurrency, rate_limit):
+    """Send via the shared async transport."""
+    transport = email_service.ResendTransport(
+        max_connections=concurrency,
+        max_concurrency=concurrency,
+        rate_limit=rate_limit,
+        max_pending=len(messages),
+    )
+    try:
+        results = await asyncio.gather(
+            *(transport.send(**message) for message in messages)
+        )
+    finally:
+        await transport.aclose()
+    return sum(results)
+
+
+async def main(args):
+    server = MockResendServer(latency_ms=args.latency_ms)
+    await server.start()
+    os.environ["RESEND_API_URL"] = f"{server.url}/emails"
+    os.environ["RESEND_API_KEY"] = "benchmark"
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import email_service
+
+    appointment_time = datetime.now() + timedelta(days=1)
+    messages = [
+        email_service.build_appointment_confirmation_email(
+            f"client{i}@example.com", f"Client {i}", appointment_time
+        )
+        for i in range(args.emails)
+    ]
+
+    results = {}
+    scenarios = [("pooled", lambda: run_pooled(email_service, messages, args.concurrency, args.rate_limit))]
+    if not args.skip_legacy:
+        scenarios.insert(0, ("legacy", lambda: run_legacy(email_service, messages)))
+
+    for name, scenario in scenarios:
+        connections_before = server.connections
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            delivered = await scenario()
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "emails": args.emails,
+            "delivered": delivered,
+            "seconds": round(elapsed, 3),
+            "emails_per_second": round(args.emails / elapsed, 1),
+            "tcp_connections": server.connections - connections_before,
+        }
+
+    await server.stop()
+    print(json.dumps({"latency_ms": args.latency_ms, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Resend email transport")
+    parser.add_argument("--emails", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--rate-limit", type=float, default=0, help="Requests per second (0 = unlimited)"
+    )
+    parser.add_argument("--skip-legacy", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Reminder Scheduler Benchmark
+
+Schedules reminders for a large number of appointments in memory (no
+database) and reports:
+- memory used by the heap and appointment registry
+- schedule, unschedule and pop throughput
+
+Usage:
+    python benchmarks/bench_reminders.py --appointments 300000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from reminders import ReminderScheduler
+
+
+async def main(args):
+    scheduler = ReminderScheduler(horizon_hours=args.horizon_hours)
+    now = datetime.now()
+    # Pretend the initial load already covered the horizon
+    scheduler._loaded_until = int(now.timestamp()) + scheduler.horizon
+    appointment_times = [
+        now + timedelta(seconds=random.randint(2 * 3600, int(args.horizon_hours * 3600)))
+        for _ in range(args.appointments)
+    ]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for appointment_id, appointment_time in enumerate(appointment_times, start=1):
+        await scheduler.schedule(appointment_id, appointment_time)
+    schedule_seconds = time.perf_counter() - start
+    memory_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    reminders = len(scheduler._heap)
+
+    cancelled = random.sample(range(1, args.appointments + 1), args.appointments // 10)
+    start = time.perf_counter()
+    for appointment_id in cancelled:
+        await scheduler.unschedule(appointment_id)
+    unschedule_seconds = time.perf_counter() - start
+
+    scheduler.batch_size = reminders
+    start = time.perf_counter()
+    due = scheduler.pop_due(int(now.timestamp()) + scheduler.horizon)
+    pop_seconds = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "appointments": args.appointments,
+                "reminders": reminders,
+                "memory_mb": round(memory_bytes / 1e6, 1),
+                "bytes_per_reminder": round(memory_bytes / reminders, 1),
+                "schedule_per_second": round(args.appointments / schedule_seconds),
+                "unschedule_per_second": round(len(cancelled) / unschedule_seconds),
+                "reminders_popped": len(due),
+                "pop_per_second": round(reminders / pop_seconds),  # including stale entries
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the reminder scheduler")
+    parser.add_argument("--appointments", type=int, default=300000)
+    parser.add_argument("--horizon-hours", type=float, default=48)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,161 @@
+"""
+Service Scaling Benchmark
+
+Generates a synthetic dataset (see generate_dataset.py) at each size and
+times the read paths of services.py against it:
+- AvailabilityService.check_availability on random upcoming slots
+- AvailabilityService.get_available_slots for random days in the window
+- AppointmentService.get_calendar_view (loads every appointment)
+- NotificationService.get_all_notifications (loads every notification)
+
+Each size runs in its own process against a fresh database file, so the
+engine and memory use start clean. Methods that load whole tables are
+repeated until --min-seconds have passed (at least once), and each size
+reports the process's peak memory.
+
+Usage:
+    python benchmarks/bench_services.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def summarize(samples):
+    """Summarize call durations in milliseconds."""
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+    return {
+        "calls": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": pick(0.5),
+        "p95": pick(0.95),
+    }
+
+
+async def timed(call, session_factory, repeats: int = None, min_seconds: float = 0) -> list:
+    """
+    Time `call(session)` `repeats` times, or until `min_seconds` have passed.
+
+    Every call gets a fresh session, so loaded rows aren't kept around.
+    """
+    samples = []
+    began = time.perf_counter()
+    while True:
+        async with session_factory() as session:
+            start = time.perf_counter()
+            await call(session)
+            samples.append((time.perf_counter() - start) * 1000)
+        if repeats is not None and len(samples) >= repeats:
+            return samples
+        if repeats is None and time.perf_counter() - began >= min_seconds:
+            return samples
+
+
+async def run_size(size: int, args) -> dict:
+    """Generate a dataset of `size` appointments and time the services on it."""
+    from generate_dataset import generate
+
+    counts = await generate(size, seed=args.seed)
+
+    from database import ReadSessionLocal, engine
+    from services import AppointmentService, AvailabilityService, NotificationService
+
+    availability = AvailabilityService()
+    appointments = AppointmentService()
+    notifications = NotificationService()
+
+    rng = random.Random(args.seed)
+    today = date.today()
+    window = [
+        today + timedelta(days=offset)
+        for offset in range(1, 31)
+        if (today + timedelta(days=offset)).weekday() < 5
+    ]
+    slots = [rng.choice(list(availability._slot_times(rng.choice(window)))) for _ in range(args.checks)]
+    days = [rng.choice(window) for _ in range(args.days)]
+
+    check_calls = iter(slots)
+    day_calls = iter(days)
+    results = {
+        "dataset": counts,
+        "check_availability_ms": summarize(
+            await timed(
+                lambda session: availability.check_availability(next(check_calls), session),
+                ReadSessionLocal,
+                repeats=len(slots),
+            )
+        ),
+        "get_available_slots_ms": summarize(
+            await timed(
+                lambda session: availability.get_available_slots(next(day_calls), session),
+                ReadSessionLocal,
+                repeats=len(days),
+            )
+        ),
+        "get_calendar_view_ms": summarize(
+            await timed(appointments.get_calendar_view, ReadSessionLocal, min_seconds=args.min_seconds)
+        ),
+        "get_all_notifications_ms": summarize(
+            await timed(
+                notifications.get_all_notifications, ReadSessionLocal, min_seconds=args.min_seconds
+            )
+        ),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    await engine.dispose()
+    return results
+
+
+def run_child(size: int, args) -> dict:
+    """Run one size in a fresh process against a fresh database file."""
+    database = Path(tempfile.mkdtemp()) / "bench_services.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite+aiosqlite:///{database}"}
+    output = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--child", str(size),
+            "--checks", str(args.checks),
+            "--days", str(args.days),
+            "--min-seconds", str(args.min_seconds),
+            "--seed", str(args.seed),
+        ],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time service methods at several dataset sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--checks", type=int, default=200, help="check_availability calls")
+    parser.add_argument("--days", type=int, default=20, help="get_available_slots calls")
+    parser.add_argument(
+        "--min-seconds", type=float, default=2, help="time to repeat whole-table methods for"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_size(args.child, args))))
+    else:
+        results = {str(size): run_child(size, args) for size in args.sizes}
+        print(json.dumps(results, indent=2))
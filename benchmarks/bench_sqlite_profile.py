@@ -0,0 +1,226 @@
+"""
+SQLite Profile Benchmark
+
+Runs the same workload against a fresh database file under each
+scenario, each in its own process so the engine is created with that
+scenario's settings:
+- default: SQLite's defaults (rollback journal, synchronous=FULL, no mmap)
+- performance: WAL, synchronous=NORMAL, mmap, larger cache, busy timeout
+- *_group_commit: the same profile with BOOKING_GROUP_COMMIT=true
+
+The workload, through the full app:
+- bookings: concurrent POST /api/appointments on distinct slots
+- mixed: readers polling available slots and the appointment list while
+  bookings continue
+
+Confirmation emails go to the mock Resend server, so the outbox
+dispatcher's writes are part of the load. Requests failing with
+"database is locked" show up as 500 statuses.
+
+Usage:
+    python benchmarks/bench_sqlite_profile.py --bookings 300 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_resend_server import MockResendServer
+
+SCENARIOS = {
+    "default": {"SQLITE_PROFILE": "default"},
+    "default_group_commit": {"SQLITE_PROFILE": "default", "BOOKING_GROUP_COMMIT": "true"},
+    "performance": {"SQLITE_PROFILE": "performance"},
+    "performance_group_commit": {
+        "SQLITE_PROFILE": "performance",
+        "BOOKING_GROUP_COMMIT": "true",
+    },
+}
+
+
+def start_mock_server() -> MockResendServer:
+    """Run the mock provider on its own loop and thread."""
+    server = MockResendServer()
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return server
+
+
+def percentiles(samples):
+    """Summarize latency samples in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def booking_slots(availability_service, count: int):
+    """Yield `count` bookable slot start times on upcoming weekdays."""
+    day = date.today() + timedelta(days=1)
+    produced = 0
+    while produced < count:
+        if day.weekday() < 5:
+            for slot in availability_service._slot_times(day):
+                yield slot
+                produced += 1
+                if produced == count:
+                    return
+        day += timedelta(days=1)
+
+
+async def book(client, slots, concurrency: int, samples: list, statuses: dict):
+    """Book every slot with at most `concurrency` requests in flight."""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(index, slot):
+        async with limit:
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/appointments",
+                json={
+                    "client_name": f"Bench Client {index}",
+                    "client_email": f"client{index}@example.com",
+                    "client_phone": "+1234567890",
+                    "appointment_time": slot.isoformat(),
+                },
+            )
+            samples.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(one(index, slot) for index, slot in enumerate(slots)))
+
+
+async def read_loop(client, urls, stop: asyncio.Event, samples: list):
+    """Request the URLs round-robin until stopped, recording latency."""
+    index = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(urls[index % len(urls)])
+        samples.append((time.perf_counter() - start) * 1000)
+        index += 1
+
+
+async def run_profile(args) -> dict:
+    """Run the workload in this process under the current environment."""
+    import httpx
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as app_module
+        from database import sqlite_pragmas
+
+    app = app_module.app
+    slots = list(booking_slots(app_module.availability_service, args.bookings * 2))
+    read_urls = [f"/api/available-slots?date={slot.date()}" for slot in slots[:: len(slots) // 10]]
+    read_urls.append("/api/appointments")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        async with app.router.lifespan_context(app):
+            # Count "database is locked" failures as 500s instead of raising
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                # Bookings alone
+                booking_ms, booking_statuses = [], {}
+                start = time.perf_counter()
+                await book(
+                    client, slots[: args.bookings], args.concurrency, booking_ms, booking_statuses
+                )
+                booking_seconds = time.perf_counter() - start
+
+                # Bookings with concurrent readers
+                stop = asyncio.Event()
+                read_ms, mixed_ms, mixed_statuses = [], [], {}
+                readers = [
+                    asyncio.create_task(read_loop(client, read_urls, stop, read_ms))
+                    for _ in range(args.readers)
+                ]
+                start = time.perf_counter()
+                await book(
+                    client, slots[args.bookings :], args.concurrency, mixed_ms, mixed_statuses
+                )
+                mixed_seconds = time.perf_counter() - start
+                stop.set()
+                await asyncio.gather(*readers)
+
+    return {
+        "pragmas": sqlite_pragmas(),
+        "group_commit": app_module.booking_committer.stats(),
+        "bookings": {
+            "per_second": round(len(booking_ms) / booking_seconds, 1),
+            "statuses": booking_statuses,
+            "latency_ms": percentiles(booking_ms),
+        },
+        "mixed": {
+            "bookings_per_second": round(len(mixed_ms) / mixed_seconds, 1),
+            "reads_per_second": round(len(read_ms) / mixed_seconds, 1),
+            "statuses": mixed_statuses,
+            "booking_latency_ms": percentiles(mixed_ms),
+            "read_latency_ms": percentiles(read_ms),
+        },
+    }
+
+
+def run_child(settings: dict, args) -> dict:
+    """Run one scenario in a fresh process against a fresh database file."""
+    database = Path(tempfile.mkdtemp()) / "bench_sqlite.db"
+    env = {
+        **os.environ,
+        **settings,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{database}",
+    }
+    output = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--child",
+            "--bookings", str(args.bookings),
+            "--concurrency", str(args.concurrency),
+            "--readers", str(args.readers),
+        ],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare booking and read throughput across SQLite settings"
+    )
+    parser.add_argument("--bookings", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        provider = start_mock_server()
+        os.environ["RESEND_API_URL"] = f"{provider.url}/emails"
+        os.environ["RESEND_API_KEY"] = "benchmark"
+        os.environ["RESEND_RATE_LIMIT_PER_SECOND"] = "0"
+        print(json.dumps(asyncio.run(run_profile(args))))
+    else:
+        results = {name: run_child(settings, args) for name, settings in SCENARIOS.items()}
+        print(json.dumps(results, indent=2))
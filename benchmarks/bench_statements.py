@@ -0,0 +1,158 @@
+"""
+Statement Overhead Micro-Benchmark
+
+Measures the per-call cost of the appointment-by-id lookup written three
+ways:
+- rebuilt: select(...).where(Appointment.id == value) built on every call,
+  as the services used to do
+- lambda: the same query as a lambda_stmt
+- prebuilt: services.APPOINTMENT_BY_ID, built once with a bindparam
+
+For each it reports the Python-side preparation cost (building the
+statement and its cache key, which SQLAlchemy does before every compiled
+cache lookup) and the full cost of executing it on an async session.
+
+It also times check_availability against a table of --appointments rows,
+loading every active appointment (the old query) versus the prebuilt
+same-day range query.
+
+Usage:
+    python benchmarks/bench_statements.py --iterations 5000 --appointments 5000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, time as dt_time, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def per_call_us(elapsed: float, iterations: int) -> float:
+    """Microseconds per call."""
+    return round(elapsed / iterations * 1e6, 2)
+
+
+async def main(args):
+    from sqlalchemy import lambda_stmt, select
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import query_counter
+        from database import AsyncSessionLocal, engine, init_db
+        from models import Appointment
+        from services import APPOINTMENT_BY_ID, AvailabilityService
+
+    query_counter.install(engine)
+    await init_db()
+
+    # Seed appointments spread over the coming year's business hours
+    start = datetime.combine(datetime.now().date() + timedelta(days=1), dt_time(8))
+    async with AsyncSessionLocal() as session:
+        session.add_all(
+            Appointment(
+                client_name=f"Client {i}",
+                client_email=f"client{i}@example.com",
+                appointment_time=start
+                + timedelta(days=random.randrange(365), minutes=70 * random.randrange(8)),
+                status=random.choice(("confirmed", "confirmed", "cancelled")),
+            )
+            for i in range(args.appointments)
+        )
+        await session.commit()
+
+    ids = [random.randint(1, args.appointments) for _ in range(args.iterations)]
+    variants = {
+        "rebuilt": lambda i: (select(Appointment).where(Appointment.id == i), None),
+        "lambda": lambda i: (
+            lambda_stmt(lambda: select(Appointment).where(Appointment.id == i)),
+            None,
+        ),
+        "prebuilt": lambda i: (APPOINTMENT_BY_ID, {"appointment_id": i}),
+    }
+
+    results = {}
+    for name, build in variants.items():
+        # Preparation only: statement construction plus cache key generation
+        began = time.perf_counter()
+        for i in ids:
+            statement, _ = build(i)
+            statement._generate_cache_key()
+        prepare = time.perf_counter() - began
+
+        # Full execution
+        before = query_counter.statement_cache_stats()
+        async with AsyncSessionLocal() as session:
+            began = time.perf_counter()
+            for i in ids:
+                statement, params = build(i)
+                (await session.execute(statement, params)).scalar_one_or_none()
+                session.expunge_all()
+            execute = time.perf_counter() - began
+        after = query_counter.statement_cache_stats()
+
+        results[name] = {
+            "prepare_us": per_call_us(prepare, args.iterations),
+            "execute_us": per_call_us(execute, args.iterations),
+            "cache_hits": after["hits"] - before["hits"],
+            "cache_misses": after["misses"] - before["misses"],
+        }
+
+    # check_availability: every active appointment vs the same-day range
+    availability = AvailabilityService()
+    slots = [
+        start + timedelta(days=random.randrange(365), minutes=70 * random.randrange(8))
+        for _ in range(args.availability_checks)
+    ]
+    async with AsyncSessionLocal() as session:
+        began = time.perf_counter()
+        for slot in slots:
+            (
+                await session.execute(
+                    select(Appointment).where(Appointment.status != "cancelled")
+                )
+            ).scalars().all()
+            session.expunge_all()
+        all_active = time.perf_counter() - began
+
+        began = time.perf_counter()
+        for slot in slots:
+            await availability.check_availability(slot, session)
+            session.expunge_all()
+        same_day = time.perf_counter() - began
+
+    print(
+        json.dumps(
+            {
+                "iterations": args.iterations,
+                "appointment_by_id": results,
+                "check_availability_us": {
+                    "appointments": args.appointments,
+                    "load_all_active": per_call_us(all_active, args.availability_checks),
+                    "same_day_range": per_call_us(same_day, args.availability_checks),
+                },
+                "statement_cache": query_counter.statement_cache_stats(),
+            },
+            indent=2,
+        )
+    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-call statement overhead")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--appointments", type=int, default=5000)
+    parser.add_argument("--availability-checks", type=int, default=200)
+    args = parser.parse_args()
+
+    database = Path(tempfile.mkdtemp()) / "bench_statements.db"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{database}"
+    asyncio.run(main(args))
@@ -0,0 +1,253 @@
+"""
+Synthetic Dataset Generator
+
+Fills `users`, `appointments` and `notifications` with realistic data:
+- Multi-year history plus the upcoming booking window, growing over time
+- Busier Mondays and Fridays, planting and harvest seasons (Mar-May,
+  Sep-Oct) and occasional peak days several times busier than usual
+- Repeat customers: a small share of users makes most bookings
+- Cancellations, completed past appointments and confirmed upcoming ones
+- A new-booking notification per appointment and a cancellation
+  notification per cancelled one; older notifications are mostly read
+
+Appointments start on the bookable slot grid and are spread over several
+farms (owners), about 2000 per farm. Availability checks don't filter by
+farm, so a busier dataset means more appointments per day, as the
+services see it. Users share one password hash, since hashing is
+deliberately slow.
+
+Rows are inserted with bulk INSERTs in one transaction, then daily
+capacity is rebuilt for upcoming days. The target database must be
+empty; its schema is created by the migrations.
+
+Usage:
+    python benchmarks/generate_dataset.py --database dataset.db --appointments 100000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BATCH_SIZE = 10000
+# Day weight multipliers
+WEEKDAY_WEIGHTS = {0: 1.3, 1: 1.0, 2: 1.0, 3: 1.1, 4: 1.4}
+SEASON_MONTHS = {3, 4, 5, 9, 10}
+SEASON_WEIGHT = 1.6
+PEAK_DAY_WEIGHT = 4.0
+
+
+def day_weights(first_day: date, last_day: date, peak_day_rate: float, rng: random.Random):
+    """Weekdays in [first_day, last_day) with their relative booking volume."""
+    days, weights = [], []
+    span = (last_day - first_day).days
+    day = first_day
+    while day < last_day:
+        if day.weekday() < 5:
+            weight = WEEKDAY_WEIGHTS[day.weekday()]
+            if day.month in SEASON_MONTHS:
+                weight *= SEASON_WEIGHT
+            if rng.random() < peak_day_rate:
+                weight *= PEAK_DAY_WEIGHT
+            # The business grows: recent days are up to twice as busy
+            weight *= 1 + (day - first_day).days / span
+            days.append(day)
+            weights.append(weight)
+        day += timedelta(days=1)
+    return days, weights
+
+
+async def generate(
+    appointments: int,
+    users: int = None,
+    farms: int = None,
+    years: float = 3,
+    cancel_rate: float = 0.12,
+    peak_day_rate: float = 0.05,
+    seed: int = 0,
+) -> dict:
+    """
+    Generate the dataset into the database at DATABASE_URL.
+
+    Args:
+        appointments: Appointments to create
+        users: Distinct clients (default: one per 20 appointments)
+        farms: Owners (default: one per 2000 appointments)
+        years: Years of history before today
+        cancel_rate: Share of appointments cancelled
+        peak_day_rate: Share of days that are peak days
+        seed: Random seed, for reproducible datasets
+
+    Returns:
+        dict: Rows created per table and the seconds taken
+    """
+    from sqlalchemy import insert
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from database import AsyncSessionLocal, engine, init_db
+        from models import Appointment, Notification, Owner, User
+        from password_hashing import pwd_context
+        from services import AvailabilityService, CapacityService
+
+        await init_db()
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    users = users or max(appointments // 20, 1)
+    farms = farms or max(appointments // 2000, 1)
+    now = datetime.now().replace(microsecond=0)
+    today = now.date()
+
+    availability = AvailabilityService()
+    # Slot start times as offsets from midnight
+    slot_offsets = [
+        slot - datetime.combine(today, datetime.min.time())
+        for slot in availability._slot_times(today)
+    ]
+    days, weights = day_weights(
+        today - timedelta(days=int(years * 365)), today + timedelta(days=31), peak_day_rate, rng
+    )
+    appointment_days = rng.choices(days, weights, k=appointments)
+
+    notifications = 0
+    password_hash = pwd_context.hash("dataset-password")
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Owner),
+            [
+                {"id": farm, "name": f"Farm {farm}", "email": f"farm{farm}@example.com"}
+                for farm in range(1, farms + 1)
+            ],
+        )
+        for first in range(0, users, BATCH_SIZE):
+            await conn.execute(
+                insert(User),
+                [
+                    {
+                        "name": f"Client {index}",
+                        "email": f"client{index}@example.com",
+                        "password_hash": password_hash,
+                    }
+                    for index in range(first, min(first + BATCH_SIZE, users))
+                ],
+            )
+
+        for first in range(0, appointments, BATCH_SIZE):
+            appointment_rows, notification_rows = [], []
+            for appointment_id in range(first + 1, min(first + BATCH_SIZE, appointments) + 1):
+                appointment_time = (
+                    datetime.combine(appointment_days[appointment_id - 1], datetime.min.time())
+                    + rng.choice(slot_offsets)
+                )
+                # Booked a few days ahead, never in the future
+                created_at = min(
+                    appointment_time - timedelta(hours=rng.expovariate(1 / 120)), now
+                )
+                # Cubing skews bookings towards low-numbered, repeat clients
+                client = int(users * rng.random() ** 3)
+                if rng.random() < cancel_rate:
+                    appointment_status = "cancelled"
+                    updated_at = min(
+                        created_at + (appointment_time - created_at) * rng.random(), now
+                    )
+                else:
+                    appointment_status = "completed" if appointment_time < now else "confirmed"
+                    updated_at = created_at
+
+                appointment_rows.append(
+                    {
+                        "id": appointment_id,
+                        "owner_id": rng.randint(1, farms),
+                        "client_name": f"Client {client}",
+                        "client_email": f"client{client}@example.com",
+                        "client_phone": "+1234567890",
+                        "appointment_time": appointment_time,
+                        "duration_minutes": 120,
+                        "status": appointment_status,
+                        "created_at": created_at,
+                        "updated_at": updated_at,
+                    }
+                )
+                notification_rows.append(
+                    {
+                        "appointment_id": appointment_id,
+                        "notification_type": "new_appointment",
+                        "message": (
+                            f"New appointment from Client {client} on "
+                            f"{appointment_time.strftime('%Y-%m-%d %H:%M')}"
+                        ),
+                        "is_read": created_at < now - timedelta(days=14) or rng.random() < 0.5,
+                        "created_at": created_at,
+                    }
+                )
+                if appointment_status == "cancelled":
+                    notification_rows.append(
+                        {
+                            "appointment_id": appointment_id,
+                            "notification_type": "cancellation",
+                            "message": (
+                                f"Appointment for Client {client} on "
+                                f"{appointment_time.strftime('%Y-%m-%d %H:%M')} was cancelled"
+                            ),
+                            "is_read": updated_at < now - timedelta(days=14),
+                            "created_at": updated_at,
+                        }
+                    )
+
+            await conn.execute(insert(Appointment), appointment_rows)
+            await conn.execute(insert(Notification), notification_rows)
+            notifications += len(notification_rows)
+
+    async with AsyncSessionLocal() as session:
+        await CapacityService(availability).rebuild(today, session)
+        await session.commit()
+
+    return {
+        "users": users,
+        "farms": farms,
+        "appointments": appointments,
+        "notifications": notifications,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill a database with synthetic data")
+    parser.add_argument("--database", default="dataset.db", help="SQLite file to fill")
+    parser.add_argument("--appointments", type=int, default=100000)
+    parser.add_argument("--users", type=int, help="default: appointments / 20")
+    parser.add_argument("--farms", type=int, help="default: appointments / 2000")
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--cancel-rate", type=float, default=0.12)
+    parser.add_argument("--peak-day-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(args.database).resolve()}"
+
+    async def main():
+        from database import engine
+
+        try:
+            counts = await generate(
+                args.appointments,
+                users=args.users,
+                farms=args.farms,
+                years=args.years,
+                cancel_rate=args.cancel_rate,
+                peak_day_rate=args.peak_day_rate,
+                seed=args.seed,
+            )
+        finally:
+            await engine.dispose()
+        print(counts)
+
+    asyncio.run(main())
@@ -0,0 +1,522 @@
+"""
+Load Test
+
+Seeds a fresh database with synthetic farms, starts the app under uvicorn
+in a child process with emails going to the mock Resend server, and runs
+concurrent scenarios over real HTTP and WebSocket connections:
+- booking: POST /api/appointments on free slots in the booking window,
+  then on later dates (409s are expected: appointments overlap the next
+  slot)
+- browse: GET /api/available-slots and /api/daily-capacity
+- calendar: GET /api/calendar
+- login: POST /api/auth/login as the seeded users
+- websocket: bookings with --subscribers clients on /ws/notifications,
+  measuring delivery of each new-booking notification from the moment its
+  booking request was sent
+- mixed: all of the above at once
+
+Each scenario runs for --duration seconds with --concurrency clients per
+workload. The JSON report has, per scenario and endpoint, the request
+count, throughput, status counts and p50/p95/p99 latency, plus the
+commit and settings measured. Save it with --output and pass an earlier
+report as --baseline to add p95 and throughput ratios against it.
+
+Server settings can be overridden with --env, e.g. to compare group commit:
+    python benchmarks/load_test.py --env BOOKING_GROUP_COMMIT=true
+
+Usage:
+    python benchmarks/load_test.py --farms 3 --appointments 10000 --duration 10
+    python benchmarks/load_test.py --output after.json --baseline before.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from mock_resend_server import MockResendServer
+
+SCENARIOS = ("booking", "browse", "calendar", "login", "websocket", "mixed")
+PASSWORD = "load-test-password"
+
+
+def start_mock_server() -> MockResendServer:
+    """Run the mock provider on its own loop and thread."""
+    server = MockResendServer()
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return server
+
+
+def percentiles(samples):
+    """Summarize latency samples in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def free_port() -> int:
+    """A TCP port nothing is listening on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> str:
+    """Short hash of the commit being measured, if known."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def upcoming_slots(availability_service, first_day: int = 1, last_day: int = 31):
+    """Every slot start time on weekdays between the given day offsets from today."""
+    today = date.today()
+    for offset in itertools.count(first_day):
+        if last_day is not None and offset >= last_day:
+            return
+        day = today + timedelta(days=offset)
+        if day.weekday() < 5:
+            yield from availability_service._slot_times(day)
+
+
+def booking_slots(availability_service, free_slots: list):
+    """
+    Slots for the booking scenario: the free ones in the 31-day window,
+    then every slot after it (the API books any date), so runs never
+    run out.
+    """
+    yield from free_slots
+    yield from upcoming_slots(availability_service, first_day=31, last_day=None)
+
+
+async def seed(args) -> list:
+    """
+    Fill the database with farms, users and appointments.
+
+    Most appointments are history spread over the past year. A --fill
+    share of the upcoming slots is booked too, so availability and
+    capacity reads see realistic data; the remaining slots are returned
+    for the booking scenario.
+    """
+    from sqlalchemy import insert
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from database import AsyncSessionLocal, engine, init_db
+        from models import Appointment, Owner, User
+        from password_hashing import pwd_context
+        from services import AvailabilityService, CapacityService
+
+        await init_db()
+
+    availability = AvailabilityService()
+    upcoming = list(upcoming_slots(availability))
+    random.shuffle(upcoming)
+    booked_count = int(len(upcoming) * args.fill)
+    booked, free = upcoming[:booked_count], upcoming[booked_count:]
+
+    now = datetime.now().replace(second=0, microsecond=0)
+    history = max(args.appointments - len(booked), 0)
+    rows = [
+        {
+            "owner_id": random.randint(1, args.farms),
+            "client_name": f"Seed Client {index}",
+            "client_email": f"seed{index % max(args.users, 1)}@example.com",
+            "appointment_time": now - timedelta(minutes=random.randint(60, 365 * 24 * 60)),
+            "duration_minutes": 120,
+            "status": random.choice(("completed", "completed", "completed", "cancelled")),
+        }
+        for index in range(history)
+    ]
+    rows.extend(
+        {
+            "owner_id": random.randint(1, args.farms),
+            "client_name": f"Seed Client {history + index}",
+            "client_email": f"seed{index % max(args.users, 1)}@example.com",
+            "appointment_time": slot,
+            "duration_minutes": 120,
+            "status": "confirmed",
+        }
+        for index, slot in enumerate(booked)
+    )
+
+    # Hashing is deliberately slow, so every user shares one hash
+    password_hash = pwd_context.hash(PASSWORD)
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Owner),
+            [
+                {"id": farm, "name": f"Farm {farm}", "email": f"farm{farm}@example.com"}
+                for farm in range(1, args.farms + 1)
+            ],
+        )
+        if args.users:
+            await conn.execute(
+                insert(User),
+                [
+                    {"name": f"User {index}", "email": f"user{index}@example.com",
+                     "password_hash": password_hash}
+                    for index in range(args.users)
+                ],
+            )
+        for start in range(0, len(rows), 5000):
+            await conn.execute(insert(Appointment), rows[start : start + 5000])
+
+    async with AsyncSessionLocal() as session:
+        await CapacityService(availability).rebuild(date.today(), session)
+        await session.commit()
+    await engine.dispose()
+
+    free.sort()
+    return free
+
+
+def start_server(database_url: str, provider_url: str, port: int, overrides: dict):
+    """Start the app under uvicorn in a child process."""
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "RESEND_API_URL": f"{provider_url}/emails",
+        "RESEND_API_KEY": "load-test",
+        "RESEND_RATE_LIMIT_PER_SECOND": "0",
+        "JWT_SECRET_KEY": "load-test-" + "0" * 32,
+        # Every client shares one IP; throttling would turn logins into 429s
+        "LOGIN_IP_LIMIT": "1000000000",
+        "LOGIN_EMAIL_LIMIT": "1000000000",
+        **overrides,
+    }
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--log-level", "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_ready(client, server, timeout: float = 60):
+    """Poll /api/health until the server answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}")
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+class Recorder:
+    """Latency samples and status counts per endpoint."""
+
+    def __init__(self):
+        self.samples = {}
+        self.statuses = {}
+
+    def record(self, endpoint: str, started: float, status):
+        """Record a request that started at `started` (perf_counter)."""
+        self.samples.setdefault(endpoint, []).append((time.perf_counter() - started) * 1000)
+        statuses = self.statuses.setdefault(endpoint, {})
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    async def request(self, client, endpoint: str, method: str, url: str, **kwargs):
+        """Send a request, recording its latency under `endpoint`."""
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception as e:
+            self.record(endpoint, started, type(e).__name__)
+            return None
+        self.record(endpoint, started, response.status_code)
+        return response
+
+    def report(self, seconds: float) -> dict:
+        """Per-endpoint throughput, statuses and latency percentiles."""
+        return {
+            endpoint: {
+                "per_second": round(len(samples) / seconds, 1),
+                "statuses": self.statuses[endpoint],
+                "latency_ms": percentiles(samples),
+            }
+            for endpoint, samples in sorted(self.samples.items())
+        }
+
+
+class LoadTest:
+    """
+    Runs the scenarios against one server.
+
+    Handles:
+    - A client worker loop per workload (booking, browse, calendar, login)
+    - WebSocket subscribers timing notification delivery
+    - Collecting each scenario's report
+    """
+
+    def __init__(self, client, base_url: str, free_slots: list, args):
+        self.client = client
+        self.ws_url = base_url.replace("http://", "ws://") + "/ws/notifications"
+        with contextlib.redirect_stdout(io.StringIO()):
+            from services import AvailabilityService
+        self.slots = booking_slots(AvailabilityService(), free_slots)
+        self.args = args
+        self.booking_ids = itertools.count()
+        # Booking client name -> when its request was sent
+        self.booking_sent = {}
+        upcoming = sorted({slot.date() for slot in free_slots})
+        self.browse_days = [day.isoformat() for day in upcoming] or [date.today().isoformat()]
+
+    async def booking(self, recorder: Recorder, stop: asyncio.Event):
+        """Book upcoming slots until stopped."""
+        while not stop.is_set():
+            slot = next(self.slots)
+            name = f"Load Client {next(self.booking_ids)}"
+            self.booking_sent[name] = time.perf_counter()
+            await recorder.request(
+                self.client,
+                "POST /api/appointments",
+                "POST",
+                "/api/appointments",
+                json={
+                    "client_name": name,
+                    "client_email": "load@example.com",
+                    "client_phone": "+1234567890",
+                    "appointment_time": slot.isoformat(),
+                },
+            )
+
+    async def browse(self, recorder: Recorder, stop: asyncio.Event):
+        """Look at a day's slots, then at the window's daily capacity."""
+        while not stop.is_set():
+            day = random.choice(self.browse_days)
+            await recorder.request(
+                self.client, "GET /api/available-slots", "GET", f"/api/available-slots?date={day}"
+            )
+            await recorder.request(
+                self.client, "GET /api/daily-capacity", "GET", "/api/daily-capacity?days=31"
+            )
+
+    async def calendar(self, recorder: Recorder, stop: asyncio.Event):
+        """Load the full calendar."""
+        while not stop.is_set():
+            await recorder.request(self.client, "GET /api/calendar", "GET", "/api/calendar")
+
+    async def login(self, recorder: Recorder, stop: asyncio.Event):
+        """Log in as random seeded users."""
+        while not stop.is_set():
+            user = random.randrange(max(self.args.users, 1))
+            await recorder.request(
+                self.client,
+                "POST /api/auth/login",
+                "POST",
+                "/api/auth/login",
+                json={"email": f"user{user}@example.com", "password": PASSWORD},
+            )
+
+    async def subscriber(self, recorder: Recorder, connected: asyncio.Event, ready: list):
+        """Hold a WebSocket open, answering pings and timing notifications."""
+        import websockets
+
+        try:
+            async with websockets.connect(self.ws_url) as websocket:
+                ready.append(websocket)
+                if len(ready) == self.args.subscribers:
+                    connected.set()
+                async for raw in websocket:
+                    message = json.loads(raw)
+                    if message.get("type") == "ping":
+                        await websocket.send(json.dumps({"type": "pong"}))
+                    elif message.get("type") == "new_appointment":
+                        sent = self.booking_sent.get(message.get("client_name"))
+                        if sent is not None:
+                            recorder.record("WS new_appointment delivery", sent, "delivered")
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    async def run(self, scenario: str) -> dict:
+        """Run one scenario for --duration seconds and report it."""
+        recorder = Recorder()
+        stop = asyncio.Event()
+        workloads = {
+            "booking": [self.booking],
+            "browse": [self.browse],
+            "calendar": [self.calendar],
+            "login": [self.login],
+            "websocket": [self.booking],
+            "mixed": [self.booking, self.browse, self.calendar, self.login],
+        }[scenario]
+
+        subscribers = []
+        if scenario in ("websocket", "mixed") and self.args.subscribers:
+            connected, ready = asyncio.Event(), []
+            subscribers = [
+                asyncio.create_task(self.subscriber(recorder, connected, ready))
+                for _ in range(self.args.subscribers)
+            ]
+            await asyncio.wait_for(connected.wait(), timeout=30)
+
+        booked_before = len(self.booking_sent)
+        start = time.perf_counter()
+        workers = [
+            asyncio.create_task(workload(recorder, stop))
+            for workload in workloads
+            for _ in range(self.args.concurrency)
+        ]
+        await asyncio.sleep(self.args.duration)
+        stop.set()
+        await asyncio.gather(*workers)
+        seconds = time.perf_counter() - start
+
+        if subscribers:
+            # Let notifications for the last bookings arrive
+            await asyncio.sleep(1)
+            for task in subscribers:
+                task.cancel()
+            await asyncio.gather(*subscribers, return_exceptions=True)
+
+        report = {"seconds": round(seconds, 2), "endpoints": recorder.report(seconds)}
+        if subscribers:
+            booked = recorder.statuses.get("POST /api/appointments", {}).get("201", 0)
+            delivered = len(recorder.samples.get("WS new_appointment delivery", []))
+            report["websocket"] = {
+                "subscribers": self.args.subscribers,
+                "bookings_attempted": len(self.booking_sent) - booked_before,
+                "expected_deliveries": booked * self.args.subscribers,
+                "deliveries": delivered,
+            }
+        return report
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """p95 latency and throughput of each endpoint relative to a baseline report."""
+    ratios = {}
+    for scenario, report in results.items():
+        previous = baseline.get("scenarios", {}).get(scenario, {}).get("endpoints", {})
+        for endpoint, current in report["endpoints"].items():
+            before = previous.get(endpoint)
+            if not before or not before["latency_ms"] or not current["latency_ms"]:
+                continue
+            ratios.setdefault(scenario, {})[endpoint] = {
+                "p95_ratio": round(current["latency_ms"]["p95"] / max(before["latency_ms"]["p95"], 0.01), 2),
+                "throughput_ratio": round(current["per_second"] / max(before["per_second"], 0.01), 2),
+            }
+    return ratios
+
+
+async def main(args):
+    import httpx
+
+    overrides = dict(item.split("=", 1) for item in args.env)
+    database = Path(tempfile.mkdtemp()) / "load_test.db"
+    database_url = f"sqlite+aiosqlite:///{database}"
+    os.environ["DATABASE_URL"] = database_url
+    free_slots = await seed(args)
+
+    provider = start_mock_server()
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(database_url, provider.url, port, overrides)
+    limits = httpx.Limits(max_connections=args.concurrency * 8)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            await wait_until_ready(client, server)
+            load_test = LoadTest(client, base_url, free_slots, args)
+            results = {}
+            for scenario in args.scenarios:
+                results[scenario] = await load_test.run(scenario)
+            health = (await client.get("/api/health")).json()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "farms": args.farms,
+            "users": args.users,
+            "appointments": args.appointments,
+            "fill": args.fill,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "subscribers": args.subscribers,
+            "env": overrides,
+        },
+        "scenarios": results,
+        "emails_delivered": provider.emails,
+        "server_health": health,
+    }
+    if args.baseline:
+        with open(args.baseline) as file:
+            report["vs_baseline"] = compare(results, json.load(file))
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run concurrent load scenarios against the app")
+    parser.add_argument("--farms", type=int, default=3, help="owners to seed")
+    parser.add_argument("--users", type=int, default=50, help="user accounts to seed")
+    parser.add_argument("--appointments", type=int, default=10000, help="appointments to seed")
+    parser.add_argument(
+        "--fill", type=float, default=0.3, help="share of upcoming slots booked when seeding"
+    )
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="clients per workload")
+    parser.add_argument("--subscribers", type=int, default=50, help="WebSocket clients")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE",
+        help="setting passed to the server (repeatable)",
+    )
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,166 @@
+"""
+Mock Resend API Server
+
+A local stand-in for the Resend REST API used by benchmarks and manual
+testing. It speaks just enough HTTP/1.1 (with keep-alive) to accept
+POST /emails, and can simulate provider latency and failures.
+
+Usage:
+    python benchmarks/mock_resend_server.py --port 8025 --latency-ms 80
+
+Then point the app at it:
+    RESEND_API_URL=http://127.0.0.1:8025/emails RESEND_API_KEY=test uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import uuid
+from typing import Dict, Optional
+
+
+class MockResendServer:
+    """
+    Minimal asyncio HTTP server imitating the Resend API.
+
+    Tracks:
+    - Requests and emails accepted
+    - TCP connections opened (to observe connection reuse)
+    - Idempotency keys, replaying the original response for repeats
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0,
+        failure_rate: float = 0,
+    ):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+
+        self.requests = 0
+        self.emails = 0
+        self.connections = 0
+        self.failures = 0
+        self._idempotent_responses: Dict[str, dict] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server."""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        """Start listening; port 0 picks a free port."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening and close the server."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until the client closes it."""
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", "0"))
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._respond(method, path, headers, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, path: str, headers: dict, body: bytes):
+        """Build the status and JSON body for one request."""
+        self.requests += 1
+        if method != "POST" or not path.startswith("/emails"):
+            return 404, {"message": "Not found"}
+
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        key = headers.get("idempotency-key")
+        if key and key in self._idempotent_responses:
+            return 200, self._idempotent_responses[key]
+
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.failures += 1
+            return 500, {"message": "Simulated provider failure"}
+
+        message = json.loads(body or b"{}")
+        count = len(message) if isinstance(message, list) else 1
+        self.emails += count
+        if isinstance(message, list):
+            response = {"data": [{"id": uuid.uuid4().hex} for _ in message]}
+        else:
+            response = {"id": uuid.uuid4().hex}
+
+        if key:
+            self._idempotent_responses[key] = response
+        return 200, response
+
+    def stats(self) -> dict:
+        """Counters collected since startup."""
+        return {
+            "requests": self.requests,
+            "emails": self.emails,
+            "connections": self.connections,
+            "failures": self.failures,
+        }
+
+
+async def _serve(args):
+    server = MockResendServer(args.host, args.port, args.latency_ms, args.failure_rate)
+    await server.start()
+    print(f"[OK] Mock Resend API listening on {server.url}/emails")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        print(f"[INFO] {server.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock of the Resend API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--failure-rate", type=float, default=0)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
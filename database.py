@@ -6,8 +6,24 @@ This module handles:
 - SQLAlchemy session management
 - Async database operations
 - Database initialization
+- SQLite performance pragmas applied to every new connection
+- A single SQLite writer connection and a pool of read-only connections
+
+SQLite allows one writer at a time, so file databases get one writer
+connection: sessions wait their turn in the pool's checkout queue instead
+of failing with "database is locked". GET endpoints use read-only
+connections, which in WAL mode never wait for the writer.
+
+Routes declare what they need: get_write_db commits after the handler,
+get_read_db never commits or autoflushes and can point at a replica
+(DATABASE_READ_URL). Write routes use Depends(get_write_db,
+scope="function"): FastAPI otherwise ends `yield` dependencies after the
+response is sent and its background tasks have run, so a client would get
+its 201 (and broadcasts would go out) before the commit.
 """
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import StaticPool
@@ -16,38 +32,200 @@ import os
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./appointments.db")
 
+# In-memory SQLite only exists on a single connection, so it must be shared.
+# File databases get a real pool: sessions sharing one connection would also
+# share one transaction, letting background tasks commit or roll back a
+# request's pending writes.
+IS_MEMORY_SQLITE = "sqlite" in DATABASE_URL and (
+    ":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/").endswith("sqlite+aiosqlite:")
+)
+
+IS_FILE_SQLITE = "sqlite" in DATABASE_URL and not IS_MEMORY_SQLITE
+
+# Optional separate database for reads (e.g. a replica); defaults to
+# read-only connections to DATABASE_URL
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+# Read connections for GET endpoints (0 = reads share the writer, unless
+# DATABASE_READ_URL is set)
+DATABASE_READ_POOL_SIZE = int(os.getenv("DATABASE_READ_POOL_SIZE", "4"))
+# How long a write session waits for the writer connection before failing
+SQLITE_WRITE_TIMEOUT_SECONDS = float(os.getenv("SQLITE_WRITE_TIMEOUT_SECONDS", "30"))
+
+# SQLite connection profile: "performance" applies the pragmas below to
+# every new connection, "default" leaves SQLite's defaults (rollback
+# journal, full fsync, no mmap)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "performance")
+# WAL lets readers run alongside the single writer
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+# NORMAL only fsyncs at WAL checkpoints; a power loss can drop the last
+# commits but never corrupts the database
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# Bytes of the database file memory-mapped for reads (0 = off)
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Page cache per connection; negative values are KiB, positive are pages
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+# Keep temporary tables and sort spills in memory
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+# How long a connection waits for a lock before raising "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def sqlite_pragmas(read_only: bool = False) -> dict:
+    """
+    Pragmas applied to each new SQLite connection under the current profile.
+
+    Args:
+        read_only: Whether the connection is read-only (journal mode can
+            only be set by a writer)
+
+    Returns:
+        dict: Pragma name to value, in the order they are applied
+    """
+    if SQLITE_PROFILE == "default":
+        return {}
+    if SQLITE_PROFILE != "performance":
+        raise ValueError(f"Unknown SQLite profile: {SQLITE_PROFILE}")
+    pragmas = {
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "cache_size": SQLITE_CACHE_SIZE,
+        "temp_store": SQLITE_TEMP_STORE,
+        "mmap_size": SQLITE_MMAP_SIZE,
+    }
+    if IS_FILE_SQLITE and not read_only:
+        # In-memory databases have no file to journal
+        pragmas = {"journal_mode": SQLITE_JOURNAL_MODE, **pragmas}
+    return pragmas
+
+
+def _read_only_url(url: str) -> str:
+    """SQLite URL opening the same file with mode=ro."""
+    parsed = make_url(url)
+    return str(
+        parsed.set(
+            database=f"file:{parsed.database}",
+            query={**parsed.query, "mode": "ro", "uri": "true"},
+        )
+    )
+
+
+def _sqlite_pragma_hook(read_only: bool):
+    """Connect listener applying the SQLite profile's pragmas."""
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in sqlite_pragmas(read_only).items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return apply_pragmas
+
+
 # Create async engine with connection pooling
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,  # Set to True for SQL query logging
     future=True,
-    pool_pre_ping=True,
+    # SQLite connections are local files that can't go stale; pinging
+    # would add a SELECT 1 to every checkout
+    pool_pre_ping="sqlite" not in DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    poolclass=StaticPool if "sqlite" in DATABASE_URL else None,
+    poolclass=StaticPool if IS_MEMORY_SQLITE else None,
+    # File SQLite: one writer connection, sessions queue for it
+    **(
+        {"pool_size": 1, "max_overflow": 0, "pool_timeout": SQLITE_WRITE_TIMEOUT_SECONDS}
+        if IS_FILE_SQLITE
+        else {}
+    ),
 )
 
+# Read-only engine for GET endpoints: DATABASE_READ_URL if set, else
+# read-only connections to a file database. Other databases and in-memory
+# SQLite read through the main engine. Reads run in autocommit mode, so a
+# read session costs no BEGIN/COMMIT round trips.
+if DATABASE_READ_URL:
+    read_engine = create_async_engine(
+        DATABASE_READ_URL,
+        echo=False,
+        future=True,
+        pool_pre_ping=True,
+        pool_size=max(DATABASE_READ_POOL_SIZE, 1),
+        isolation_level="AUTOCOMMIT",
+    )
+elif IS_FILE_SQLITE and DATABASE_READ_POOL_SIZE > 0:
+    read_engine = create_async_engine(
+        _read_only_url(DATABASE_URL),
+        echo=False,
+        future=True,
+        connect_args={"check_same_thread": False},
+        pool_size=DATABASE_READ_POOL_SIZE,
+        max_overflow=0,
+        isolation_level="AUTOCOMMIT",
+    )
+    event.listen(read_engine.sync_engine, "connect", _sqlite_pragma_hook(read_only=True))
+else:
+    read_engine = engine
+
+if "sqlite" in DATABASE_URL:
+    event.listen(engine.sync_engine, "connect", _sqlite_pragma_hook(read_only=False))
+
+if IS_FILE_SQLITE:
+    # pysqlite starts transactions lazily and doesn't know about SAVEPOINT,
+    # so nested transactions (used by group commit) silently misbehave.
+    # Turn its transaction handling off and emit BEGIN ourselves. Not done
+    # for in-memory SQLite, whose sessions all share one connection.
+    @event.listens_for(engine.sync_engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin_sqlite_transaction(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
 # Create session factory
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False, future=True
 )
 
+# Sessions on the read-only engine; nothing is written, so never autoflush
+ReadSessionLocal = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False, future=True
+)
+
 # Base class for all models
 Base = declarative_base()
 
 
 async def init_db():
     """
-    Initialize the database by creating all tables.
-    Called on application startup.
+    Initialize the database by applying pending schema migrations.
+    Called on application startup; a no-op beyond one version check when
+    the schema is current.
+    """
+    from migrations import run_startup_migrations
+
+    await run_startup_migrations()
+
+
+async def close_db():
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    Close every pooled connection. Called on application shutdown, after
+    the background tasks using the database have stopped.
+    """
+    if read_engine is not engine:
+        await read_engine.dispose()
+    await engine.dispose()
 
 
-async def get_db():
+async def get_write_db():
     """
-    Dependency function to get database session.
-    Used in FastAPI route dependencies.
+    Dependency function to get a read-write database session.
+    Used by routes that write, with scope="function" so the session
+    commits after the handler returns, before the response is sent, and
+    rolls back if it raises.
 
     Yields:
         AsyncSession: Database session for the request
@@ -63,6 +241,39 @@ async def get_db():
             await session.close()
 
 
+async def get_read_db():
+    """
+    Dependency function to get a read-only database session.
+    Used by routes that only read; the session is never committed or
+    flushed, and may be served by a replica or the read-only pool.
+
+    Yields:
+        AsyncSession: Read-only database session for the request
+    """
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+def _pool_stats(pool) -> dict:
+    """Size and checked-out connections of a queue pool."""
+    if not hasattr(pool, "checkedout"):
+        return {"pool": type(pool).__name__}
+    return {"size": pool.size(), "checked_out": pool.checkedout()}
+
+
+def database_stats() -> dict:
+    """
+    Get connection pool usage.
+
+    Returns:
+        dict: Writer and reader pool sizes and connections in use
+    """
+    return {
+        "writer": _pool_stats(engine.pool),
+        "reader": _pool_stats(read_engine.pool) if read_engine is not engine else None,
+    }
+
+
 # For synchronous operations if needed
 SessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False, future=True
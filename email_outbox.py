@@ -0,0 +1,579 @@
+"""
+Durable Email Outbox
+
+This module handles:
+- Queueing emails in the email_outbox table inside the caller's transaction
+- A background dispatcher that drains due rows in batches
+- Exponential-backoff retries and dead-lettering of undeliverable emails
+- Idempotency keys so an email is delivered at most once per key
+- Grouping due emails into provider batch calls
+- Optional admin digest mode coalescing new-booking notifications
+- Delivering and retrying grouped rows as one unit under a stable key
+- Backpressure: when the transport's queue is full, rows stay in (or go
+  back to) the outbox instead of piling up in memory
+
+Because the outbox row commits together with the appointment, an email can
+no longer be lost to a process restart between booking and sending.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from models import EmailOutbox
+from password_reset import build_reset_email
+from email_service import (
+    build_appointment_confirmation_email,
+    build_admin_appointment_notification,
+    build_admin_appointment_digest,
+    build_appointment_cancellation_email,
+    build_appointment_reminder_email,
+    resend_transport,
+    TransportBusy,
+    RESEND_BATCH_MAX_SIZE,
+)
+
+# Dispatcher configuration
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "5"))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "3600"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+OUTBOX_USE_BATCH_API = os.getenv("OUTBOX_USE_BATCH_API", "true").lower() == "true"
+# Delay before retrying rows the transport was too busy to accept
+OUTBOX_DEFER_SECONDS = float(os.getenv("OUTBOX_DEFER_SECONDS", "2"))
+
+# Admin digest mode: when > 0, new-booking notifications are held until the
+# end of the current window and sent as one summary email
+ADMIN_DIGEST_WINDOW_SECONDS = float(os.getenv("ADMIN_DIGEST_WINDOW_SECONDS", "0"))
+
+# Outbox statuses
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+# Email renderers by outbox email_type
+EMAIL_BUILDERS = {
+    "appointment_confirmation": build_appointment_confirmation_email,
+    "admin_appointment_notification": build_admin_appointment_notification,
+    "appointment_cancellation": build_appointment_cancellation_email,
+    "appointment_reminder": build_appointment_reminder_email,
+    "password_reset": build_reset_email,
+}
+
+ADMIN_NOTIFICATION_TYPE = "admin_appointment_notification"
+
+# Email types whose payload refers to a secret (the reset token); cleared
+# once the row is sent or dead-lettered
+SENSITIVE_EMAIL_TYPES = ("password_reset",)
+
+# batch_key prefix of admin notifications held for a digest; the rest of
+# the key is the window end, so one window's rows form one group, sealed
+# with ".<lowest row id>" at its first attempt (see _digest_key)
+DIGEST_KEY_PREFIX = "admin-digest-"
+
+# Delivery result for rows refused by a full transport queue; rescheduled
+# without counting as a failed attempt
+DEFERRED = "deferred: email transport busy"
+
+# Naive UTC epoch that digest windows are aligned to
+_EPOCH = datetime(1970, 1, 1)
+
+# Payload fields stored as ISO strings and decoded back to datetimes
+_DATETIME_FIELDS = ("appointment_time",)
+
+# How long shutdown waits for the batch in progress; longer than one
+# provider request, so a batch that is being sent can record its results
+_SHUTDOWN_TIMEOUT_SECONDS = 15
+
+
+async def enqueue_email(
+    db: AsyncSession, email_type: str, payload: dict, idempotency_key: str
+) -> EmailOutbox:
+    """
+    Queue an email in the outbox as part of the caller's transaction.
+
+    The row becomes visible to the dispatcher only once the caller's
+    session commits, so the email is sent if and only if the change that
+    triggered it was persisted.
+
+    Args:
+        db: Database session of the triggering request
+        email_type: Key into EMAIL_BUILDERS
+        payload: Keyword arguments for the renderer (datetimes allowed)
+        idempotency_key: Unique key identifying this email
+
+    Returns:
+        EmailOutbox: The queued outbox row
+    """
+    if email_type not in EMAIL_BUILDERS:
+        raise ValueError(f"Unknown email type: {email_type}")
+
+    encoded = {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in payload.items()
+    }
+    next_attempt_at = datetime.utcnow()
+    batch_key = None
+    if email_type == ADMIN_NOTIFICATION_TYPE and ADMIN_DIGEST_WINDOW_SECONDS > 0:
+        next_attempt_at = _digest_window_end(next_attempt_at)
+        batch_key = f"{DIGEST_KEY_PREFIX}{int((next_attempt_at - _EPOCH).total_seconds())}"
+
+    entry = EmailOutbox(
+        idempotency_key=idempotency_key,
+        email_type=email_type,
+        payload=json.dumps(encoded),
+        status=STATUS_PENDING,
+        attempts=0,
+        next_attempt_at=next_attempt_at,
+        batch_key=batch_key,
+    )
+    db.add(entry)
+    return entry
+
+
+def _digest_window_end(now: datetime) -> datetime:
+    """
+    End of the admin digest window containing `now`, aligned to the epoch.
+
+    Works on the naive UTC value directly: timestamp() and fromtimestamp()
+    would read it as local time and shift windows with the host time zone.
+    """
+    elapsed = (now - _EPOCH).total_seconds()
+    window_end = (elapsed // ADMIN_DIGEST_WINDOW_SECONDS + 1) * ADMIN_DIGEST_WINDOW_SECONDS
+    return _EPOCH + timedelta(seconds=window_end)
+
+
+def _group_key(prefix: str, keys: List[str]) -> str:
+    """Deterministic idempotency key for a group of outbox rows."""
+    digest = hashlib.sha256("\n".join(sorted(keys)).encode()).hexdigest()[:32]
+    return f"{prefix}-{digest}"
+
+
+def _digest_key(batch_key: str, group: List[EmailOutbox]) -> str:
+    """
+    Idempotency key of an admin digest: its window key plus its lowest row id.
+
+    The key is stored as the group's batch_key before the first attempt, so
+    retries send the same members under the same key. A row committed into
+    the window after it was claimed still carries the bare window key and
+    is sealed into a group of its own, leaving the first group's key alone.
+    """
+    if "." in batch_key:
+        return batch_key
+    return f"{batch_key}.{min(entry.id for entry in group)}"
+
+
+def _decode_payload(payload: str) -> dict:
+    """Decode a stored payload back into renderer keyword arguments."""
+    kwargs = json.loads(payload)
+    for key in _DATETIME_FIELDS:
+        if kwargs.get(key):
+            kwargs[key] = datetime.fromisoformat(kwargs[key])
+    return kwargs
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Exponential backoff with jitter for a row that has failed `attempts` times.
+
+    Args:
+        attempts: Number of failed attempts so far (1 for the first failure)
+
+    Returns:
+        float: Seconds to wait before the next attempt
+    """
+    delay = min(OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), OUTBOX_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class EmailOutboxDispatcher:
+    """
+    Background task that delivers queued emails.
+
+    Handles:
+    - Claiming due rows in batches under a lease, whole groups at a time
+    - Sending each email with its idempotency key, or each group with its
+      group's key
+    - Rescheduling failures with exponential backoff, per group
+    - Dead-lettering rows that exhaust their attempts
+    - Leaving rows in the outbox while the transport queue is full
+    """
+
+    def __init__(
+        self,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL_SECONDS,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+        # Counters
+        self.sent = 0
+        self.failed_attempts = 0
+        self.dead_lettered = 0
+        self.deferred = 0
+        self.queue_depth = 0
+
+    def start(self):
+        """Start the dispatcher loop. Called on application startup."""
+        if self._task is None:
+            self._stopping = False
+            # Bound to the running loop on first use; a restart gets a new loop
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def wake(self):
+        """
+        Ask the dispatcher to check the outbox before its next poll.
+
+        A coroutine so that, when scheduled as a background task, it runs on
+        the event loop rather than in Starlette's threadpool.
+        """
+        self._wakeup.set()
+
+    async def shutdown(self):
+        """
+        Stop the dispatcher. Unsent rows stay in the outbox for next startup.
+
+        The loop finishes the batch in progress and exits on its own; it is
+        only cancelled if that takes longer than the shutdown timeout.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                async with asyncio.timeout(_SHUTDOWN_TIMEOUT_SECONDS):
+                    await self._task
+            except TimeoutError:
+                print("[WARNING] Email outbox dispatcher did not stop in time, cancelled it")
+            self._task = None
+        await resend_transport.aclose()
+
+    async def _run(self):
+        """Drain due rows, sleeping between polls while the outbox is idle."""
+        while not self._stopping:
+            try:
+                processed = await self.dispatch_batch()
+            except Exception as e:
+                print(f"[ERROR] Email outbox dispatch failed: {str(e)}")
+                processed = 0
+
+            # Keep draining while full batches come back
+            if processed >= self.batch_size:
+                continue
+
+            if self._stopping:
+                break
+            try:
+                async with asyncio.timeout(self.poll_interval):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def dispatch_batch(self) -> int:
+        """
+        Claim and deliver one batch of due outbox rows.
+
+        Returns:
+            int: Number of rows processed
+        """
+        if resend_transport.capacity() <= 0:
+            return 0
+
+        entries = await self._claim_batch()
+        if not entries:
+            return 0
+
+        errors = await self._deliver(entries)
+        await self._record_results(entries, [errors[entry.id] for entry in entries])
+        return len(entries)
+
+    async def _claim_batch(self) -> List[EmailOutbox]:
+        """
+        Lease a batch of due rows to this dispatcher.
+
+        Rows stuck in "sending" past their lease (e.g. after a crash) are
+        claimable again; the idempotency key keeps that from double-sending.
+        Rows sharing a batch_key are claimed together even past the batch
+        size, so a digest or provider batch is never split.
+        """
+        now = datetime.utcnow()
+        lease_token = uuid.uuid4().hex
+        due = (
+            EmailOutbox.status.in_((STATUS_PENDING, STATUS_SENDING)),
+            EmailOutbox.next_attempt_at <= now,
+        )
+
+        async with AsyncSessionLocal() as session:
+            due_rows = (
+                select(EmailOutbox.id, EmailOutbox.batch_key)
+                .where(*due)
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(self.batch_size)
+            )
+            rows = (await session.execute(due_rows)).all()
+            if not rows:
+                self.queue_depth = 0
+                return []
+            ids = {row_id for row_id, _ in rows}
+            batch_keys = {batch_key for _, batch_key in rows if batch_key}
+            if batch_keys:
+                ids.update(
+                    (
+                        await session.execute(
+                            select(EmailOutbox.id).where(
+                                EmailOutbox.batch_key.in_(batch_keys), *due
+                            )
+                        )
+                    ).scalars()
+                )
+            if len(rows) < self.batch_size:
+                self.queue_depth = len(ids)
+            else:
+                self.queue_depth = (
+                    await session.execute(select(func.count(EmailOutbox.id)).where(*due))
+                ).scalar_one()
+
+            await session.execute(
+                update(EmailOutbox)
+                .where(
+                    EmailOutbox.id.in_(ids),
+                    EmailOutbox.next_attempt_at <= now,
+                )
+                .values(
+                    status=STATUS_SENDING,
+                    lease_token=lease_token,
+                    next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+                )
+            )
+            await session.commit()
+
+            result = await session.execute(
+                select(EmailOutbox).where(EmailOutbox.lease_token == lease_token)
+            )
+            return result.scalars().all()
+
+    async def _deliver(self, entries: List[EmailOutbox]) -> Dict[int, Optional[str]]:
+        """
+        Render and send a claimed batch over the pooled async transport.
+
+        Rows already sent in a provider batch are re-sent in that same batch
+        under the same key. New batches get their key stored on the rows
+        before the request is made, so a batch that timed out but was
+        accepted is retried identically and delivered only once.
+
+        Returns:
+            Dict[int, Optional[str]]: Per row id, None on success or an error description
+        """
+        errors: Dict[int, Optional[str]] = {}
+        messages, digests = self._render(entries, errors)
+
+        # Digests get their key stored on the rows at their first attempt
+        unsealed = {
+            key: [(group, message, key)]
+            for group, message, key in digests
+            if group[0].batch_key != key
+        }
+        if unsealed:
+            await self._assign_batch_keys(unsealed)
+
+        # A row already attempted alone keeps its own key: adding it to a new
+        # batch could deliver it a second time
+        batches: Dict[str, List[Tuple[List[EmailOutbox], dict, str]]] = {}
+        unbatched, individual = [], []
+        for message in messages:
+            entry = message[0][0]
+            if entry.batch_key:
+                batches.setdefault(entry.batch_key, []).append(message)
+            elif entry.attempts:
+                individual.append(message)
+            else:
+                unbatched.append(message)
+        if OUTBOX_USE_BATCH_API and len(unbatched) > 1:
+            new_batches = {}
+            for i in range(0, len(unbatched), RESEND_BATCH_MAX_SIZE):
+                chunk = unbatched[i:i + RESEND_BATCH_MAX_SIZE]
+                new_batches[_group_key("batch", [key for _, _, key in chunk])] = chunk
+            await self._assign_batch_keys(new_batches)
+            batches.update(new_batches)
+            unbatched = []
+
+        calls = [
+            (group, resend_transport.send(idempotency_key=key, **message))
+            for group, message, key in individual + unbatched + digests
+        ]
+        calls.extend(
+            (
+                [entry for group, _, _ in chunk for entry in group],
+                resend_transport.send_batch(
+                    [message for _, message, _ in chunk], idempotency_key=batch_key
+                ),
+            )
+            for batch_key, chunk in batches.items()
+        )
+        if not calls:
+            return errors
+        results = await asyncio.gather(*(call for _, call in calls), return_exceptions=True)
+
+        for (group, _), result in zip(calls, results):
+            if isinstance(result, TransportBusy):
+                error = DEFERRED
+            elif isinstance(result, Exception):
+                error = str(result)
+            else:
+                error = None if result else "Email provider rejected the message"
+            for entry in group:
+                errors[entry.id] = error
+        return errors
+
+    async def _assign_batch_keys(self, batches: Dict[str, list]):
+        """Store each new provider batch's key on its rows before it is sent."""
+        async with AsyncSessionLocal() as session:
+            for batch_key, chunk in batches.items():
+                group = [entry for rows, _, _ in chunk for entry in rows]
+                await session.execute(
+                    update(EmailOutbox)
+                    .where(
+                        EmailOutbox.id.in_([entry.id for entry in group]),
+                        EmailOutbox.lease_token == group[0].lease_token,
+                    )
+                    .values(batch_key=batch_key)
+                )
+                for entry in group:
+                    entry.batch_key = batch_key
+            await session.commit()
+
+    def _render(
+        self, entries: List[EmailOutbox], errors: Dict[int, Optional[str]]
+    ) -> Tuple[list, list]:
+        """
+        Render claimed rows into messages, coalescing admin digests.
+
+        Rows that fail to render get an entry in `errors`.
+
+        Returns:
+            Two lists of (rows covered, message, idempotency key): messages
+            of one row each, and admin digests (one per sealed window group)
+        """
+        messages = []
+        digest_rows: Dict[str, list] = {}
+        for entry in entries:
+            builder = EMAIL_BUILDERS.get(entry.email_type)
+            try:
+                if builder is None:
+                    raise ValueError(f"Unknown email type: {entry.email_type}")
+                kwargs = _decode_payload(entry.payload)
+                if entry.batch_key and entry.batch_key.startswith(DIGEST_KEY_PREFIX):
+                    digest_rows.setdefault(entry.batch_key, []).append((entry, kwargs))
+                    continue
+                messages.append(([entry], builder(**kwargs), entry.idempotency_key))
+            except Exception as e:
+                errors[entry.id] = str(e)
+
+        digests = []
+        for batch_key, rows in digest_rows.items():
+            group = [entry for entry, _ in rows]
+            if len(rows) == 1:
+                message = build_admin_appointment_notification(**rows[0][1])
+            else:
+                message = build_admin_appointment_digest([kwargs for _, kwargs in rows])
+            digests.append((group, message, _digest_key(batch_key, group)))
+        return messages, digests
+
+    async def _record_results(self, entries: List[EmailOutbox], results: List[Optional[str]]):
+        """
+        Persist the outcome of a delivered batch in one transaction.
+
+        Rows sharing a batch_key share their attempt count and retry time,
+        so a group is retried, and dead-lettered, as one unit.
+        """
+        now = datetime.utcnow()
+        group_attempts: Dict[object, int] = {}
+        for entry in entries:
+            group = entry.batch_key or entry.id
+            group_attempts[group] = max(group_attempts.get(group, 0), entry.attempts + 1)
+        group_delays = {
+            group: retry_delay(attempts) for group, attempts in group_attempts.items()
+        }
+
+        async with AsyncSessionLocal() as session:
+            for entry, error in zip(entries, results):
+                group = entry.batch_key or entry.id
+                values = {"lease_token": None, "attempts": group_attempts[group]}
+                if error is None:
+                    values.update(status=STATUS_SENT, sent_at=now, last_error=None)
+                    if entry.email_type in SENSITIVE_EMAIL_TYPES:
+                        values["payload"] = "{}"
+                    self.sent += 1
+                elif error == DEFERRED:
+                    values.update(
+                        status=STATUS_PENDING,
+                        attempts=entry.attempts,
+                        next_attempt_at=now + timedelta(seconds=OUTBOX_DEFER_SECONDS),
+                    )
+                    self.deferred += 1
+                elif values["attempts"] >= self.max_attempts:
+                    values.update(status=STATUS_DEAD, last_error=error)
+                    if entry.email_type in SENSITIVE_EMAIL_TYPES:
+                        values["payload"] = "{}"
+                    self.dead_lettered += 1
+                    print(
+                        f"[ERROR] Email {entry.idempotency_key} dead-lettered after "
+                        f"{values['attempts']} attempts: {error}"
+                    )
+                else:
+                    values.update(
+                        status=STATUS_PENDING,
+                        last_error=error,
+                        next_attempt_at=now + timedelta(seconds=group_delays[group]),
+                    )
+                    self.failed_attempts += 1
+                    print(
+                        f"[WARNING] Email {entry.idempotency_key} failed "
+                        f"(attempt {values['attempts']}), will retry: {error}"
+                    )
+
+                await session.execute(
+                    update(EmailOutbox)
+                    .where(
+                        EmailOutbox.id == entry.id,
+                        EmailOutbox.lease_token == entry.lease_token,
+                    )
+                    .values(**values)
+                )
+            await session.commit()
+
+    def stats(self) -> dict:
+        """
+        Get dispatcher counters.
+
+        Returns:
+            dict: Delivery counters since startup, due rows at the last poll
+                and the transport's queue metrics
+        """
+        return {
+            "sent": self.sent,
+            "failed_attempts": self.failed_attempts,
+            "dead_lettered": self.dead_lettered,
+            "deferred": self.deferred,
+            "queue_depth": self.queue_depth,
+            "transport": resend_transport.stats(),
+        }
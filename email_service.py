@@ -1,16 +1,25 @@
 """
 Email Service for EcoHarvest Farm Appointment System
 Handles sending emails for password resets and appointment notifications using Resend REST API
+
+Each email has a build_* renderer returning its to/subject/html/text, from
+the template functions in email_templates.py. Emails are queued
+in the outbox (email_outbox.py) and sent by the pooled async
+ResendTransport; nothing here sends from the request path.
 """
 
-import secrets
-import sys
-import requests
-import json
-from datetime import datetime, timedelta
+import asyncio
+import time
+from datetime import datetime
 import os
+from collections import deque
+from functools import lru_cache
+from typing import List, Optional
+import httpx
 from dotenv import load_dotenv
 
+import email_templates
+
 load_dotenv()
 
 # Admin email (get from environment or use default)
@@ -21,378 +30,440 @@ RESEND_API_KEY = os.getenv("RESEND_API_KEY", "")
 SENDER_EMAIL = os.getenv("SENDER_EMAIL", "onboarding@resend.dev")
 SENDER_NAME = "EcoHarvest Farm"
 
-# Resend API endpoint
-RESEND_API_URL = "https://api.resend.com/emails"
+# Resend API endpoint (overridable to point at a local mock server)
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com/emails")
+
+# Resend batch endpoint and its per-request email limit
+RESEND_BATCH_API_URL = os.getenv("RESEND_BATCH_API_URL", f"{RESEND_API_URL}/batch")
+RESEND_BATCH_MAX_SIZE = int(os.getenv("RESEND_BATCH_MAX_SIZE", "100"))
+
+# Async transport configuration
+RESEND_MAX_CONNECTIONS = int(os.getenv("RESEND_MAX_CONNECTIONS", "20"))
+RESEND_MAX_CONCURRENCY = int(os.getenv("RESEND_MAX_CONCURRENCY", "20"))
+RESEND_TIMEOUT_SECONDS = float(os.getenv("RESEND_TIMEOUT_SECONDS", "10"))
+RESEND_CONNECT_TIMEOUT_SECONDS = float(os.getenv("RESEND_CONNECT_TIMEOUT_SECONDS", "5"))
+
+# Provider rate limit (API requests per second; 0 disables) and how many
+# requests may wait for a token or connection before new ones are refused
+RESEND_RATE_LIMIT_PER_SECOND = float(os.getenv("RESEND_RATE_LIMIT_PER_SECOND", "2"))
+RESEND_RATE_LIMIT_BURST = int(os.getenv("RESEND_RATE_LIMIT_BURST", "2"))
+RESEND_MAX_PENDING = int(os.getenv("RESEND_MAX_PENDING", "100"))
+
+
+def _resend_payload(to: str, subject: str, html: str, text: str = None) -> dict:
+    """Build the Resend API request body for one email."""
+    payload = {
+        "from": f"{SENDER_NAME} <{SENDER_EMAIL}>",
+        "to": to,
+        "subject": subject,
+        "html": html,
+    }
+    if text:
+        payload["text"] = text
+    return payload
+
 
-def send_email_via_resend(to: str, subject: str, html: str) -> bool:
+@lru_cache(maxsize=4096)
+def _format_time(appointment_time: datetime) -> str:
     """
-    Send email via Resend REST API
-    
-    Args:
-        to: Recipient email
-        subject: Email subject
-        html: HTML email body
-    
-    Returns:
-        bool: True if successful, False otherwise
+    Format an appointment time the way every email displays it.
+
+    Appointments start on a small set of slot times, so the formatted
+    strings are cached rather than re-running strftime per email.
     """
-    if not RESEND_API_KEY:
-        print(f"[WARNING] RESEND_API_KEY not set")
-        sys.stdout.flush()
-        return False
-    
-    try:
-        headers = {
-            "Authorization": f"Bearer {RESEND_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        
-        payload = {
-            "from": f"{SENDER_NAME} <{SENDER_EMAIL}>",
-            "to": to,
-            "subject": subject,
-            "html": html,
-        }
-        
-        print(f"[INFO] Sending email via Resend API to {to}")
-        sys.stdout.flush()
-        
-        response = requests.post(RESEND_API_URL, json=payload, headers=headers, timeout=10)
-        
-        if response.status_code in [200, 201]:
-            print(f"[OK] Email sent successfully to {to}")
-            print(f"[INFO] Resend response: {response.json()}")
-            sys.stdout.flush()
-            return True
-        else:
-            print(f"[ERROR] Resend API error: {response.status_code} - {response.text}")
-            sys.stdout.flush()
-            return False
-    
-    except Exception as e:
-        print(f"[ERROR] Failed to send email via Resend: {str(e)}")
-        sys.stdout.flush()
-        import traceback
-        traceback.print_exc()
-        sys.stdout.flush()
-        return False
+    return appointment_time.strftime('%B %d, %Y at %I:%M %p')
 
-# Debug: Print email configuration on startup
-print(f"[DEBUG] Email Configuration Loaded:")
-print(f"  SENDER_EMAIL: {SENDER_EMAIL}")
-print(f"  ADMIN_EMAIL: {ADMIN_EMAIL}")
-print(f"  RESEND_API_KEY: {'*' * 10 if RESEND_API_KEY else 'NOT SET'}")
-sys.stdout.flush()
 
-# Store reset tokens in memory (in production, use database)
-reset_tokens = {}
+class TransportBusy(Exception):
+    """Raised when the transport's pending queue is full."""
 
 
-def generate_reset_token(email: str) -> str:
-    """Generate a password reset token"""
-    token = secrets.token_urlsafe(32)
-    # Token expires in 24 hours
-    reset_tokens[token] = {
-        "email": email,
-        "expires_at": datetime.now() + timedelta(hours=24)
-    }
-    return token
+class TokenBucket:
+    """
+    Token-bucket rate limiter for provider API requests.
 
+    Each acquire reserves a token up front, letting the balance go negative,
+    so concurrent callers are spaced out in arrival order without a lock.
+    """
 
-def verify_reset_token(token: str) -> str:
-    """Verify reset token and return email if valid"""
-    if token not in reset_tokens:
-        return None
-    
-    token_data = reset_tokens[token]
-    if datetime.now() > token_data["expires_at"]:
-        del reset_tokens[token]
-        return None
-    
-    return token_data["email"]
+    def __init__(self, rate: float, burst: int):
+        """
+        Args:
+            rate: Tokens added per second (0 or less disables limiting)
+            burst: Maximum tokens that can accumulate while idle
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> float:
+        """
+        Take one token, waiting until it is available.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+
+        delay = -self._tokens / self.rate
+        await asyncio.sleep(delay)
+        return delay
+
+
+class _LatencyWindow:
+    """Recent latency samples (milliseconds) summarized for stats output."""
+
+    def __init__(self, size: int = 1000):
+        self._samples = deque(maxlen=size)
+        self.count = 0
+
+    def observe(self, milliseconds: float):
+        """Record one sample."""
+        self._samples.append(milliseconds)
+        self.count += 1
+
+    def summary(self) -> dict:
+        """Sample count with p50, p95 and max of the recent window."""
+        if not self._samples:
+            return {"count": self.count}
+        ordered = sorted(self._samples)
+        return {
+            "count": self.count,
+            "p50": round(ordered[len(ordered) // 2], 2),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+            "max": round(ordered[-1], 2),
+        }
 
 
-def send_password_reset_email(email: str, reset_link: str) -> bool:
+class ResendTransport:
     """
-    Send password reset email to client
-    
-    Args:
-        email: Client email address
-        reset_link: Password reset link
-    
-    Returns:
-        bool: True if successful, False otherwise
+    Async Resend client sharing one keep-alive connection pool.
+
+    Handles:
+    - Reusing TCP+TLS connections across emails
+    - Capping in-flight requests with a semaphore
+    - Pacing requests to the provider rate limit with a token bucket
+    - Refusing new requests (TransportBusy) once too many are waiting
+    - Connect and request timeouts
+    - Sending many emails in one batch API call
+    - Queue depth, wait time and send latency metrics
     """
-    try:
-        print(f"[INFO] Attempting to send password reset email to {email}")
-        sys.stdout.flush()
-        
-        html_body = f"""
-<html>
-<body style="font-family: Arial, sans-serif; color: #333;">
-<h2>🌾 Password Reset - EcoHarvest Farm</h2>
 
-<p>Dear Client,</p>
+    def __init__(
+        self,
+        api_url: str = RESEND_API_URL,
+        batch_api_url: str = RESEND_BATCH_API_URL,
+        max_connections: int = RESEND_MAX_CONNECTIONS,
+        max_concurrency: int = RESEND_MAX_CONCURRENCY,
+        timeout: float = RESEND_TIMEOUT_SECONDS,
+        connect_timeout: float = RESEND_CONNECT_TIMEOUT_SECONDS,
+        rate_limit: float = RESEND_RATE_LIMIT_PER_SECOND,
+        rate_limit_burst: int = RESEND_RATE_LIMIT_BURST,
+        max_pending: int = RESEND_MAX_PENDING,
+    ):
+        self.api_url = api_url
+        self.batch_api_url = batch_api_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_limit, rate_limit_burst)
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Metrics
+        self.pending = 0
+        self.rejected = 0
+        self._wait_ms = _LatencyWindow()
+        self._send_ms = _LatencyWindow()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the pooled client on first use (inside the running loop)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                headers={
+                    "Authorization": f"Bearer {RESEND_API_KEY}",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._client
+
+    async def send(
+        self, to: str, subject: str, html: str, idempotency_key: str = None, text: str = None
+    ) -> bool:
+        """
+        Send one email over the shared connection pool.
 
-<p>We received a request to reset your password for your EcoHarvest Farm account.</p>
+        Args:
+            to: Recipient email
+            subject: Email subject
+            html: HTML email body
+            text: Optional plain-text alternative
+            idempotency_key: Optional key so retried sends are delivered only once
 
-<p>Click the link below to reset your password (valid for 24 hours):</p>
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not RESEND_API_KEY:
+            print(f"[WARNING] RESEND_API_KEY not set")
+            return False
 
-<p><a href="{reset_link}" style="background-color: #4CAF50; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; display: inline-block;">Reset Password</a></p>
+        delivered = await self._post(
+            self.api_url, _resend_payload(to, subject, html, text), idempotency_key
+        )
+        if delivered:
+            print(f"[OK] Email sent successfully to {to}")
+        return delivered
+
+    async def send_batch(self, messages: List[dict], idempotency_key: str = None) -> bool:
+        """
+        Send up to RESEND_BATCH_MAX_SIZE emails in one batch API call.
 
-<p>If you didn't request this, please ignore this email.</p>
+        The batch is accepted or rejected as a whole.
 
-<p>Best regards,<br>EcoHarvest Farm Team<br>🌾 Sustainable Farming Consultation Services</p>
-</body>
-</html>
+        Args:
+            messages: Messages with to, subject, html and optional text keys
+            idempotency_key: Optional key so a retried batch is delivered only once
+
+        Returns:
+            bool: True if the whole batch was accepted, False otherwise
         """
-        
-        return send_email_via_resend(
-            to=email,
-            subject="🌾 Password Reset - EcoHarvest Farm",
-            html=html_body,
+        if len(messages) > RESEND_BATCH_MAX_SIZE:
+            raise ValueError(f"At most {RESEND_BATCH_MAX_SIZE} emails per batch")
+        if not RESEND_API_KEY:
+            print(f"[WARNING] RESEND_API_KEY not set")
+            return False
+
+        delivered = await self._post(
+            self.batch_api_url,
+            [_resend_payload(**message) for message in messages],
+            idempotency_key,
         )
+        if delivered:
+            print(f"[OK] Batch of {len(messages)} emails sent successfully")
+        return delivered
 
-    except Exception as e:
-        print(f"[ERROR] Failed to send password reset email to {email}: {str(e)}")
-        sys.stdout.flush()
-        import traceback
-        traceback.print_exc()
-        sys.stdout.flush()
+    def capacity(self) -> int:
+        """Number of further requests that can queue before TransportBusy."""
+        return max(0, self.max_pending - self.pending)
+
+    async def _post(self, url: str, payload, idempotency_key: str = None) -> bool:
+        """
+        POST a JSON payload to Resend over the pooled client.
+
+        Raises:
+            TransportBusy: If max_pending requests are already queued or in flight
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise TransportBusy(f"{self.pending} Resend requests already pending")
+
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        queued_at = time.perf_counter()
+        self.pending += 1
+        try:
+            await self._bucket.acquire()
+            async with self._semaphore:
+                sent_at = time.perf_counter()
+                self._wait_ms.observe((sent_at - queued_at) * 1000)
+                try:
+                    response = await self._get_client().post(
+                        url, json=payload, headers=headers
+                    )
+                finally:
+                    self._send_ms.observe((time.perf_counter() - sent_at) * 1000)
+        except httpx.HTTPError as e:
+            print(f"[ERROR] Failed to send email via Resend: {type(e).__name__} {str(e)}")
+            return False
+        finally:
+            self.pending -= 1
+
+        if response.status_code in [200, 201]:
+            return True
+
+        print(f"[ERROR] Resend API error: {response.status_code} - {response.text}")
         return False
 
+    async def aclose(self):
+        """Close pooled connections. Called on application shutdown."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        """
+        Get transport metrics.
+
+        Returns:
+            dict: Queue depth, refusals, queue wait and send latency (ms)
+        """
+        return {
+            "queue_depth": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "rate_limit_per_second": self._bucket.rate,
+            "wait_ms": self._wait_ms.summary(),
+            "send_latency_ms": self._send_ms.summary(),
+        }
+
+
+# Shared transport used by the email outbox dispatcher
+resend_transport = ResendTransport()
+
+
+def build_password_reset_email(email: str, reset_link: str) -> dict:
+    """
+    Render the password reset email.
+
+    Args:
+        email: Client email address
+        reset_link: Password reset link
+
+    Returns:
+        dict: Message with to, subject, html and text keys
+    """
+    message = email_templates.password_reset(reset_link)
+    message["to"] = email
+    return message
+
 
-def send_appointment_cancellation_email(
+def build_appointment_cancellation_email(
     client_email: str,
     client_name: str,
     appointment_time: datetime,
     cancellation_reason: str
-) -> bool:
+) -> dict:
     """
-    Send appointment cancellation email to client
-    
+    Render the appointment cancellation email.
+
     Args:
         client_email: Client email address
         client_name: Client name
         appointment_time: Original appointment time
         cancellation_reason: Reason for cancellation
-    
+
     Returns:
-        bool: True if successful, False otherwise
+        dict: Message with to, subject, html and text keys
     """
-    try:
-        print(f"[INFO] Attempting to send cancellation email to {client_email}")
-        sys.stdout.flush()
-        
-        formatted_time = appointment_time.strftime('%B %d, %Y at %I:%M %p')
-        
-        html_body = f"""
-<html>
-<body style="font-family: Arial, sans-serif; color: #333;">
-<h2>🌾 Appointment Cancellation - EcoHarvest Farm</h2>
-
-<p>Dear {client_name},</p>
-
-<p>We regret to inform you that your consultation appointment has been cancelled.</p>
-
-<h3>Appointment Details:</h3>
-<ul>
-<li><strong>Date & Time:</strong> {formatted_time}</li>
-<li><strong>Status:</strong> ❌ Cancelled</li>
-</ul>
-
-<h3>Reason for Cancellation:</h3>
-<p>{cancellation_reason}</p>
-
-<h3>Refund Policy:</h3>
-<p>✅ You will receive a full refund as per our terms and conditions.</p>
-
-<h3>Next Steps:</h3>
-<p>Please visit our website to book a new consultation at your convenience.<br>We look forward to serving you soon!</p>
-
-<p>Best regards,<br>EcoHarvest Farm Team<br>🌾 Sustainable Farming Consultation Services</p>
-</body>
-</html>
-        """
-        
-        return send_email_via_resend(
-            to=client_email,
-            subject="🌾 Appointment Cancellation - EcoHarvest Farm",
-            html=html_body,
-        )
+    message = email_templates.appointment_cancellation(
+        client_name, _format_time(appointment_time), cancellation_reason
+    )
+    message["to"] = client_email
+    return message
 
-    except Exception as e:
-        print(f"[ERROR] Failed to send cancellation email: {str(e)}")
-        sys.stdout.flush()
-        import traceback
-        traceback.print_exc()
-        sys.stdout.flush()
-        return False
 
+def build_appointment_reminder_email(
+    client_email: str,
+    client_name: str,
+    appointment_time: datetime,
+    time_until: str,
+) -> dict:
+    """
+    Render the appointment reminder email.
+
+    Args:
+        client_email: Client email address
+        client_name: Client name
+        appointment_time: Appointment date and time
+        time_until: How far away the appointment is (e.g. "in 24 hours")
+
+    Returns:
+        dict: Message with to, subject, html and text keys
+    """
+    message = email_templates.appointment_reminder(
+        client_name, _format_time(appointment_time), time_until
+    )
+    message["to"] = client_email
+    return message
 
-def send_admin_appointment_notification(
+
+def build_admin_appointment_notification(
     client_name: str,
     client_email: str,
     client_phone: str,
     appointment_time: datetime,
     notes: str = None
-) -> bool:
+) -> dict:
     """
-    Send appointment notification email to admin
-    
+    Render the new-appointment notification email for the admin.
+
     Args:
         client_name: Client name
         client_email: Client email
         client_phone: Client phone
         appointment_time: Appointment time
         notes: Optional appointment notes
-    
+
     Returns:
-        bool: True if successful, False otherwise
+        dict: Message with to, subject, html and text keys
     """
-    try:
-        print(f"[INFO] Attempting to send admin notification to {ADMIN_EMAIL}")
-        sys.stdout.flush()
-        
-        formatted_time = appointment_time.strftime('%B %d, %Y at %I:%M %p')
-        notes_section = f"\nNotes:\n{notes}" if notes else ""
-        
-        # Log the appointment details
-        log_message = f"""
-[APPOINTMENT NOTIFICATION]
-Client: {client_name}
-Email: {client_email}
-Phone: {client_phone}
-Date & Time: {formatted_time}
-{notes_section}
-"""
-        print(log_message)
-        sys.stdout.flush()
-        
-        # Send email via Resend REST API
-        html_body = f"""
-<html>
-<body style="font-family: Arial, sans-serif; color: #333;">
-<h2>🌾 New Appointment Booking - {client_name}</h2>
-
-<p>A new appointment has been booked!</p>
-
-<h3>Client Details:</h3>
-<ul>
-<li><strong>Name:</strong> {client_name}</li>
-<li><strong>Email:</strong> {client_email}</li>
-<li><strong>Phone:</strong> {client_phone}</li>
-</ul>
-
-<h3>Appointment Details:</h3>
-<ul>
-<li><strong>Date & Time:</strong> {formatted_time}</li>
-<li><strong>Duration:</strong> 1 Hour</li>
-<li><strong>Status:</strong> Confirmed</li>
-{f'<li><strong>Notes:</strong> {notes}</li>' if notes else ''}
-</ul>
-
-<p><strong>Action Required:</strong> Please review the appointment details and prepare for the consultation.</p>
-
-<p>Best regards,<br>EcoHarvest Farm System<br>🌾 Sustainable Farming Consultation Services</p>
-</body>
-</html>
-"""
-        
-        return send_email_via_resend(
-            to=ADMIN_EMAIL,
-            subject=f"🌾 New Appointment Booking - {client_name}",
-            html=html_body,
-        )
+    message = email_templates.admin_appointment_notification(
+        client_name, client_email, client_phone, _format_time(appointment_time), notes
+    )
+    message["to"] = ADMIN_EMAIL
+    return message
 
-    except Exception as e:
-        print(f"[ERROR] Failed to send admin notification: {str(e)}")
-        sys.stdout.flush()
-        import traceback
-        traceback.print_exc()
-        sys.stdout.flush()
-        return False
 
+def build_admin_appointment_digest(bookings: List[dict]) -> dict:
+    """
+    Render one admin email summarizing several new bookings.
+
+    Args:
+        bookings: Keyword arguments of the coalesced admin notifications
+            (client_name, client_email, client_phone, appointment_time, notes)
 
-def send_appointment_confirmation_email(
+    Returns:
+        dict: Message with to, subject, html and text keys
+    """
+    rows = [
+        (
+            _format_time(booking["appointment_time"]),
+            booking["client_name"],
+            booking["client_email"],
+            booking.get("client_phone") or "Not provided",
+            booking.get("notes") or "",
+        )
+        for booking in sorted(bookings, key=lambda b: b["appointment_time"])
+    ]
+    message = email_templates.admin_appointment_digest(rows)
+    message["to"] = ADMIN_EMAIL
+    return message
+
+
+def build_appointment_confirmation_email(
     client_email: str,
     client_name: str,
     appointment_time: datetime,
     notes: str = None
-) -> bool:
+) -> dict:
     """
-    Send appointment confirmation email to client
-    
+    Render the appointment confirmation email.
+
     Args:
         client_email: Client email address
         client_name: Client name
         appointment_time: Appointment time
         notes: Optional appointment notes
-    
+
     Returns:
-        bool: True if successful, False otherwise
+        dict: Message with to, subject, html and text keys
     """
-    try:
-        print(f"[INFO] Attempting to send confirmation email to {client_email}")
-        sys.stdout.flush()
-        
-        formatted_time = appointment_time.strftime('%B %d, %Y at %I:%M %p')
-        notes_section = f"<li><strong>Special Requests/Notes:</strong> {notes}</li>" if notes else ""
-        
-        # Log the confirmation details
-        log_message = f"""
-[APPOINTMENT CONFIRMATION]
-Client: {client_name}
-Email: {client_email}
-Date & Time: {formatted_time}
-"""
-        print(log_message)
-        sys.stdout.flush()
-        
-        # Send email via Resend REST API
-        html_body = f"""
-<html>
-<body style="font-family: Arial, sans-serif; color: #333;">
-<h2>🌾 Appointment Confirmation - EcoHarvest Farm</h2>
-
-<p>Dear {client_name},</p>
-
-<p>Thank you for booking a consultation with EcoHarvest Farm!</p>
-
-<h3>Appointment Details:</h3>
-<ul>
-<li><strong>Date & Time:</strong> {formatted_time}</li>
-<li><strong>Duration:</strong> 1 Hour</li>
-<li><strong>Status:</strong> Confirmed</li>
-<li><strong>Client Email:</strong> {client_email}</li>
-{notes_section}
-</ul>
-
-<h3>Important Information:</h3>
-<ul>
-<li>Please arrive 5 minutes early</li>
-<li>If you need to reschedule, contact us at least 24 hours in advance</li>
-<li>20% cancellation fee applies for client-initiated cancellations</li>
-</ul>
-
-<p>We look forward to discussing your farming consultation needs!</p>
-
-<p>Best regards,<br>EcoHarvest Farm Team<br>🌾 Sustainable Farming Consultation Services</p>
-</body>
-</html>
-        """
-        
-        # Send confirmation email to client
-        return send_email_via_resend(
-            to=client_email,
-            subject="🌾 Appointment Confirmation - EcoHarvest Farm",
-            html=html_body,
-        )
-
-    except Exception as e:
-        print(f"[ERROR] Failed to send confirmation email to {client_email}: {str(e)}")
-        sys.stdout.flush()
-        import traceback
-        traceback.print_exc()
-        sys.stdout.flush()
-        return False
+    message = email_templates.appointment_confirmation(
+        client_name, client_email, _format_time(appointment_time), notes
+    )
+    message["to"] = client_email
+    return message
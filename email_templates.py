@@ -0,0 +1,464 @@
+"""
+Email Templates
+
+This module handles:
+- Rendering each email as one HTML f-string and one plain-text f-string
+- Caching shared fragments (layout header and footers)
+- Escaping per-recipient fields in the HTML rendering
+- Deriving plain text from HTML, which keeps every text alternative in
+  step with its HTML body (checked by tests/test_email_templates.py)
+
+Each email is a function taking its field values and returning the
+subject, HTML and text. The bodies are f-strings, so CPython builds each
+one in a single step with no template parsing or per-field lookups; the
+cached header and footer are interpolated like any other field. Field
+values are HTML-escaped in the HTML rendering and inserted verbatim in
+the text rendering.
+"""
+
+import html
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+
+def _escape(value: str) -> str:
+    """HTML-escape a field value, skipping the work for plain strings."""
+    if "&" in value or "<" in value or ">" in value or '"' in value or "'" in value:
+        return html.escape(value)
+    return value
+
+
+# HTML-to-text rules for deriving a text alternative from an HTML body
+_TEXT_RULES = (
+    (re.compile(r'<a href="([^"]*)"[^>]*>(.*?)</a>', re.S), r"\2: \1"),
+    (re.compile(r"<br\s*/?>"), "\n"),
+    (re.compile(r"<li>"), "- "),
+    (re.compile(r"</?ul>\n?"), ""),
+    (re.compile(r"</li>\n?"), "\n"),
+    (re.compile(r"</(p|h2|h3|tr)>"), "\n"),
+    (re.compile(r"</t[dh]>\s*"), " | "),
+    (re.compile(r"<[^>]+>"), ""),
+    (re.compile(r"[ \t]+\n"), "\n"),
+    (re.compile(r"\n{3,}"), "\n\n"),
+)
+
+
+def html_to_text(source: str) -> str:
+    """
+    Derive plain text from an HTML email body.
+
+    Args:
+        source: HTML body
+
+    Returns:
+        str: Plain-text rendering
+    """
+    text = source
+    for pattern, replacement in _TEXT_RULES:
+        text = pattern.sub(replacement, text)
+    return html.unescape(text).strip() + "\n"
+
+
+# ============================================================================
+# SHARED FRAGMENTS
+# ============================================================================
+
+_PAGE_OPEN = '<html>\n<body style="font-family: Arial, sans-serif; color: #333;">\n'
+_TAGLINE = "🌾 Sustainable Farming Consultation Services"
+
+
+@lru_cache(maxsize=None)
+def layout_header(title: str) -> str:
+    """Opening markup shared by every email, with its heading."""
+    return f"{_PAGE_OPEN}<h2>🌾 {title}</h2>\n"
+
+
+@lru_cache(maxsize=None)
+def layout_footer(signature: str = "EcoHarvest Farm Team") -> str:
+    """Closing signature and markup shared by every email."""
+    return f"<p>Best regards,<br>{signature}<br>{_TAGLINE}</p>\n</body>\n</html>\n"
+
+
+@lru_cache(maxsize=None)
+def text_footer(signature: str = "EcoHarvest Farm Team") -> str:
+    """Closing signature of every plain-text alternative."""
+    return f"Best regards,\n{signature}\n{_TAGLINE}\n"
+
+
+_CLIENT_FOOTER = layout_footer()
+_CLIENT_TEXT_FOOTER = text_footer()
+_SYSTEM_FOOTER = layout_footer("EcoHarvest Farm System")
+_SYSTEM_TEXT_FOOTER = text_footer("EcoHarvest Farm System")
+
+_PASSWORD_RESET_HEADER = layout_header("Password Reset - EcoHarvest Farm")
+_CANCELLATION_HEADER = layout_header("Appointment Cancellation - EcoHarvest Farm")
+_CONFIRMATION_HEADER = layout_header("Appointment Confirmation - EcoHarvest Farm")
+_REMINDER_HEADER = layout_header("Appointment Reminder - EcoHarvest Farm")
+
+_RESET_BUTTON_STYLE = (
+    "background-color: #4CAF50; color: white; padding: 10px 20px; "
+    "text-decoration: none; border-radius: 5px; display: inline-block;"
+)
+_DIGEST_CELL = '<td style="padding: 6px; border-bottom: 1px solid #ddd;">'
+_DIGEST_HEADING = '<th style="padding: 6px; text-align: left;">'
+
+
+# ============================================================================
+# TEMPLATES
+# ============================================================================
+
+
+def password_reset(reset_link: str) -> dict:
+    """
+    Render the password reset email.
+
+    Args:
+        reset_link: Password reset link
+
+    Returns:
+        dict: Message with subject, html and text keys
+    """
+    return {
+        "subject": "🌾 Password Reset - EcoHarvest Farm",
+        "html": f"""{_PASSWORD_RESET_HEADER}
+<p>Dear Client,</p>
+
+<p>We received a request to reset your password for your EcoHarvest Farm account.</p>
+
+<p>Click the link below to reset your password (valid for 24 hours):</p>
+
+<p><a href="{_escape(reset_link)}" style="{_RESET_BUTTON_STYLE}">Reset Password</a></p>
+
+<p>If you didn't request this, please ignore this email.</p>
+
+{_CLIENT_FOOTER}""",
+        "text": f"""🌾 Password Reset - EcoHarvest Farm
+
+Dear Client,
+
+We received a request to reset your password for your EcoHarvest Farm account.
+
+Click the link below to reset your password (valid for 24 hours):
+
+Reset Password: {reset_link}
+
+If you didn't request this, please ignore this email.
+
+{_CLIENT_TEXT_FOOTER}""",
+    }
+
+
+def appointment_cancellation(
+    client_name: str, formatted_time: str, cancellation_reason: str
+) -> dict:
+    """
+    Render the appointment cancellation email.
+
+    Args:
+        client_name: Client name
+        formatted_time: Original appointment time, already formatted
+        cancellation_reason: Reason for cancellation
+
+    Returns:
+        dict: Message with subject, html and text keys
+    """
+    return {
+        "subject": "🌾 Appointment Cancellation - EcoHarvest Farm",
+        "html": f"""{_CANCELLATION_HEADER}
+<p>Dear {_escape(client_name)},</p>
+
+<p>We regret to inform you that your consultation appointment has been cancelled.</p>
+
+<h3>Appointment Details:</h3>
+<ul>
+<li><strong>Date & Time:</strong> {formatted_time}</li>
+<li><strong>Status:</strong> ❌ Cancelled</li>
+</ul>
+
+<h3>Reason for Cancellation:</h3>
+<p>{_escape(cancellation_reason)}</p>
+
+<h3>Refund Policy:</h3>
+<p>✅ You will receive a full refund as per our terms and conditions.</p>
+
+<h3>Next Steps:</h3>
+<p>Please visit our website to book a new consultation at your convenience.<br>We look forward to serving you soon!</p>
+
+{_CLIENT_FOOTER}""",
+        "text": f"""🌾 Appointment Cancellation - EcoHarvest Farm
+
+Dear {client_name},
+
+We regret to inform you that your consultation appointment has been cancelled.
+
+Appointment Details:
+
+- Date & Time: {formatted_time}
+- Status: ❌ Cancelled
+
+Reason for Cancellation:
+
+{cancellation_reason}
+
+Refund Policy:
+
+✅ You will receive a full refund as per our terms and conditions.
+
+Next Steps:
+
+Please visit our website to book a new consultation at your convenience.
+We look forward to serving you soon!
+
+{_CLIENT_TEXT_FOOTER}""",
+    }
+
+
+def appointment_reminder(client_name: str, formatted_time: str, time_until: str) -> dict:
+    """
+    Render the appointment reminder email.
+
+    Args:
+        client_name: Client name
+        formatted_time: Appointment time, already formatted
+        time_until: How far away the appointment is (e.g. "in 24 hours")
+
+    Returns:
+        dict: Message with subject, html and text keys
+    """
+    return {
+        "subject": f"🌾 Reminder: Your Consultation {time_until} - EcoHarvest Farm",
+        "html": f"""{_REMINDER_HEADER}
+<p>Dear {_escape(client_name)},</p>
+
+<p>This is a friendly reminder that your consultation with EcoHarvest Farm is {_escape(time_until)}.</p>
+
+<h3>Appointment Details:</h3>
+<ul>
+<li><strong>Date & Time:</strong> {formatted_time}</li>
+<li><strong>Duration:</strong> 1 Hour</li>
+</ul>
+
+<p>Please arrive 5 minutes early. If you can no longer attend, let us know as soon as possible.</p>
+
+{_CLIENT_FOOTER}""",
+        "text": f"""🌾 Appointment Reminder - EcoHarvest Farm
+
+Dear {client_name},
+
+This is a friendly reminder that your consultation with EcoHarvest Farm is {time_until}.
+
+Appointment Details:
+
+- Date & Time: {formatted_time}
+- Duration: 1 Hour
+
+Please arrive 5 minutes early. If you can no longer attend, let us know as soon as possible.
+
+{_CLIENT_TEXT_FOOTER}""",
+    }
+
+
+def admin_appointment_notification(
+    client_name: str,
+    client_email: str,
+    client_phone: Optional[str],
+    formatted_time: str,
+    notes: Optional[str] = None,
+) -> dict:
+    """
+    Render the new-appointment notification email for the admin.
+
+    Args:
+        client_name: Client name
+        client_email: Client email
+        client_phone: Client phone
+        formatted_time: Appointment time, already formatted
+        notes: Optional appointment notes
+
+    Returns:
+        dict: Message with subject, html and text keys
+    """
+    name = _escape(client_name)
+    phone = client_phone or ""
+    if notes:
+        notes_html = f"<li><strong>Notes:</strong> {_escape(notes)}</li>\n"
+        notes_text = f"- Notes: {notes}\n"
+    else:
+        notes_html = notes_text = ""
+    return {
+        "subject": f"🌾 New Appointment Booking - {client_name}",
+        "html": f"""{_PAGE_OPEN}<h2>🌾 New Appointment Booking - {name}</h2>
+
+<p>A new appointment has been booked!</p>
+
+<h3>Client Details:</h3>
+<ul>
+<li><strong>Name:</strong> {name}</li>
+<li><strong>Email:</strong> {_escape(client_email)}</li>
+<li><strong>Phone:</strong> {_escape(phone)}</li>
+</ul>
+
+<h3>Appointment Details:</h3>
+<ul>
+<li><strong>Date & Time:</strong> {formatted_time}</li>
+<li><strong>Duration:</strong> 1 Hour</li>
+<li><strong>Status:</strong> Confirmed</li>
+{notes_html}</ul>
+
+<p><strong>Action Required:</strong> Please review the appointment details and prepare for the consultation.</p>
+
+{_SYSTEM_FOOTER}""",
+        "text": f"""🌾 New Appointment Booking - {client_name}
+
+A new appointment has been booked!
+
+Client Details:
+
+- Name: {client_name}
+- Email: {client_email}
+- Phone: {phone}
+
+Appointment Details:
+
+- Date & Time: {formatted_time}
+- Duration: 1 Hour
+- Status: Confirmed
+{notes_text}
+Action Required: Please review the appointment details and prepare for the consultation.
+
+{_SYSTEM_TEXT_FOOTER}""",
+    }
+
+
+def appointment_confirmation(
+    client_name: str,
+    client_email: str,
+    formatted_time: str,
+    notes: Optional[str] = None,
+) -> dict:
+    """
+    Render the appointment confirmation email.
+
+    Args:
+        client_name: Client name
+        client_email: Client email
+        formatted_time: Appointment time, already formatted
+        notes: Optional appointment notes
+
+    Returns:
+        dict: Message with subject, html and text keys
+    """
+    if notes:
+        notes_html = f"<li><strong>Special Requests/Notes:</strong> {_escape(notes)}</li>\n"
+        notes_text = f"- Special Requests/Notes: {notes}\n"
+    else:
+        notes_html = notes_text = ""
+    return {
+        "subject": "🌾 Appointment Confirmation - EcoHarvest Farm",
+        "html": f"""{_CONFIRMATION_HEADER}
+<p>Dear {_escape(client_name)},</p>
+
+<p>Thank you for booking a consultation with EcoHarvest Farm!</p>
+
+<h3>Appointment Details:</h3>
+<ul>
+<li><strong>Date & Time:</strong> {formatted_time}</li>
+<li><strong>Duration:</strong> 1 Hour</li>
+<li><strong>Status:</strong> Confirmed</li>
+<li><strong>Client Email:</strong> {_escape(client_email)}</li>
+{notes_html}</ul>
+
+<h3>Important Information:</h3>
+<ul>
+<li>Please arrive 5 minutes early</li>
+<li>If you need to reschedule, contact us at least 24 hours in advance</li>
+<li>20% cancellation fee applies for client-initiated cancellations</li>
+</ul>
+
+<p>We look forward to discussing your farming consultation needs!</p>
+
+{_CLIENT_FOOTER}""",
+        "text": f"""🌾 Appointment Confirmation - EcoHarvest Farm
+
+Dear {client_name},
+
+Thank you for booking a consultation with EcoHarvest Farm!
+
+Appointment Details:
+
+- Date & Time: {formatted_time}
+- Duration: 1 Hour
+- Status: Confirmed
+- Client Email: {client_email}
+{notes_text}
+Important Information:
+
+- Please arrive 5 minutes early
+- If you need to reschedule, contact us at least 24 hours in advance
+- 20% cancellation fee applies for client-initiated cancellations
+
+We look forward to discussing your farming consultation needs!
+
+{_CLIENT_TEXT_FOOTER}""",
+    }
+
+
+def admin_appointment_digest(rows: List[Tuple[str, str, str, str, str]]) -> dict:
+    """
+    Render one admin email summarizing several new bookings.
+
+    Args:
+        rows: (formatted_time, client_name, client_email, client_phone, notes)
+            per booking, in display order
+
+    Returns:
+        dict: Message with subject, html and text keys
+    """
+    html_rows = []
+    text_rows = []
+    for formatted_time, client_name, client_email, client_phone, notes in rows:
+        html_rows.append(
+            f"<tr>\n"
+            f"{_DIGEST_CELL}{formatted_time}</td>\n"
+            f"{_DIGEST_CELL}{_escape(client_name)}</td>\n"
+            f"{_DIGEST_CELL}{_escape(client_email)}</td>\n"
+            f"{_DIGEST_CELL}{_escape(client_phone)}</td>\n"
+            f"{_DIGEST_CELL}{_escape(notes)}</td>\n"
+            f"</tr>"
+        )
+        text_rows.append(
+            f"- {formatted_time}: {client_name} <{client_email}>, phone {client_phone} {notes}\n"
+        )
+    rows_html = "\n".join(html_rows)
+    rows_text = "".join(text_rows)
+    count = len(rows)
+    return {
+        "subject": f"🌾 {count} New Appointment Bookings",
+        "html": f"""{_PAGE_OPEN}<h2>🌾 {count} New Appointment Bookings</h2>
+
+<p>The following appointments were booked since the last summary:</p>
+
+<table style="border-collapse: collapse;">
+<tr>
+{_DIGEST_HEADING}Date & Time</th>
+{_DIGEST_HEADING}Client</th>
+{_DIGEST_HEADING}Email</th>
+{_DIGEST_HEADING}Phone</th>
+{_DIGEST_HEADING}Notes</th>
+</tr>
+{rows_html}
+</table>
+
+<p><strong>Action Required:</strong> Please review the appointment details and prepare for the consultations.</p>
+
+{_SYSTEM_FOOTER}""",
+        "text": f"""🌾 {count} New Appointment Bookings
+
+The following appointments were booked since the last summary:
+
+{rows_text}
+Action Required: Please review the appointment details and prepare for the consultations.
+
+{_SYSTEM_TEXT_FOOTER}""",
+    }
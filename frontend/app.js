@@ -839,6 +839,7 @@ const app = createApp({
         const showTermsModal = ref(false);
         const isLoggedIn = ref(false);
         const currentUser = ref(null);
+        const accessToken = ref(null);
         const showRegister = ref(false);
         const authLoading = ref(false);
         const adminCalendarView = ref('upcoming');
@@ -1048,12 +1049,31 @@ const app = createApp({
             }
         };
 
+        const applySlotUpdate = (update) => {
+            // Patch only the slots that changed for the date being viewed
+            if (update.date !== selectedDate.value) return;
+            const changed = {};
+            update.slots.forEach(slot => { changed[slot.time] = slot; });
+            availableSlots.value = availableSlots.value.map(slot => changed[slot.time] || slot);
+            if (changed[bookingForm.appointment_time] && !changed[bookingForm.appointment_time].is_available) {
+                bookingForm.appointment_time = '';
+            }
+        };
+
         const connectWebSocket = () => {
             try {
                 ws = new WebSocket(WS_URL);
                 ws.onopen = () => console.log('WebSocket connected');
                 ws.onmessage = (event) => {
                     const notification = JSON.parse(event.data);
+                    if (notification.type === 'ping') {
+                        ws.send(JSON.stringify({ type: 'pong' }));
+                        return;
+                    }
+                    if (notification.type === 'slots_update') {
+                        applySlotUpdate(notification);
+                        return;
+                    }
                     notifications.value.unshift(notification);
                     unreadCount.value += 1;
                     loadCalendar();
@@ -1184,6 +1204,7 @@ const app = createApp({
 
                 const data = await response.json();
                 currentUser.value = data.user;
+                accessToken.value = data.access_token;
                 isLoggedIn.value = true;
                 authSuccess.value = showRegister.value ? 'Account created successfully!' : 'Logged in successfully!';
                 authForm.name = '';
@@ -1203,15 +1224,23 @@ const app = createApp({
         const logoutClient = () => {
             isLoggedIn.value = false;
             currentUser.value = null;
+            accessToken.value = null;
             activeTab.value = 'booking';
             upcomingAppointments.value = [];
             appointmentHistory.value = [];
         };
 
         const loadUserAppointments = async () => {
-            if (!currentUser.value) return;
+            if (!currentUser.value || !accessToken.value) return;
             try {
-                const response = await fetch(`${API_BASE_URL}/appointments?email=${currentUser.value.email}`);
+                const response = await fetch(`${API_BASE_URL}/me/appointments`, {
+                    headers: { 'Authorization': `Bearer ${accessToken.value}` }
+                });
+                if (response.status === 401) {
+                    // Token expired: sign out so the client logs in again
+                    logoutClient();
+                    return;
+                }
                 if (!response.ok) throw new Error('Failed to fetch appointments');
                 const appointments = await response.json();
                 
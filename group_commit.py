@@ -0,0 +1,203 @@
+"""
+Group Commit for Bookings
+
+This module handles:
+- Collecting concurrent booking writes for a short window
+- Running each booking in its own SAVEPOINT inside one shared transaction
+- Committing the whole group at once, so a group pays for one fsync
+- Returning each caller its own result, or its own error
+
+A booking that fails (for example a slot conflict) rolls back only its
+savepoint; the rest of the group still commits. If the commit itself
+fails, every caller in the group gets that error.
+
+Off by default (BOOKING_GROUP_COMMIT=false): each booking then commits in
+its own request transaction. Not available on in-memory SQLite.
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal, IS_MEMORY_SQLITE
+
+BOOKING_GROUP_COMMIT = os.getenv("BOOKING_GROUP_COMMIT", "false").lower() == "true"
+# How long the first booking of a group waits for others to join
+BOOKING_GROUP_COMMIT_WINDOW_MS = float(os.getenv("BOOKING_GROUP_COMMIT_WINDOW_MS", "5"))
+# Bookings committed together at most
+BOOKING_GROUP_COMMIT_MAX_BATCH = int(os.getenv("BOOKING_GROUP_COMMIT_MAX_BATCH", "32"))
+
+Work = Callable[[AsyncSession], Awaitable[Any]]
+
+# How long shutdown waits for the group being committed before cancelling the loop
+_SHUTDOWN_TIMEOUT_SECONDS = 10
+
+
+class GroupCommitter:
+    """
+    Background task committing queued writes in groups.
+
+    Handles:
+    - Queueing units of work submitted by requests
+    - Gathering a group for up to `window_ms`, or until `max_batch` units
+    - Isolating each unit in a SAVEPOINT
+    - Resolving each caller's future after the group commits
+    """
+
+    def __init__(
+        self,
+        enabled: bool = BOOKING_GROUP_COMMIT,
+        window_ms: float = BOOKING_GROUP_COMMIT_WINDOW_MS,
+        max_batch: int = BOOKING_GROUP_COMMIT_MAX_BATCH,
+    ):
+        self.enabled = enabled
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Counters
+        self.groups = 0
+        self.grouped = 0
+        self.committed = 0
+        self.failed = 0
+        self.largest_group = 0
+
+    def start(self):
+        """Start the commit loop if group commit is enabled. Called on application startup."""
+        if self.enabled and IS_MEMORY_SQLITE:
+            # Savepoints need a connection of their own per transaction
+            print("[WARNING] Group commit is not supported on in-memory SQLite, disabling it")
+            self.enabled = False
+        if self.enabled and self._task is None:
+            self._stopping = False
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        """
+        Stop the commit loop, failing any work still queued.
+
+        The loop commits the group it is gathering and exits on its own; it
+        is only cancelled if that takes longer than the shutdown timeout.
+        """
+        if self._task is not None:
+            self._stopping = True
+            # Wakes the loop if it is waiting for work
+            self._queue.put_nowait(None)
+            try:
+                async with asyncio.timeout(_SHUTDOWN_TIMEOUT_SECONDS):
+                    await self._task
+            except TimeoutError:
+                print("[WARNING] Group committer did not stop in time, cancelled it")
+            self._task = None
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not None and not item[1].done():
+                    item[1].set_exception(RuntimeError("Group committer shut down"))
+
+    async def submit(self, work: Work) -> Any:
+        """
+        Run a unit of work in the next group and wait for the group to commit.
+
+        Args:
+            work: Coroutine function taking the group's session; it must not
+                commit, and should only touch the database through that session
+
+        Returns:
+            Any: What `work` returned, once its writes are committed
+
+        Raises:
+            Exception: Whatever `work` raised (its writes are rolled back),
+                or the error that made the group's commit fail
+        """
+        if self._task is None or self._stopping:
+            raise RuntimeError("Group commit is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((work, future))
+        return await future
+
+    async def _run(self):
+        """Gather and commit groups until shut down."""
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            item = await self._queue.get()
+            if item is None:
+                break  # Shutdown marker
+            group = [item]
+            deadline = loop.time() + self.window
+            while len(group) < self.max_batch:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        async with asyncio.timeout(timeout):
+                            item = await self._queue.get()
+                    except TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is None:
+                    break  # Shutdown marker: commit what was gathered
+                group.append(item)
+            await self._commit(group)
+
+    async def _commit(self, group: List[Tuple[Work, asyncio.Future]]):
+        """Run every unit in its own savepoint, commit once, then resolve the callers."""
+        outcomes = []
+        try:
+            async with AsyncSessionLocal() as session:
+                for work, future in group:
+                    if future.cancelled():
+                        continue  # Caller went away before its turn
+                    try:
+                        async with session.begin_nested():
+                            result = await work(session)
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+                    else:
+                        outcomes.append((future, result, None))
+                await session.commit()
+        except Exception as e:
+            print(f"[ERROR] Group commit of {len(group)} writes failed: {str(e)}")
+            self.failed += len(group)
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.groups += 1
+        self.grouped += len(outcomes)
+        self.largest_group = max(self.largest_group, len(outcomes))
+        for future, result, error in outcomes:
+            if error is None:
+                self.committed += 1
+            else:
+                self.failed += 1
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        """
+        Get group commit counters.
+
+        Returns:
+            dict: Whether enabled, groups committed, units committed and
+                failed, and the largest and average group size
+        """
+        return {
+            "enabled": self.enabled,
+            "groups": self.groups,
+            "committed": self.committed,
+            "failed": self.failed,
+            "largest_group": self.largest_group,
+            "average_group": round(self.grouped / self.groups, 2) if self.groups else 0,
+        }
@@ -7,34 +7,41 @@ Author: Appointment System
 Version: 1.0.0
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status, WebSocket
+from fastapi import FastAPI, HTTPException, Depends, Query, status, WebSocket, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from email_service import (
-    send_password_reset_email,
-    send_appointment_cancellation_email,
-    send_appointment_confirmation_email,
-    send_admin_appointment_notification,
-    generate_reset_token,
-    verify_reset_token,
-)
+from fastapi.responses import FileResponse, Response
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from email_outbox import EmailOutboxDispatcher, enqueue_email
+from email_service import resend_transport
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 import json
 import asyncio
 import os
-from typing import List, Optional
-from passlib.context import CryptContext
-from sqlalchemy import select
-from concurrent.futures import ThreadPoolExecutor
-
-from database import init_db, get_db, SessionLocal
+import uuid
+from typing import List, Optional, Tuple
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.exc import IntegrityError
+
+from database import (
+    init_db,
+    close_db,
+    engine,
+    read_engine,
+    get_write_db,
+    get_read_db,
+    database_stats,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+)
 from models import Appointment, Owner, Notification, User
 from schemas import (
     AppointmentCreate,
     AppointmentResponse,
     AvailableSlotResponse,
+    DailyCapacityResponse,
     NotificationResponse,
     OwnerResponse,
     RegisterRequest,
@@ -47,8 +54,27 @@ from schemas import (
 from services import (
     AppointmentService,
     AvailabilityService,
+    CapacityService,
     NotificationService,
 )
+from websocket_manager import ConnectionManager
+from reminders import ReminderScheduler
+from password_hashing import PasswordHashingUnavailable, password_hasher
+from rate_limit import RateLimitExceeded, client_ip, login_throttle
+from auth_tokens import InvalidToken, access_tokens
+from group_commit import GroupCommitter
+import query_counter
+from query_counter import QueryCountMiddleware
+import metrics
+from metrics import METRICS_ENABLED, MetricsMiddleware
+from password_reset import (
+    ResetTokenLimitExceeded,
+    ResetTokenSweeper,
+    consume_reset_tokens,
+    issue_reset_token,
+    redeem_reset_token,
+    verify_reset_token,
+)
 
 # ============================================================================
 # LIFESPAN EVENT HANDLER
@@ -64,8 +90,23 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     print("[OK] Database initialized successfully")
+    await password_hasher.start()
+    login_throttle.start()
+    connection_manager.start()
+    outbox_dispatcher.start()
+    reminder_scheduler.start()
+    reset_token_sweeper.start()
+    booking_committer.start()
     yield
     # Shutdown
+    await booking_committer.shutdown()
+    await reset_token_sweeper.shutdown()
+    await reminder_scheduler.shutdown()
+    await outbox_dispatcher.shutdown()
+    await connection_manager.shutdown()
+    await password_hasher.shutdown()
+    await login_throttle.shutdown()
+    await close_db()
     print("[OK] Application shutting down")
 
 
@@ -89,58 +130,137 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Password hashing
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Count SQL statements per request (X-Query-Count with QUERY_COUNT_HEADER)
+query_counter.install(engine, read_engine)
+app.add_middleware(QueryCountMiddleware)
+
+# Prometheus metrics: request latency and in-flight requests per route,
+# statement timings per engine (served at /metrics)
+if METRICS_ENABLED:
+    metrics.install(writer=engine, reader=read_engine)
+    app.add_middleware(MetricsMiddleware)
 
-def hash_password(password: str) -> str:
+# Password hashing (Argon2 on a process pool, off the event loop)
+async def hash_password(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHashingUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password against its hash, returning a new hash if it needs an update."""
+    try:
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+    except PasswordHashingUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+
+# Access tokens (signed JWTs; verified claims cached per token)
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# A user's current token version, read when it is not cached
+TOKEN_VERSION_BY_ID = select(User.token_version).where(User.id == bindparam("user_id"))
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> dict:
+    """
+    Authenticate a request from its bearer token.
+
+    The user's id, email and name come from the token's verified claims.
+    The database is only read when the user's token version is not cached,
+    to reject tokens issued before a password reset.
+
+    Returns:
+        dict: Verified claims (sub is the user's email)
+
+    Raises:
+        HTTPException: 401 if the token is missing, invalid, expired or revoked
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        claims = access_tokens.verify(credentials.credentials)
+        version = access_tokens.known_version(claims["uid"])
+        if version is None:
+            async with ReadSessionLocal() as session:
+                version = (
+                    await session.execute(TOKEN_VERSION_BY_ID, {"user_id": claims["uid"]})
+                ).scalar_one_or_none()
+            if version is None:
+                raise InvalidToken("User no longer exists")
+            access_tokens.remember_version(claims["uid"], version)
+        access_tokens.check_version(claims, version)
+        return claims
+    except InvalidToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+# User lookup for register and login, built once with a bound parameter
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
 
 # Initialize services
-appointment_service = AppointmentService()
 availability_service = AvailabilityService()
+capacity_service = CapacityService(availability_service)
+appointment_service = AppointmentService(capacity_service)
 notification_service = NotificationService()
 
-# Thread pool for sending emails asynchronously
-email_executor = ThreadPoolExecutor(max_workers=2)
+# Background delivery of emails queued in the outbox
+outbox_dispatcher = EmailOutboxDispatcher()
 
-# Store active WebSocket connections for real-time notifications
-active_connections: List[WebSocket] = []
+# Registry of active WebSocket connections for real-time notifications
+connection_manager = ConnectionManager()
 
 
-# ============================================================================
-# EMAIL HELPER FUNCTIONS
-# ============================================================================
+async def _on_reminders_sent(notifications: List[dict]):
+    """Deliver queued reminder emails and push reminders to the dashboard."""
+    await outbox_dispatcher.wake()
+    for notification in notifications:
+        await broadcast_notification(notification)
 
-def send_admin_email_wrapper(client_name: str, client_email: str, client_phone: str, appointment_time: datetime, notes: str = None):
-    """Wrapper function for sending admin notification email"""
-    try:
-        send_admin_appointment_notification(
-            client_name=client_name,
-            client_email=client_email,
-            client_phone=client_phone,
-            appointment_time=appointment_time,
-            notes=notes
-        )
-    except Exception as e:
-        print(f"[ERROR] Failed to send admin email in background: {str(e)}")
 
+# Deletes expired password reset tokens
+reset_token_sweeper = ResetTokenSweeper()
 
-def send_client_email_wrapper(client_email: str, client_name: str, appointment_time: datetime, notes: str = None):
-    """Wrapper function for sending client confirmation email"""
-    try:
-        send_appointment_confirmation_email(
-            client_email=client_email,
-            client_name=client_name,
-            appointment_time=appointment_time,
-            notes=notes
-        )
-    except Exception as e:
-        print(f"[ERROR] Failed to send client email in background: {str(e)}")
+# Commits concurrent bookings together (BOOKING_GROUP_COMMIT)
+booking_committer = GroupCommitter()
+
+# Sends appointment reminders at the configured offsets
+reminder_scheduler = ReminderScheduler(on_sent=_on_reminders_sent)
+
+# Component gauges, read when /metrics is scraped
+metrics.register_gauge(
+    "email_transport_queue_depth",
+    "Emails waiting for or holding a connection to the email provider",
+    lambda: resend_transport.pending,
+)
+metrics.register_gauge(
+    "email_outbox_due",
+    "Outbox emails due for delivery at the dispatcher's last poll",
+    lambda: outbox_dispatcher.queue_depth,
+)
+metrics.register_gauge(
+    "websocket_connections",
+    "Open WebSocket connections",
+    lambda: connection_manager.active_connections,
+)
 
 
 # ============================================================================
@@ -153,15 +273,10 @@ async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time notifications.
     Clients connect here to receive live updates about new appointments.
+    The server pings quiet clients and closes connections that stay idle.
     """
-    await websocket.accept()
-    active_connections.append(websocket)
-    try:
-        while True:
-            # Keep connection alive
-            await websocket.receive_text()
-    except Exception as e:
-        active_connections.remove(websocket)
+    await connection_manager.connect(websocket)
+    await connection_manager.listen(websocket)
 
 
 async def broadcast_notification(message: dict):
@@ -171,15 +286,118 @@ async def broadcast_notification(message: dict):
     Args:
         message: Dictionary containing notification data
     """
-    disconnected = []
-    for connection in active_connections:
-        try:
-            await connection.send_json(message)
-        except Exception:
-            disconnected.append(connection)
+    await connection_manager.broadcast(message)
 
-    for connection in disconnected:
-        active_connections.remove(connection)
+
+async def broadcast_slot_update(appointment: Appointment, db=None):
+    """
+    Broadcasts the slot-level availability diff for an appointment's date.
+
+    Sent after a booking or cancellation so clients browsing that date can
+    patch their slot list instead of polling /api/available-slots.
+
+    Args:
+        appointment: The appointment that was booked or cancelled
+        db: Database session; a read-only session is opened if omitted
+            (when run as a background task after commit)
+    """
+    if db is None:
+        async with ReadSessionLocal() as session:
+            return await broadcast_slot_update(appointment, session)
+
+    changed_slots = await availability_service.get_slot_changes(
+        appointment.appointment_time, appointment.duration_minutes, db
+    )
+    if not changed_slots:
+        return
+
+    await broadcast_notification(
+        {
+            "type": "slots_update",
+            "date": appointment.appointment_time.date().isoformat(),
+            "slots": [slot.dict() for slot in changed_slots],
+        }
+    )
+
+
+def new_appointment_message(appointment: Appointment) -> str:
+    """Owner notification text for a new booking."""
+    return (
+        f"New appointment from {appointment.client_name} on "
+        f"{appointment.appointment_time.strftime('%Y-%m-%d %H:%M')}"
+    )
+
+
+async def book_appointment(appointment_data: AppointmentCreate, db) -> Appointment:
+    """
+    Write a booking: the appointment, its owner notification and its emails.
+
+    Runs in the request's transaction, or in a savepoint of a group
+    transaction when group commit is enabled. Nothing is broadcast here,
+    because the booking may still roll back.
+
+    Args:
+        appointment_data: Appointment details
+        db: Database session
+
+    Returns:
+        Appointment: The created appointment
+
+    Raises:
+        HTTPException: 409 if the slot is already booked
+    """
+    appointment_time = datetime.fromisoformat(appointment_data.appointment_time)
+
+    # Check if slot is available; the day's appointments are read once, for
+    # this check and for the capacity counters
+    day_appointments = await availability_service.get_day_appointments(
+        appointment_time.date(), db
+    )
+    if not availability_service.is_available(appointment_time, day_appointments):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This time slot is already booked. Please select another time.",
+        )
+
+    # Create appointment
+    appointment = await appointment_service.create_appointment(
+        appointment_data, db, day_appointments
+    )
+
+    # Save notification to database
+    await notification_service.create_notification(
+        appointment_id=appointment.id,
+        notification_type="new_appointment",
+        message=new_appointment_message(appointment),
+        db=db,
+    )
+
+    # Queue emails in the same transaction as the appointment; the outbox
+    # dispatcher delivers them once the booking has committed
+    await enqueue_email(
+        db,
+        "admin_appointment_notification",
+        {
+            "client_name": appointment.client_name,
+            "client_email": appointment.client_email,
+            "client_phone": appointment.client_phone or "Not provided",
+            "appointment_time": appointment.appointment_time,
+            "notes": appointment.notes,
+        },
+        idempotency_key=f"appointment-{appointment.id}-admin-notification",
+    )
+    await enqueue_email(
+        db,
+        "appointment_confirmation",
+        {
+            "client_email": appointment.client_email,
+            "client_name": appointment.client_name,
+            "appointment_time": appointment.appointment_time,
+            "notes": appointment.notes,
+        },
+        idempotency_key=f"appointment-{appointment.id}-confirmation",
+    )
+    return appointment
 
 
 # ============================================================================
@@ -189,7 +407,9 @@ async def broadcast_notification(message: dict):
 
 @app.post("/api/appointments", response_model=AppointmentResponse, status_code=201)
 async def create_appointment(
-    appointment_data: AppointmentCreate, db=Depends(get_db)
+    appointment_data: AppointmentCreate,
+    background_tasks: BackgroundTasks,
+    db=Depends(get_write_db, scope="function"),
 ):
     """
     Create a new appointment booking.
@@ -198,11 +418,16 @@ async def create_appointment(
     - Validates the appointment time slot
     - Checks for conflicts with existing appointments
     - Creates the appointment in the database
-    - Sends real-time notification to the owner
     - Records the booking in the system
+    - Queues confirmation and admin emails in the outbox
+    - Sends real-time notification to the owner after commit
+
+    With BOOKING_GROUP_COMMIT enabled, the writes are committed together
+    with other concurrent bookings instead of in this request's transaction.
 
     Args:
         appointment_data: Appointment details (client name, email, date, time)
+        background_tasks: Used to broadcast and wake the outbox dispatcher after commit
         db: Database session
 
     Returns:
@@ -211,76 +436,35 @@ async def create_appointment(
     Raises:
         HTTPException: If time slot is invalid or already booked
     """
-    # Validate appointment time
-    appointment_time = datetime.fromisoformat(appointment_data.appointment_time)
-
-    # Check if slot is available
-    is_available = await availability_service.check_availability(
-        appointment_time, db
-    )
-    if not is_available:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="This time slot is already booked. Please select another time.",
+    if booking_committer.enabled:
+        appointment = await booking_committer.submit(
+            lambda session: book_appointment(appointment_data, session)
         )
+    else:
+        appointment = await book_appointment(appointment_data, db)
 
-    # Create appointment
-    appointment = await appointment_service.create_appointment(
-        appointment_data, db
-    )
-
-    # Send notification to owner
+    # Send notification to owner once the booking has committed
     notification_data = {
         "type": "new_appointment",
         "title": "New Appointment Booking",
-        "message": f"New appointment from {appointment.client_name} on {appointment_time.strftime('%Y-%m-%d %H:%M')}",
+        "message": new_appointment_message(appointment),
         "appointment_id": appointment.id,
         "client_name": appointment.client_name,
         "client_email": appointment.client_email,
         "appointment_time": appointment.appointment_time.isoformat(),
     }
-    await broadcast_notification(notification_data)
-
-    # Save notification to database
-    await notification_service.create_notification(
-        appointment_id=appointment.id,
-        notification_type="new_appointment",
-        message=notification_data["message"],
-        db=db,
+    background_tasks.add_task(broadcast_notification, notification_data)
+    background_tasks.add_task(broadcast_slot_update, appointment)
+    background_tasks.add_task(outbox_dispatcher.wake)
+    background_tasks.add_task(
+        reminder_scheduler.schedule, appointment.id, appointment.appointment_time
     )
 
-    # Send emails asynchronously (non-blocking)
-    loop = asyncio.get_event_loop()
-    
-    # Send admin notification email
-    admin_task = loop.run_in_executor(
-        email_executor,
-        send_admin_email_wrapper,
-        appointment.client_name,
-        appointment.client_email,
-        appointment.client_phone or "Not provided",
-        appointment.appointment_time,
-        appointment.notes
-    )
-    
-    # Send client confirmation email
-    client_task = loop.run_in_executor(
-        email_executor,
-        send_client_email_wrapper,
-        appointment.client_email,
-        appointment.client_name,
-        appointment.appointment_time,
-        appointment.notes
-    )
-    
-    # Don't wait for emails, just fire and forget
-    # The tasks will complete in the background
-
     return AppointmentResponse.from_orm(appointment)
 
 
 @app.get("/api/appointments", response_model=List[AppointmentResponse])
-async def list_appointments(email: str = None, db=Depends(get_db)):
+async def list_appointments(email: str = None, db=Depends(get_read_db)):
     """
     Retrieve appointments.
     
@@ -315,7 +499,7 @@ async def list_appointments(email: str = None, db=Depends(get_db)):
 
 
 @app.get("/api/appointments/{appointment_id}", response_model=AppointmentResponse)
-async def get_appointment(appointment_id: int, db=Depends(get_db)):
+async def get_appointment(appointment_id: int, db=Depends(get_read_db)):
     """
     Retrieve a specific appointment by ID.
 
@@ -338,36 +522,50 @@ async def get_appointment(appointment_id: int, db=Depends(get_db)):
 
 
 @app.delete("/api/appointments/{appointment_id}", status_code=204)
-async def delete_appointment(appointment_id: int, db=Depends(get_db)):
+async def delete_appointment(
+    appointment_id: int, background_tasks: BackgroundTasks, db=Depends(get_write_db, scope="function")
+):
     """
     Cancel an appointment.
 
     Args:
         appointment_id: ID of the appointment to cancel
+        background_tasks: Used to broadcast the freed slot and drop the
+            appointment's reminders after commit
         db: Database session
 
     Raises:
         HTTPException: If appointment not found
     """
-    success = await appointment_service.delete_appointment(appointment_id, db)
-    if not success:
+    appointment = await appointment_service.get_appointment(appointment_id, db)
+    if not appointment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found"
         )
 
+    await appointment_service.delete_appointment(appointment_id, db)
+    background_tasks.add_task(broadcast_slot_update, appointment)
+    background_tasks.add_task(reminder_scheduler.unschedule, appointment_id)
+
 
 @app.put("/api/appointments/{appointment_id}/cancel")
 async def cancel_appointment_with_email(
     appointment_id: int,
     cancellation_data: dict,
-    db=Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db=Depends(get_write_db, scope="function")
 ):
     """
     Cancel an appointment and send email to client.
 
+    The cancellation email is queued in the outbox and the owner
+    notification is broadcast after the response, so a slow email provider
+    never holds up the request.
+
     Args:
         appointment_id: ID of the appointment to cancel
         cancellation_data: Contains cancellation_reason, client_email, client_name
+        background_tasks: Used to broadcast and wake the outbox dispatcher after commit
         db: Database session
 
     Returns:
@@ -382,6 +580,7 @@ async def cancel_appointment_with_email(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Appointment not found"
         )
+    already_cancelled = appointment.status == "cancelled"
 
     # Cancel the appointment
     success = await appointment_service.delete_appointment(appointment_id, db)
@@ -390,13 +589,44 @@ async def cancel_appointment_with_email(
             status_code=status.HTTP_404_NOT_FOUND, detail="Failed to cancel appointment"
         )
 
-    # Send email to client
-    send_appointment_cancellation_email(
-        client_email=cancellation_data.get('client_email', ''),
-        client_name=cancellation_data.get('client_name', 'Client'),
-        appointment_time=appointment.appointment_time,
-        cancellation_reason=cancellation_data.get('cancellation_reason', 'No reason provided')
+    background_tasks.add_task(broadcast_slot_update, appointment)
+    background_tasks.add_task(reminder_scheduler.unschedule, appointment.id)
+
+    # Repeated cancellations don't notify the client again
+    if already_cancelled:
+        return {"message": "Appointment cancelled successfully"}
+
+    client_name = cancellation_data.get('client_name') or appointment.client_name
+    notification_data = {
+        "type": "cancellation",
+        "title": "Appointment Cancelled",
+        "message": f"Appointment for {client_name} on {appointment.appointment_time.strftime('%Y-%m-%d %H:%M')} was cancelled",
+        "appointment_id": appointment.id,
+        "client_name": client_name,
+        "client_email": appointment.client_email,
+        "appointment_time": appointment.appointment_time.isoformat(),
+    }
+    await notification_service.create_notification(
+        appointment_id=appointment.id,
+        notification_type="cancellation",
+        message=notification_data["message"],
+        db=db,
+    )
+
+    # Queue email to client in the same transaction as the cancellation
+    await enqueue_email(
+        db,
+        "appointment_cancellation",
+        {
+            "client_email": cancellation_data.get('client_email') or appointment.client_email,
+            "client_name": client_name,
+            "appointment_time": appointment.appointment_time,
+            "cancellation_reason": cancellation_data.get('cancellation_reason', 'No reason provided'),
+        },
+        idempotency_key=f"appointment-{appointment.id}-cancellation",
     )
+    background_tasks.add_task(broadcast_notification, notification_data)
+    background_tasks.add_task(outbox_dispatcher.wake)
 
     return {"message": "Appointment cancelled successfully"}
 
@@ -408,7 +638,7 @@ async def cancel_appointment_with_email(
 
 @app.get("/api/available-slots", response_model=List[AvailableSlotResponse])
 async def get_available_slots(
-    date: str, db=Depends(get_db)
+    date: str, db=Depends(get_read_db)
 ):
     """
     Get available appointment slots for a specific date.
@@ -443,8 +673,28 @@ async def get_available_slots(
     return available_slots
 
 
+@app.get("/api/daily-capacity", response_model=List[DailyCapacityResponse])
+async def get_daily_capacity(
+    days: int = Query(30, ge=1, le=31), db=Depends(get_read_db)
+):
+    """
+    Get free slots per day for the next `days` days, starting today.
+
+    Answered from the daily_capacity counters kept by every booking and
+    cancellation, so showing which days are fully booked costs one range
+    read instead of an availability check per slot.
+
+    Args:
+        days: Number of days, up to the 31-day booking window
+
+    Returns:
+        List[DailyCapacityResponse]: Total and free slots per day
+    """
+    return await capacity_service.get_daily_capacity(datetime.now().date(), days, db)
+
+
 @app.get("/api/calendar", response_model=dict)
-async def get_calendar(db=Depends(get_db)):
+async def get_calendar(db=Depends(get_read_db)):
     """
     Get the complete calendar view with all appointments.
 
@@ -463,7 +713,7 @@ async def get_calendar(db=Depends(get_db)):
 
 
 @app.get("/api/notifications", response_model=List[NotificationResponse])
-async def get_notifications(db=Depends(get_db)):
+async def get_notifications(db=Depends(get_read_db)):
     """
     Retrieve all notifications.
 
@@ -487,10 +737,10 @@ async def get_notifications(db=Depends(get_db)):
 
 
 @app.post("/api/auth/register", response_model=AuthResponse)
-async def register(data: RegisterRequest, db=Depends(get_db)):
+async def register(data: RegisterRequest, db=Depends(get_write_db, scope="function")):
     """Register a new client account."""
     # Check if user already exists
-    result = await db.execute(select(User).where(User.email == data.email))
+    result = await db.execute(USER_BY_EMAIL, {"email": data.email})
     existing_user = result.scalar_one_or_none()
     if existing_user:
         raise HTTPException(
@@ -498,29 +748,51 @@ async def register(data: RegisterRequest, db=Depends(get_db)):
             detail="Email already registered"
         )
     
+    # Release the writer connection while the password is hashed
+    await db.commit()
+
     # Create new user
-    hashed_password = hash_password(data.password)
+    hashed_password = await hash_password(data.password)
     new_user = User(
         name=data.name,
         email=data.email,
         password_hash=hashed_password
     )
     db.add(new_user)
-    await db.flush()
-    await db.refresh(new_user)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # Registered concurrently since the check above
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     return AuthResponse(
         message="Account created successfully",
-        user=UserResponse(name=new_user.name, email=new_user.email)
+        user=UserResponse(name=new_user.name, email=new_user.email),
+        access_token=access_tokens.issue(new_user.id, new_user.email, new_user.name, new_user.token_version),
     )
 
 
 @app.post("/api/auth/login", response_model=AuthResponse)
-async def login(data: LoginRequest, db=Depends(get_db)):
+async def login(data: LoginRequest, request: Request, db=Depends(get_read_db)):
     """Login a client account."""
-    # Find user by email
-    result = await db.execute(select(User).where(User.email == data.email))
+    # Throttle before any lookup or hashing
+    try:
+        await login_throttle.check(client_ip(request), data.email)
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    # Find user by email, then release the connection: verifying takes a
+    # while, and without a read pool it is the only writer connection
+    result = await db.execute(USER_BY_EMAIL, {"email": data.email})
     user = result.scalar_one_or_none()
+    await db.close()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -528,38 +800,109 @@ async def login(data: LoginRequest, db=Depends(get_db)):
         )
     
     # Verify password
-    if not verify_password(data.password, user.password_hash):
+    valid, new_hash = await verify_password(data.password, user.password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
+
+    # Upgrade hashes made with outdated Argon2 parameters; login otherwise
+    # only reads, so the write gets its own short transaction
+    if new_hash:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(User).where(User.id == user.id).values(password_hash=new_hash)
+            )
+            await session.commit()
     
     return AuthResponse(
         message="Logged in successfully",
-        user=UserResponse(name=user.name, email=user.email)
+        user=UserResponse(name=user.name, email=user.email),
+        access_token=access_tokens.issue(user.id, user.email, user.name, user.token_version),
+    )
+
+
+@app.get("/api/auth/me", response_model=UserResponse)
+async def get_me(current_user: dict = Depends(get_current_user)):
+    """Return the authenticated user from the token's claims."""
+    return UserResponse(name=current_user.get("name"), email=current_user["sub"])
+
+
+@app.get("/api/me/appointments", response_model=List[AppointmentResponse])
+async def list_my_appointments(
+    current_user: dict = Depends(get_current_user), db=Depends(get_read_db)
+):
+    """
+    Retrieve the authenticated client's appointments.
+
+    Args:
+        current_user: Verified token claims
+        db: Database session
+
+    Returns:
+        List[AppointmentResponse]: The client's appointments
+    """
+    result = await db.execute(
+        select(Appointment)
+        .where(Appointment.client_email == current_user["sub"])
+        .order_by(Appointment.appointment_time)
     )
+    return [AppointmentResponse.from_orm(apt) for apt in result.scalars().all()]
 
 
 @app.post("/api/auth/forgot-password")
-async def forgot_password(data: ForgotPasswordRequest, db=Depends(get_db)):
-    """Handle forgot password request and send reset email."""
-    token = generate_reset_token(data.email)
-    reset_link = f"http://localhost:8000/reset-password?token={token}"
-    success = send_password_reset_email(data.email, reset_link)
-    
-    if not success:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to send reset email")
-    
+async def forgot_password(
+    data: ForgotPasswordRequest, background_tasks: BackgroundTasks, db=Depends(get_write_db, scope="function")
+):
+    """Handle forgot password request and queue the reset email."""
+    try:
+        reference = await issue_reset_token(db, data.email)
+    except ResetTokenLimitExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many password reset requests, please try again later",
+        )
+    # Only the reference is queued; the link is built when the email is sent
+    await enqueue_email(
+        db,
+        "password_reset",
+        {"email": data.email, "reset_reference": reference},
+        idempotency_key=f"password-reset-{uuid.uuid4().hex}",
+    )
+    background_tasks.add_task(outbox_dispatcher.wake)
+
     return {"message": "Password reset link sent to your email", "email": data.email}
 
 
 @app.post("/api/auth/reset-password")
-async def reset_password(data: ResetPasswordRequest, db=Depends(get_db)):
+async def reset_password(data: ResetPasswordRequest, db=Depends(get_write_db, scope="function")):
     """Reset password with token."""
-    email = verify_reset_token(data.token)
+    email = await verify_reset_token(db, data.token)
     if not email:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired reset token")
-    
+
+    # Release the writer connection while the password is hashed
+    await db.commit()
+    password_hash = await hash_password(data.new_password)
+
+    # Tokens are single-use: of concurrent requests with the same token,
+    # only the one that deletes it resets the password
+    if not await redeem_reset_token(db, data.token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired reset token")
+    # Bumping the token version revokes every access token issued before now
+    changed = await db.execute(
+        update(User)
+        .where(User.email == email)
+        .values(password_hash=password_hash, token_version=User.token_version + 1)
+        .returning(User.id, User.token_version)
+    )
+    for user_id, token_version in changed.all():
+        access_tokens.remember_version(user_id, token_version)
+
+    # Drop every other outstanding token for this email
+    await consume_reset_tokens(db, email)
+
     return {"message": "Password reset successfully", "email": email}
 
 
@@ -580,9 +923,36 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "service": "EcoHarvest Farm Appointment Booking System",
+        "websocket": connection_manager.stats(),
+        "email_outbox": outbox_dispatcher.stats(),
+        "reminders": reminder_scheduler.stats(),
+        "password_hashing": password_hasher.stats(),
+        "login_rate_limit": login_throttle.stats(),
+        "password_reset_tokens": reset_token_sweeper.stats(),
+        "access_tokens": access_tokens.stats(),
+        "database": database_stats(),
+        "booking_group_commit": booking_committer.stats(),
+        "queries": QueryCountMiddleware.stats(),
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Metrics in the Prometheus text format, for scraping.
+
+    Returns:
+        Response: Request and statement latency histograms, in-flight
+            requests and component gauges
+
+    Raises:
+        HTTPException: 404 if METRICS_ENABLED is false
+    """
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return Response(metrics.registry.render(), media_type=metrics.MetricsRegistry.CONTENT_TYPE)
+
+
 # ============================================================================
 # STATIC FILES & ROOT ENDPOINT
 # ============================================================================
@@ -0,0 +1,402 @@
+"""
+Prometheus Metrics
+
+This module handles:
+- Histograms, counters and gauges rendered in the Prometheus text format
+- ASGI middleware timing every HTTP request per route and tracking the
+  requests in flight
+- SQLAlchemy engine hooks timing statements per engine and statement type
+- Gauges read from the app's components when /metrics is scraped
+
+Recording costs a dict lookup and a bisect per observation. In-flight
+requests and component gauges are only computed at scrape time. Routes
+are labelled with their path template (/api/appointments/{appointment_id})
+rather than the raw path, and unknown methods are folded into "OTHER", so
+the number of series stays bounded whatever clients send.
+"""
+
+import math
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import event
+
+# Record metrics and serve /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Upper bounds (seconds) of the latency histogram buckets
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+STATEMENT_TYPES = {
+    "SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK",
+    "SAVEPOINT", "RELEASE", "PRAGMA", "CREATE", "DROP", "ALTER",
+}
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    """Render `{name="value",...}`, or nothing without labels."""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value."""
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    """
+    Cumulative histogram per label set.
+
+    Attributes:
+        name: Metric name
+        documentation: HELP text
+        labelnames: Label names, in the order values are passed
+        buckets: Bucket upper bounds, ascending (+Inf is implied)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: Tuple[float, ...] = REQUEST_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        """Record one observation for the given label values."""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def label_sets(self) -> List[Labels]:
+        """Label values observed so far."""
+        return list(self._series)
+
+    def collect(self) -> List[str]:
+        """Render the metric's lines."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        bounds = self.buckets + (math.inf,)
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    self.labelnames + ("le",), labels + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            series_labels = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{series_labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{series_labels} {cumulative}")
+        return lines
+
+
+class Counter:
+    """
+    Monotonic counter per label set.
+
+    Attributes:
+        name: Metric name (conventionally ending in _total)
+        documentation: HELP text
+        labelnames: Label names, in the order values are passed
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        """Add `amount` to the counter for the given label values."""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        """Render the metric's lines."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for labels, value in sorted(self._values.items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Gauge:
+    """
+    Gauge read from a function when metrics are collected.
+
+    The function returns a number, or a dict of label values to numbers
+    for a labelled gauge. Reading at scrape time keeps the components
+    being measured free of any bookkeeping.
+
+    Attributes:
+        name: Metric name
+        documentation: HELP text
+        labelnames: Label names of the dict keys, if labelled
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        function: Callable[[], Union[float, Dict[Labels, float]]],
+        labelnames: Labels = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self.labelnames = labelnames
+
+    def collect(self) -> List[str]:
+        """Render the metric's lines."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+        ]
+        try:
+            values = self.function()
+        except Exception as e:
+            print(f"[WARNING] Failed to read gauge {self.name}: {str(e)}")
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            )
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The set of metrics rendered at /metrics.
+
+    Handles:
+    - Registering metrics under unique names
+    - Rendering all of them in the Prometheus text format (version 0.0.4)
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        """
+        Add a metric.
+
+        Args:
+            metric: Histogram, Counter or Gauge
+
+        Returns:
+            The metric, for assignment at module level
+
+        Raises:
+            ValueError: If a metric with the same name is registered
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render every metric."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+# Metrics served at /metrics
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency until the response is sent, by route",
+        ("method", "route", "status"),
+    )
+)
+
+db_statement_duration = registry.register(
+    Histogram(
+        "db_statement_duration_seconds",
+        "SQL statement execution time, by engine and statement type",
+        ("engine", "statement"),
+        STATEMENT_BUCKETS,
+    )
+)
+
+db_statement_errors = registry.register(
+    Counter(
+        "db_statement_errors_total",
+        "SQL statements that raised, by engine and statement type",
+        ("engine", "statement"),
+    )
+)
+
+# Scopes of the HTTP requests being handled, by id
+_in_flight: Dict[int, dict] = {}
+
+
+def _route_label(scope: dict) -> str:
+    """Path template of the route that matched, or "unmatched"."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _requests_in_flight() -> Dict[Labels, int]:
+    """In-flight requests per route, including 0 for routes seen before."""
+    counts = {(route,): 0 for _, route, _ in http_request_duration.label_sets()}
+    for scope in list(_in_flight.values()):
+        key = (_route_label(scope),)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+registry.register(
+    Gauge(
+        "http_requests_in_flight",
+        "HTTP requests being handled, by route",
+        _requests_in_flight,
+        ("route",),
+    )
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording HTTP request metrics.
+
+    Handles:
+    - Tracking requests in flight
+    - Timing each request until its last response byte is sent, so
+      background tasks run after the response are not counted
+    - Labelling by method, route template and status code
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        finished = None
+        status_code = 500
+        key = id(scope)
+        _in_flight[key] = scope
+
+        async def send_with_metrics(message):
+            nonlocal finished, status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                finished = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _in_flight.pop(key, None)
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+            http_request_duration.observe(
+                (finished or time.perf_counter()) - start,
+                method,
+                _route_label(scope),
+                str(status_code),
+            )
+
+
+def _statement_type(statement: str) -> str:
+    """Leading keyword of a statement, from a fixed set."""
+    words = statement[:24].split(None, 1)
+    keyword = words[0].upper() if words else ""
+    return keyword if keyword in STATEMENT_TYPES else "OTHER"
+
+
+def _engine_hooks(name: str):
+    """Event listeners timing statements on one engine."""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_start"].pop()
+        db_statement_duration.observe(
+            time.perf_counter() - started, name, _statement_type(statement)
+        )
+
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_start"):
+            conn.info["metrics_start"].pop()
+        statement = exception_context.statement
+        db_statement_errors.inc(name, _statement_type(statement) if statement else "OTHER")
+
+    return before_cursor_execute, after_cursor_execute, handle_error
+
+
+def install(**engines):
+    """
+    Time statements executed on the given async engines.
+
+    Args:
+        engines: AsyncEngine instances by label (e.g. writer=..., reader=...);
+            an engine passed twice is only hooked under its first label
+    """
+    hooked = set()
+    for name, engine in engines.items():
+        if id(engine) in hooked:
+            continue
+        hooked.add(id(engine))
+        before, after, error = _engine_hooks(name)
+        event.listen(engine.sync_engine, "before_cursor_execute", before)
+        event.listen(engine.sync_engine, "after_cursor_execute", after)
+        event.listen(engine.sync_engine, "handle_error", error)
+
+
+def register_gauge(name: str, documentation: str, function: Callable[[], float]) -> Optional[Gauge]:
+    """
+    Expose a value read from the app at scrape time.
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        function: Returns the current value
+
+    Returns:
+        Optional[Gauge]: The gauge, or None when metrics are disabled
+    """
+    if not METRICS_ENABLED:
+        return None
+    return registry.register(Gauge(name, documentation, function))
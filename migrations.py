@@ -0,0 +1,274 @@
+"""
+Versioned Schema Migrations
+
+This module handles:
+- Tracking applied schema versions in the `schema_migrations` table
+- Applying pending migration steps in order at startup
+- Building indexes online: CONCURRENTLY on PostgreSQL, batched into a
+  single transaction on SQLite
+- A fast check at boot that skips all work when the schema is current
+
+Version 1 is the baseline: it creates any missing tables for the current
+models, which adopts databases created before migrations existed. Later
+steps must be safe to re-run (CREATE ... IF NOT EXISTS), because a fresh
+database gets today's models from the baseline, and two workers booting
+together may both apply a step; the second one's version row is rejected
+by the primary key and ignored.
+
+Run `python migrations.py` to migrate without starting the app (for
+deploys that set MIGRATE_ON_STARTUP=false), or `python migrations.py
+--status` to show the current and latest versions.
+"""
+
+import os
+import time
+from datetime import date, datetime
+from typing import Awaitable, Callable, List, NamedTuple, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+import models  # noqa: F401 (registers the model tables on Base.metadata)
+from database import Base, engine
+from models import DailyCapacity
+from services import CapacityService
+
+# Apply pending migrations on startup; when false, startup only checks the
+# version and warns if migrations are pending
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+
+# Kept out of Base.metadata so the baseline create_all doesn't own it
+schema_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    schema_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    """A numbered schema change."""
+
+    version: int
+    name: str
+    upgrade: Callable[[AsyncEngine], Awaitable[None]]
+
+
+async def _create_tables(target: AsyncEngine):
+    """Baseline: create any missing tables (and their indexes) for the current models."""
+    async with target.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def create_indexes(target: AsyncEngine, indexes: List[Tuple[str, str, str]]):
+    """
+    Create indexes that don't exist yet, without blocking writers where possible.
+
+    PostgreSQL builds each index CONCURRENTLY, which must run outside a
+    transaction. SQLite can't build indexes online, so the whole batch is
+    created in one transaction: one write lock and one sync instead of one
+    per index.
+
+    Args:
+        target: Engine to create the indexes on
+        indexes: (index name, table name, column list) tuples
+    """
+    if target.dialect.name == "postgresql":
+        async with target.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for name, table, columns in indexes:
+                await conn.exec_driver_sql(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"
+                )
+    else:
+        async with target.begin() as conn:
+            for name, table, columns in indexes:
+                await conn.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+                )
+
+
+async def _add_query_indexes(target: AsyncEngine):
+    """Indexes for the hottest filtered and sorted queries."""
+    await create_indexes(
+        target,
+        [
+            # GET /api/me/appointments and ?email= listings, in time order
+            (
+                "ix_appointments_client_email_appointment_time",
+                "appointments",
+                "client_email, appointment_time",
+            ),
+            # Availability and reminder windows skip cancelled rows
+            (
+                "ix_appointments_appointment_time_status",
+                "appointments",
+                "appointment_time, status",
+            ),
+            # Unread notifications, newest first
+            (
+                "ix_notifications_is_read_created_at",
+                "notifications",
+                "is_read, created_at",
+            ),
+        ],
+    )
+
+
+async def _add_daily_capacity(target: AsyncEngine):
+    """Per-day capacity counters, backfilled from today's and future bookings."""
+    async with target.begin() as conn:
+        await conn.run_sync(DailyCapacity.__table__.create, checkfirst=True)
+
+    async with AsyncSession(target, expire_on_commit=False) as session:
+        days = await CapacityService().rebuild(date.today(), session)
+        await session.commit()
+    print(f"[INFO] Backfilled capacity for {days} booked days")
+
+
+async def _add_outbox_batch_key(target: AsyncEngine):
+    """Outbox group column, so digests and provider batches retry as one unit."""
+    async with target.begin() as conn:
+        columns = await conn.run_sync(
+            lambda sync_conn: {
+                column["name"] for column in inspect(sync_conn).get_columns("email_outbox")
+            }
+        )
+        if "batch_key" not in columns:
+            await conn.exec_driver_sql("ALTER TABLE email_outbox ADD COLUMN batch_key VARCHAR(80)")
+    await create_indexes(target, [("ix_email_outbox_batch_key", "email_outbox", "batch_key")])
+
+
+async def _add_user_token_version(target: AsyncEngine):
+    """Per-user token version, bumped by password resets to revoke old tokens."""
+    async with target.begin() as conn:
+        columns = await conn.run_sync(
+            lambda sync_conn: {
+                column["name"] for column in inspect(sync_conn).get_columns("users")
+            }
+        )
+        if "token_version" not in columns:
+            await conn.exec_driver_sql(
+                "ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"
+            )
+
+
+# Every migration, in order; append new steps with the next version number
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", _create_tables),
+    Migration(2, "query_indexes", _add_query_indexes),
+    Migration(3, "daily_capacity", _add_daily_capacity),
+    Migration(4, "outbox_batch_key", _add_outbox_batch_key),
+    Migration(5, "user_token_version", _add_user_token_version),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def current_version(target: AsyncEngine = engine) -> int:
+    """
+    Get the highest applied schema version.
+
+    Args:
+        target: Engine to inspect
+
+    Returns:
+        int: Applied version, or 0 for a database without migrations
+    """
+    async with target.connect() as conn:
+        exists = await conn.run_sync(
+            lambda sync_conn: inspect(sync_conn).has_table(schema_migrations.name)
+        )
+        if not exists:
+            return 0
+        version = await conn.scalar(select(func.max(schema_migrations.c.version)))
+        return version or 0
+
+
+async def migrate(target: AsyncEngine = engine) -> int:
+    """
+    Apply every pending migration in order.
+
+    Args:
+        target: Engine to migrate
+
+    Returns:
+        int: Number of migrations applied (0 if the schema was current)
+    """
+    version = await current_version(target)
+    if version >= LATEST_VERSION:
+        return 0
+
+    async with target.begin() as conn:
+        await conn.run_sync(schema_metadata.create_all)
+
+    applied = 0
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        start = time.perf_counter()
+        await migration.upgrade(target)
+        try:
+            async with target.begin() as conn:
+                await conn.execute(
+                    schema_migrations.insert().values(
+                        version=migration.version, name=migration.name
+                    )
+                )
+        except IntegrityError:
+            # Another worker applied it at the same time
+            continue
+        applied += 1
+        print(
+            f"[OK] Applied migration {migration.version} ({migration.name}) "
+            f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+    return applied
+
+
+async def run_startup_migrations(target: AsyncEngine = engine):
+    """
+    Bring the schema up to date at startup, or only check it.
+    Called on application startup.
+
+    Args:
+        target: Engine to migrate
+    """
+    if MIGRATE_ON_STARTUP:
+        await migrate(target)
+        return
+
+    version = await current_version(target)
+    if version < LATEST_VERSION:
+        print(
+            f"[WARNING] Database schema is at version {version}, latest is "
+            f"{LATEST_VERSION}; run `python migrations.py`"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument(
+        "--status", action="store_true", help="show the current and latest versions only"
+    )
+    args = parser.parse_args()
+
+    async def main():
+        try:
+            if args.status:
+                print(f"Current version: {await current_version()}")
+                print(f"Latest version: {LATEST_VERSION}")
+            else:
+                applied = await migrate()
+                print(f"[OK] Schema at version {LATEST_VERSION} ({applied} migrations applied)")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
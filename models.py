@@ -5,11 +5,14 @@ This module defines the data models for:
 - Appointments
 - Owners
 - Notifications
+- Email outbox
+- Password reset tokens
+- Daily booking capacity
 
 All models use SQLAlchemy ORM for database operations.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -24,6 +27,7 @@ class User(Base):
         name: User's full name
         email: User's email address (unique)
         password_hash: Hashed password
+        token_version: Incremented on password reset to revoke earlier access tokens
         created_at: Timestamp when user was created
         updated_at: Timestamp when user was last updated
     """
@@ -34,6 +38,7 @@ class User(Base):
     name = Column(String(255), nullable=False)
     email = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -150,3 +155,108 @@ class Notification(Base):
 
     def __repr__(self):
         return f"<Notification(id={self.id}, type={self.notification_type}, read={self.is_read})>"
+
+
+class EmailOutbox(Base):
+    """
+    Durable outbox entry for an email waiting to be delivered.
+
+    Rows are written in the same transaction as the change that triggers the
+    email and drained by the background dispatcher in email_outbox.py.
+
+    Attributes:
+        id: Unique identifier
+        idempotency_key: Unique key for the email, also sent to the provider
+        email_type: Kind of email (appointment_confirmation, admin_appointment_notification, ...)
+        payload: JSON-encoded keyword arguments for the email sender
+        status: Delivery status (pending, sending, sent, dead)
+        attempts: Number of delivery attempts made so far
+        next_attempt_at: Earliest time the row may be (re)tried
+        lease_token: Token of the dispatcher batch currently holding the row
+        batch_key: Group the row is delivered and retried with (an admin
+            digest window or a provider batch), if any
+        last_error: Error from the most recent failed attempt
+        created_at: Timestamp when the email was queued
+        sent_at: Timestamp when the email was delivered
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String(255), unique=True, nullable=False)
+    email_type = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(String(20), default="pending", nullable=False)  # pending, sending, sent, dead
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    lease_token = Column(String(32), index=True)
+    batch_key = Column(String(80), index=True)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<EmailOutbox(id={self.id}, type={self.email_type}, status={self.status})>"
+
+
+class PasswordResetToken(Base):
+    """
+    Password reset token issued by the forgot-password flow.
+
+    Only a SHA-256 hash of the token is stored, so a leaked table cannot be
+    used to reset passwords. Expired rows are deleted by the sweeper in
+    password_reset.py.
+
+    Attributes:
+        id: Unique identifier
+        email: Email address the token was issued for
+        token_hash: Hex SHA-256 of the token (unique lookup key)
+        expires_at: Timestamp after which the token is invalid
+        created_at: Timestamp when the token was issued
+    """
+
+    __tablename__ = "password_reset_tokens"
+    __table_args__ = (
+        Index("ix_password_reset_tokens_email_created_at", "email", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String(255), nullable=False)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<PasswordResetToken(id={self.id}, email={self.email}, expires_at={self.expires_at})>"
+
+
+class DailyCapacity(Base):
+    """
+    Denormalized slot counts for one day.
+
+    Updated in the same transaction as every booking and cancellation, so
+    "which days are full" is a range read on the primary key instead of an
+    availability check per slot. Days without a row have had no bookings:
+    all of their slots are free.
+
+    Attributes:
+        day: The date (primary key)
+        total_slots: Bookable slots on the day (0 on weekends)
+        free_slots: Slots not overlapped by an active appointment
+        appointment_count: Active (non-cancelled) appointments on the day
+        updated_at: Timestamp of the last change
+    """
+
+    __tablename__ = "daily_capacity"
+
+    day = Column(Date, primary_key=True)
+    total_slots = Column(Integer, nullable=False)
+    free_slots = Column(Integer, nullable=False)
+    appointment_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DailyCapacity(day={self.day}, free={self.free_slots}/{self.total_slots})>"
@@ -0,0 +1,402 @@
+"""
+Password Hashing
+
+This module handles:
+- Argon2 hashing and verification through passlib
+- Running each hash in a dedicated, size-limited process pool so the
+  event loop keeps serving other requests while Argon2 runs
+- A bounded queue: requests beyond PASSWORD_HASH_MAX_PENDING are refused
+- A timeout on queue wait plus hashing
+- Argon2 cost parameters from the environment, chosen for the host by the
+  calibration command, with outdated hashes upgraded on login
+
+Calibrate with:
+    python password_hashing.py --target-ms 250 --concurrency 4 --write .env
+
+Argon2 is deliberately CPU- and memory-hard, so a login costs tens of
+milliseconds of CPU. Running it inline would stall every other request,
+WebSocket broadcast and background task on the worker.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import re
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+
+load_dotenv()
+
+# Worker processes (0 hashes inline on the event loop)
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1)))
+)
+# Hash requests allowed to wait or run before new ones are refused
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+# Longest time a request may wait for and run its hash
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "5"))
+
+# Argon2 cost parameters; unset values fall back to passlib's defaults
+ARGON2_TIME_COST = os.getenv("ARGON2_TIME_COST")
+ARGON2_MEMORY_COST = os.getenv("ARGON2_MEMORY_COST")  # KiB
+ARGON2_PARALLELISM = os.getenv("ARGON2_PARALLELISM")
+
+
+def build_context(
+    time_cost: Optional[int] = None,
+    memory_cost: Optional[int] = None,
+    parallelism: Optional[int] = None,
+) -> CryptContext:
+    """
+    Create the password context for the given Argon2 parameters.
+
+    Hashes made with other parameters verify as usual but report
+    needs_update, so they are rehashed on the next successful login.
+
+    Args:
+        time_cost: Iterations
+        memory_cost: Memory in KiB
+        parallelism: Lanes
+
+    Returns:
+        CryptContext: Argon2 context
+    """
+    settings = {}
+    if time_cost is not None:
+        settings["argon2__rounds"] = int(time_cost)
+    if memory_cost is not None:
+        settings["argon2__memory_cost"] = int(memory_cost)
+    if parallelism is not None:
+        settings["argon2__parallelism"] = int(parallelism)
+    return CryptContext(schemes=["argon2"], deprecated="auto", **settings)
+
+
+pwd_context = build_context(ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM)
+
+
+class PasswordHashingUnavailable(Exception):
+    """Raised when a hash cannot be computed in time or the queue is full."""
+
+
+def _hash(password: str) -> str:
+    """Hash a password (runs in a worker process)."""
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    """Verify a password against its hash (runs in a worker process)."""
+    return pwd_context.verify(password, password_hash)
+
+
+def _verify_and_update(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if its parameters are outdated
+    (runs in a worker process).
+    """
+    return pwd_context.verify_and_update(password, password_hash)
+
+
+def _warm_up() -> None:
+    """No-op run once per worker so processes start before the first login."""
+
+
+class PasswordHasher:
+    """
+    Argon2 hashing on a bounded process pool.
+
+    Handles:
+    - Starting the worker processes with the application
+    - Limiting hashes in flight to the number of workers
+    - Refusing requests once too many are waiting
+    - Timing out requests that wait or run too long
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        timeout: float = PASSWORD_HASH_TIMEOUT_SECONDS,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        # Counters
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.rehashed = 0
+
+    async def start(self):
+        """Start and warm up the worker processes. Called on application startup."""
+        if self.workers <= 0 or self._pool is not None:
+            return
+        # Spawned workers don't inherit the event loop, database connections
+        # or threads of the application process
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._slots = asyncio.Semaphore(self.workers)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self._pool, _warm_up) for _ in range(self.workers))
+        )
+
+    async def shutdown(self):
+        """Stop the worker processes. Called on application shutdown."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password.
+
+        Args:
+            password: Plain-text password
+
+        Returns:
+            str: Argon2 hash
+
+        Raises:
+            PasswordHashingUnavailable: If the queue is full or the hash timed out
+        """
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """
+        Verify a password against its hash.
+
+        Args:
+            password: Plain-text password
+            password_hash: Stored Argon2 hash
+
+        Returns:
+            bool: True if the password matches
+
+        Raises:
+            PasswordHashingUnavailable: If the queue is full or the hash timed out
+        """
+        return await self._run(_verify, password, password_hash)
+
+    async def verify_and_update(
+        self, password: str, password_hash: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password, rehashing it when its hash needs an update.
+
+        Args:
+            password: Plain-text password
+            password_hash: Stored Argon2 hash
+
+        Returns:
+            Tuple[bool, Optional[str]]: Whether the password matches, and a
+                replacement hash if the stored one uses outdated parameters
+
+        Raises:
+            PasswordHashingUnavailable: If the queue is full or the hash timed out
+        """
+        valid, new_hash = await self._run(_verify_and_update, password, password_hash)
+        if new_hash is not None:
+            self.rehashed += 1
+        return valid, new_hash
+
+    async def _run(self, function, *args):
+        """Run a hashing function on the pool under the queue and timeout limits."""
+        if self._pool is None:
+            return function(*args)
+
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHashingUnavailable("Too many password hashing requests queued")
+
+        self.pending += 1
+        try:
+            return await asyncio.wait_for(self._submit(function, *args), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PasswordHashingUnavailable("Password hashing timed out")
+        finally:
+            self.pending -= 1
+
+    async def _submit(self, function, *args):
+        """
+        Wait for a free worker, then run the function on it.
+
+        The worker slot is released when the process finishes, not when the
+        caller gives up, so timed-out hashes still count against the pool.
+        """
+        await self._slots.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._pool, function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        result = await asyncio.shield(future)
+        self.completed += 1
+        return result
+
+    def stats(self) -> dict:
+        """
+        Get hashing pool counters.
+
+        Returns:
+            dict: Pool size, queue depth and outcome counters
+        """
+        return {
+            "workers": self.workers if self._pool is not None else 0,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "rehashed": self.rehashed,
+            "parameters": current_parameters(),
+        }
+
+
+def current_parameters() -> dict:
+    """Argon2 parameters new hashes are created with."""
+    handler = pwd_context.handler("argon2")
+    return {
+        "time_cost": handler.rounds or handler.default_rounds,
+        "memory_cost": handler.memory_cost,
+        "parallelism": handler.parallelism,
+    }
+
+
+# Shared hasher used by the auth endpoints
+password_hasher = PasswordHasher()
+
+
+# ============================================================================
+# CALIBRATION
+# ============================================================================
+
+
+def measure_hash_ms(
+    time_cost: int, memory_cost: int, parallelism: int, samples: int = 5
+) -> float:
+    """
+    Median time to hash one password with the given parameters.
+
+    Returns:
+        float: Milliseconds per hash
+    """
+    context = build_context(time_cost, memory_cost, parallelism)
+    context.hash("calibration-warm-up")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target_ms: float,
+    concurrency: int,
+    max_memory_mb: int,
+    min_memory_mb: int = 19,
+    parallelism: int = 1,
+) -> dict:
+    """
+    Choose Argon2 parameters for this host.
+
+    Memory is sized so `concurrency` simultaneous hashes fit in
+    `max_memory_mb` (capped at 64 MiB per hash). The time cost is then the
+    largest iteration count that stays within `target_ms` per hash. If even
+    one iteration is too slow, memory is halved down to `min_memory_mb`.
+
+    Args:
+        target_ms: Latency budget for a single hash
+        concurrency: Hashes expected to run at the same time
+        max_memory_mb: Memory budget for all concurrent hashes
+        min_memory_mb: Lowest memory cost to consider per hash
+        parallelism: Argon2 lanes (1 suits a process pool)
+
+    Returns:
+        dict: time_cost, memory_cost (KiB), parallelism and measured_ms
+    """
+    memory_cost = min(64 * 1024, max_memory_mb * 1024 // max(1, concurrency))
+    memory_cost = max(min_memory_mb * 1024, memory_cost)
+
+    while True:
+        per_iteration_ms = measure_hash_ms(1, memory_cost, parallelism)
+        if per_iteration_ms <= target_ms or memory_cost // 2 < min_memory_mb * 1024:
+            break
+        memory_cost //= 2
+
+    # Start from a linear estimate, then step to the largest count within budget
+    time_cost = max(1, int(target_ms // per_iteration_ms))
+    measured_ms = measure_hash_ms(time_cost, memory_cost, parallelism)
+    while time_cost > 1 and measured_ms > target_ms:
+        time_cost -= 1
+        measured_ms = measure_hash_ms(time_cost, memory_cost, parallelism)
+    while measured_ms <= target_ms:
+        next_ms = measure_hash_ms(time_cost + 1, memory_cost, parallelism)
+        if next_ms > target_ms:
+            break
+        time_cost += 1
+        measured_ms = next_ms
+
+    return {
+        "time_cost": time_cost,
+        "memory_cost": memory_cost,
+        "parallelism": parallelism,
+        "measured_ms": round(measured_ms, 1),
+    }
+
+
+_ARGON2_ENV_LINE = re.compile(r"\s*ARGON2_(TIME_COST|MEMORY_COST|PARALLELISM)=")
+
+
+def write_env(path: str, parameters: dict):
+    """Set the ARGON2_* variables in an env file, replacing existing values."""
+    values = {
+        "ARGON2_TIME_COST": parameters["time_cost"],
+        "ARGON2_MEMORY_COST": parameters["memory_cost"],
+        "ARGON2_PARALLELISM": parameters["parallelism"],
+    }
+    lines = []
+    if os.path.exists(path):
+        with open(path) as env_file:
+            lines = env_file.read().splitlines()
+    lines = [line for line in lines if not _ARGON2_ENV_LINE.match(line)]
+    lines += [f"{name}={value}" for name, value in values.items()]
+    with open(path, "w") as env_file:
+        env_file.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate Argon2 parameters for this host")
+    parser.add_argument("--target-ms", type=float, default=250, help="Latency budget per hash")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=PASSWORD_HASH_WORKERS or 1,
+        help="Hashes running at the same time (defaults to PASSWORD_HASH_WORKERS)",
+    )
+    parser.add_argument(
+        "--max-memory-mb", type=int, default=256, help="Memory budget for concurrent hashes"
+    )
+    parser.add_argument("--write", metavar="ENV_FILE", help="Write the parameters to an env file")
+    args = parser.parse_args()
+
+    current = current_parameters()
+    print(f"[INFO] Current parameters: {current} ({measure_hash_ms(**current):.1f} ms per hash)")
+    chosen = calibrate(args.target_ms, args.concurrency, args.max_memory_mb)
+    print(f"[OK] Calibrated parameters: {chosen}")
+    if args.write:
+        write_env(args.write, chosen)
+        print(f"[OK] Wrote ARGON2_* settings to {args.write}")
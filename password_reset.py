@@ -0,0 +1,278 @@
+"""
+Password Reset Tokens
+
+This module handles:
+- Issuing reset tokens stored as SHA-256 hashes in password_reset_tokens
+- Deriving each token from a random reference with an HMAC, so queued
+  emails hold only the reference and the link is built at send time
+- Limiting how many tokens an email address can be issued per window
+- Verifying a token with a single unique-index lookup
+- Redeeming a token atomically, so it resets a password at most once
+- Consuming tokens once the password has been reset
+- A background sweeper deleting expired tokens in batches
+
+Tokens live in the database, so they work across workers and restarts,
+and the table stays small under forgot-password spam.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth_tokens import access_tokens
+from database import AsyncSessionLocal
+from email_service import build_password_reset_email
+from models import PasswordResetToken
+
+# Token lifetime
+PASSWORD_RESET_TOKEN_TTL_HOURS = float(os.getenv("PASSWORD_RESET_TOKEN_TTL_HOURS", "24"))
+# Tokens an email address may be issued per issuance window
+PASSWORD_RESET_MAX_PER_EMAIL = int(os.getenv("PASSWORD_RESET_MAX_PER_EMAIL", "3"))
+PASSWORD_RESET_ISSUE_WINDOW_SECONDS = float(
+    os.getenv("PASSWORD_RESET_ISSUE_WINDOW_SECONDS", "3600")
+)
+# Sweeper schedule and rows deleted per statement
+PASSWORD_RESET_SWEEP_INTERVAL_SECONDS = float(
+    os.getenv("PASSWORD_RESET_SWEEP_INTERVAL_SECONDS", "600")
+)
+PASSWORD_RESET_SWEEP_BATCH_SIZE = int(os.getenv("PASSWORD_RESET_SWEEP_BATCH_SIZE", "1000"))
+
+# Page the reset link opens; the token is appended as ?token=
+RESET_LINK_BASE = "http://localhost:8000/reset-password"
+
+
+class ResetTokenLimitExceeded(Exception):
+    """Raised when an email address has been issued too many tokens recently."""
+
+
+def _hash_token(token: str) -> str:
+    """Hex SHA-256 of a token, as stored in the table."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def reset_token(reference: str) -> str:
+    """
+    Derive the token for a reset reference.
+
+    The token is an HMAC of the reference under the access token signing
+    key: a reference read from the database is useless without that key.
+
+    Args:
+        reference: Reference returned by issue_reset_token
+
+    Returns:
+        str: The token to put in the reset link
+    """
+    digest = hmac.new(
+        access_tokens.secret_key.encode(),
+        f"password-reset:{reference}".encode(),
+        hashlib.sha256,
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def build_reset_email(email: str, reset_reference: str) -> dict:
+    """
+    Render the password reset email, building its link from the reference.
+
+    Used by the outbox at send time, so the link (and its token) is never
+    stored.
+
+    Args:
+        email: Email address the token was issued for
+        reset_reference: Reference returned by issue_reset_token
+
+    Returns:
+        dict: Message with to, subject, html and text keys
+    """
+    link = f"{RESET_LINK_BASE}?token={reset_token(reset_reference)}"
+    return build_password_reset_email(email, link)
+
+
+async def issue_reset_token(db: AsyncSession, email: str) -> str:
+    """
+    Issue a password reset token for an email address.
+
+    Args:
+        db: Database session (the token commits with the caller's transaction)
+        email: Email address requesting the reset
+
+    Returns:
+        str: Reference to queue with the email; build_reset_email derives
+            the token from it when the email is sent
+
+    Raises:
+        ResetTokenLimitExceeded: If PASSWORD_RESET_MAX_PER_EMAIL tokens were
+            issued within the issuance window
+    """
+    now = datetime.utcnow()
+    window_start = now - timedelta(seconds=PASSWORD_RESET_ISSUE_WINDOW_SECONDS)
+    issued = (
+        await db.execute(
+            select(func.count(PasswordResetToken.id)).where(
+                PasswordResetToken.email == email,
+                PasswordResetToken.created_at >= window_start,
+            )
+        )
+    ).scalar_one()
+    if issued >= PASSWORD_RESET_MAX_PER_EMAIL:
+        raise ResetTokenLimitExceeded(f"Too many password reset requests for {email}")
+
+    reference = secrets.token_urlsafe(32)
+    db.add(
+        PasswordResetToken(
+            email=email,
+            token_hash=_hash_token(reset_token(reference)),
+            expires_at=now + timedelta(hours=PASSWORD_RESET_TOKEN_TTL_HOURS),
+            created_at=now,
+        )
+    )
+    return reference
+
+
+async def verify_reset_token(db: AsyncSession, token: str) -> Optional[str]:
+    """
+    Verify a reset token.
+
+    Args:
+        db: Database session
+        token: Token from the reset link
+
+    Returns:
+        Optional[str]: The email address if the token is valid and unexpired
+    """
+    return (
+        await db.execute(
+            select(PasswordResetToken.email).where(
+                PasswordResetToken.token_hash == _hash_token(token),
+                PasswordResetToken.expires_at > datetime.utcnow(),
+            )
+        )
+    ).scalar_one_or_none()
+
+
+async def redeem_reset_token(db: AsyncSession, token: str) -> bool:
+    """
+    Delete a token if it is still valid.
+
+    Concurrent requests with the same token race on this DELETE; only the
+    one that removed the row may go on to reset the password.
+
+    Args:
+        db: Database session (the deletion commits with the caller's transaction)
+        token: Token from the reset link
+
+    Returns:
+        bool: Whether this call redeemed the token
+    """
+    result = await db.execute(
+        delete(PasswordResetToken).where(
+            PasswordResetToken.token_hash == _hash_token(token),
+            PasswordResetToken.expires_at > datetime.utcnow(),
+        )
+    )
+    return result.rowcount == 1
+
+
+async def consume_reset_tokens(db: AsyncSession, email: str):
+    """
+    Invalidate every outstanding token of an email address after a reset.
+
+    Args:
+        db: Database session
+        email: Email address whose password was reset
+    """
+    await db.execute(delete(PasswordResetToken).where(PasswordResetToken.email == email))
+
+
+class ResetTokenSweeper:
+    """
+    Background task deleting expired reset tokens.
+
+    Deletes in batches of PASSWORD_RESET_SWEEP_BATCH_SIZE, each in its own
+    short transaction, so a large backlog never holds a long write lock.
+    """
+
+    def __init__(
+        self,
+        interval: float = PASSWORD_RESET_SWEEP_INTERVAL_SECONDS,
+        batch_size: int = PASSWORD_RESET_SWEEP_BATCH_SIZE,
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.deleted = 0
+        self.sweeps = 0
+
+    def start(self):
+        """Start the sweeper loop. Called on application startup."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        """Stop the sweeper loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """Sweep, then sleep for the interval."""
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"[ERROR] Password reset token sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> int:
+        """
+        Delete all expired tokens, one batch per transaction.
+
+        Returns:
+            int: Number of tokens deleted
+        """
+        deleted = 0
+        now = datetime.utcnow()
+        while True:
+            async with AsyncSessionLocal() as session:
+                expired_ids = (
+                    select(PasswordResetToken.id)
+                    .where(PasswordResetToken.expires_at <= now)
+                    .limit(self.batch_size)
+                    .scalar_subquery()
+                )
+                result = await session.execute(
+                    delete(PasswordResetToken).where(PasswordResetToken.id.in_(expired_ids))
+                )
+                await session.commit()
+            deleted += result.rowcount
+            if result.rowcount < self.batch_size:
+                break
+            await asyncio.sleep(0)  # Let requests run between batches
+
+        self.deleted += deleted
+        self.sweeps += 1
+        return deleted
+
+    def stats(self) -> dict:
+        """
+        Get sweeper counters.
+
+        Returns:
+            dict: Sweeps run and tokens deleted since startup
+        """
+        return {"sweeps": self.sweeps, "deleted": self.deleted}
@@ -0,0 +1,168 @@
+"""
+Per-Request Query Counting
+
+This module handles:
+- Counting SQL statements executed on behalf of each HTTP request
+- ASGI middleware starting a count per request and, optionally, reporting
+  it in an X-Query-Count response header
+- Totals for /api/health
+- Compiled-statement cache hits and misses across all statements
+
+Statements are counted with engine events, into a counter held in a
+context variable. The counter is a mutable cell, so statements issued by
+tasks spawned during the request (which copy the context) are counted too.
+Work handed to long-lived background tasks, such as the group committer,
+is not.
+
+The header is written when the response starts. get_write_db commits
+before that, so statements flushed by the commit are in the header;
+those of background tasks, which run after the response is sent, show up
+in the totals but not in the header.
+"""
+
+import os
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+
+# Add X-Query-Count to every HTTP response
+QUERY_COUNT_HEADER = os.getenv("QUERY_COUNT_HEADER", "false").lower() == "true"
+
+# Statements executed by the current request, if one is being counted
+_current_count: ContextVar[Optional[List[int]]] = ContextVar("query_count", default=None)
+
+
+# Compiled-cache outcomes of every compiled statement (raw driver SQL such
+# as BEGIN has nothing to cache and isn't counted)
+_cache_counts: Dict[str, int] = {"hits": 0, "misses": 0, "uncached": 0}
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    """before_cursor_execute listener: count a statement for the current request."""
+    count = _current_count.get()
+    if count is not None:
+        count[0] += 1
+    if context is not None and context.compiled is not None:
+        if context.cache_hit is CACHE_HIT:
+            _cache_counts["hits"] += 1
+        elif context.cache_hit is CACHE_MISS:
+            _cache_counts["misses"] += 1
+        else:
+            _cache_counts["uncached"] += 1
+
+
+def statement_cache_stats() -> dict:
+    """
+    Get compiled-statement cache outcomes.
+
+    A miss means SQLAlchemy compiled the statement's SQL; "uncached"
+    statements could not be cached at all.
+
+    Returns:
+        dict: Hits, misses, uncached statements and the hit rate
+    """
+    compiled = _cache_counts["hits"] + _cache_counts["misses"]
+    return {
+        **_cache_counts,
+        "hit_rate": round(_cache_counts["hits"] / compiled, 4) if compiled else None,
+    }
+
+
+def install(*engines):
+    """
+    Count statements executed on the given async engines.
+
+    Args:
+        engines: AsyncEngine instances (duplicates are ignored)
+    """
+    for engine in {id(engine): engine for engine in engines}.values():
+        event.listen(engine.sync_engine, "before_cursor_execute", _count_statement)
+
+
+def start_count() -> List[int]:
+    """
+    Start counting statements in the current context.
+
+    Returns:
+        List[int]: Counter cell; element 0 is the number of statements so far
+    """
+    count = [0]
+    _current_count.set(count)
+    return count
+
+
+def current_count() -> Optional[int]:
+    """
+    Statements executed so far in the current context.
+
+    Returns:
+        Optional[int]: The count, or None if nothing is being counted
+    """
+    count = _current_count.get()
+    return None if count is None else count[0]
+
+
+class QueryCountMiddleware:
+    """
+    ASGI middleware counting statements per HTTP request.
+
+    Handles:
+    - Starting a fresh count for every HTTP request
+    - Adding X-Query-Count to the response when QUERY_COUNT_HEADER is set
+    - Request and statement totals
+    """
+
+    # Shared by every instance, so stats are available without a reference
+    # to the middleware Starlette builds
+    requests = 0
+    queries = 0
+    max_queries = 0
+
+    def __init__(self, app, header: bool = QUERY_COUNT_HEADER):
+        self.app = app
+        self.header = header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        count = start_count()
+
+        async def send_with_count(message):
+            if self.header and message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"x-query-count", str(count[0]).encode()),
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            cls = QueryCountMiddleware
+            cls.requests += 1
+            cls.queries += count[0]
+            cls.max_queries = max(cls.max_queries, count[0])
+
+    @classmethod
+    def stats(cls) -> dict:
+        """
+        Get query counting totals.
+
+        Returns:
+            dict: Requests counted, statements executed, the average and
+                maximum statements per request, and compiled-cache outcomes
+        """
+        return {
+            "requests": cls.requests,
+            "queries": cls.queries,
+            "average_per_request": round(cls.queries / cls.requests, 2) if cls.requests else 0,
+            "max_per_request": cls.max_queries,
+            "statement_cache": statement_cache_stats(),
+        }
@@ -0,0 +1,355 @@
+"""
+Login Rate Limiting
+
+This module handles:
+- Sliding-window rate limits keyed per client IP and per email address
+- An in-memory backend for single-worker deployments
+- An optional Redis backend shared by all workers (RATE_LIMIT_BACKEND=redis)
+- Counting allowed and limited attempts per limit
+- Resolving the client IP behind trusted reverse proxies
+
+Every login attempt costs a full Argon2 verification, so limits are
+checked before the user lookup and before any hashing.
+
+The sliding window is approximated with two fixed-window counters: the
+current window's count plus the previous window's count weighted by how
+much of it still overlaps the sliding window. Each key needs two integers
+instead of a timestamp per request.
+"""
+
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Limits (attempts per window)
+LOGIN_IP_LIMIT = int(os.getenv("LOGIN_IP_LIMIT", "20"))
+LOGIN_IP_WINDOW_SECONDS = float(os.getenv("LOGIN_IP_WINDOW_SECONDS", "60"))
+LOGIN_EMAIL_LIMIT = int(os.getenv("LOGIN_EMAIL_LIMIT", "10"))
+LOGIN_EMAIL_WINDOW_SECONDS = float(os.getenv("LOGIN_EMAIL_WINDOW_SECONDS", "300"))
+
+# Backend: "memory" (per worker) or "redis" (shared, needs the redis package)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+# Keys tracked by the memory backend before stale ones are swept
+RATE_LIMIT_SWEEP_THRESHOLD = int(os.getenv("RATE_LIMIT_SWEEP_THRESHOLD", "10000"))
+# Reverse proxies in front of the app that append the client address to
+# X-Forwarded-For (or set X-Real-IP); 0 ignores both headers
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a limit is reached; carries the seconds until a retry may succeed."""
+
+    def __init__(self, scope: str, retry_after: int):
+        super().__init__(f"Too many attempts for this {scope}")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def _window_position(window: float, now: float) -> Tuple[int, float]:
+    """Index of the current fixed window and the fraction of it elapsed."""
+    index = int(now // window)
+    return index, (now - index * window) / window
+
+
+def _estimate(current: int, previous: int, fraction: float) -> float:
+    """Sliding-window count: previous window weighted by its remaining overlap."""
+    return previous * (1 - fraction) + current
+
+
+def _retry_after(current: int, previous: int, limit: int, window: float, fraction: float) -> int:
+    """Seconds until the sliding-window count drops below the limit."""
+    if current >= limit:
+        # Wait for this window to end, then for its weight to decay below the limit
+        wait = window * (1 - fraction) + window * (1 - limit / current)
+    else:
+        # Wait for the previous window's weight to decay enough
+        wait = window * (1 - (limit - current) / previous - fraction)
+    return max(1, math.ceil(wait))
+
+
+class MemoryBackend:
+    """
+    Per-process sliding-window counters.
+
+    Stale keys are swept once the table grows past a threshold, which then
+    doubles, so sweeping stays amortized O(1) per hit.
+    """
+
+    def __init__(self, sweep_threshold: int = RATE_LIMIT_SWEEP_THRESHOLD):
+        # key -> [window index, current count, previous count, window seconds]
+        self._counters: Dict[str, List] = {}
+        self._sweep_threshold = sweep_threshold
+        self._next_sweep = sweep_threshold
+
+    async def hit(self, key: str, limit: int, window: float) -> Tuple[bool, int]:
+        """
+        Count an attempt unless the key is at its limit.
+
+        Args:
+            key: Limited key (already namespaced by limit)
+            limit: Attempts allowed per window
+            window: Window length in seconds
+
+        Returns:
+            Tuple[bool, int]: Whether the attempt is allowed, and the seconds
+                to wait before retrying if it is not
+        """
+        now = time.time()
+        index, fraction = _window_position(window, now)
+        entry = self._counters.get(key)
+        if entry is None or entry[0] < index - 1:
+            entry = [index, 0, 0, window]
+            self._counters[key] = entry
+        elif entry[0] == index - 1:
+            entry[0], entry[1], entry[2] = index, 0, entry[1]
+
+        if _estimate(entry[1], entry[2], fraction) >= limit:
+            return False, _retry_after(entry[1], entry[2], limit, window, fraction)
+
+        entry[1] += 1
+        if len(self._counters) > self._next_sweep:
+            self._sweep(now)
+        return True, 0
+
+    def _sweep(self, now: float):
+        """Drop keys whose counters no longer affect the sliding window."""
+        self._counters = {
+            key: entry
+            for key, entry in self._counters.items()
+            if entry[0] >= int(now // entry[3]) - 1
+        }
+        self._next_sweep = max(self._sweep_threshold, 2 * len(self._counters))
+
+    async def aclose(self):
+        """Nothing to release for the memory backend."""
+
+    def stats(self) -> dict:
+        """Backend name and tracked keys."""
+        return {"backend": "memory", "keys": len(self._counters)}
+
+
+# Check-and-increment in one round trip, atomic across workers
+_REDIS_HIT_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[1]) + current >= tonumber(ARGV[2]) then
+    return {0, current, previous}
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, current + 1, previous}
+"""
+
+
+class RedisBackend:
+    """
+    Sliding-window counters in Redis, shared by every worker.
+
+    Each fixed window is its own key expiring after two windows, and the
+    check-and-increment runs as a Lua script.
+    """
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL):
+        # Imported lazily so redis is only needed when this backend is chosen
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_HIT_SCRIPT)
+
+    async def hit(self, key: str, limit: int, window: float) -> Tuple[bool, int]:
+        """
+        Count an attempt unless the key is at its limit.
+
+        Args:
+            key: Limited key (already namespaced by limit)
+            limit: Attempts allowed per window
+            window: Window length in seconds
+
+        Returns:
+            Tuple[bool, int]: Whether the attempt is allowed, and the seconds
+                to wait before retrying if it is not
+        """
+        index, fraction = _window_position(window, time.time())
+        allowed, current, previous = await self._script(
+            keys=[f"ratelimit:{key}:{index}", f"ratelimit:{key}:{index - 1}"],
+            args=[1 - fraction, limit, math.ceil(window * 2)],
+        )
+        if allowed:
+            return True, 0
+        return False, _retry_after(int(current), int(previous), limit, window, fraction)
+
+    async def aclose(self):
+        """Close the Redis connection pool."""
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        """Backend name."""
+        return {"backend": "redis"}
+
+
+def create_backend(name: str = RATE_LIMIT_BACKEND):
+    """
+    Create the configured rate limit backend.
+
+    Args:
+        name: "memory" or "redis"
+
+    Returns:
+        MemoryBackend or RedisBackend
+    """
+    if name == "redis":
+        return RedisBackend()
+    if name != "memory":
+        raise ValueError(f"Unknown rate limit backend: {name}")
+    return MemoryBackend()
+
+
+class SlidingWindowLimiter:
+    """A named limit of `limit` attempts per `window` seconds for each key."""
+
+    def __init__(self, name: str, limit: int, window: float, backend):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.backend = backend
+
+        # Counters
+        self.allowed = 0
+        self.limited = 0
+
+    async def hit(self, key: str):
+        """
+        Count an attempt for a key.
+
+        Args:
+            key: Value being limited (IP address, email, ...)
+
+        Raises:
+            RateLimitExceeded: If the key is at its limit
+        """
+        allowed, retry_after = await self.backend.hit(
+            f"{self.name}:{key}", self.limit, self.window
+        )
+        if not allowed:
+            self.limited += 1
+            raise RateLimitExceeded(self.name, retry_after)
+        self.allowed += 1
+
+    def stats(self) -> dict:
+        """Limit settings with allowed and limited counts."""
+        return {
+            "limit": self.limit,
+            "window_seconds": self.window,
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+def client_ip(request, trusted_hops: int = TRUSTED_PROXY_HOPS) -> str:
+    """
+    Address of the client that sent a request.
+
+    Behind proxies every request comes from the proxy's address, so the
+    per-IP limit would lock out everyone at once. Each trusted proxy
+    appends the address it received from to X-Forwarded-For; the entry
+    `trusted_hops` from the right is the client as seen by the outermost
+    trusted proxy. Entries further left are set by the client and ignored.
+
+    Args:
+        request: Incoming request
+        trusted_hops: Number of trusted proxies in front of the app
+
+    Returns:
+        str: Client IP address
+    """
+    peer = request.client.host if request.client else "unknown"
+    if trusted_hops <= 0:
+        return peer
+
+    forwarded = [
+        address.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for address in header.split(",")
+        if address.strip()
+    ]
+    if forwarded:
+        return forwarded[-min(trusted_hops, len(forwarded))]
+    real_ip = request.headers.get("x-real-ip", "").strip()
+    return real_ip or peer
+
+
+class LoginThrottle:
+    """
+    Login attempt limits per client IP and per email address.
+
+    The IP limit stops one client from trying many accounts; the email
+    limit stops many clients from trying one account.
+    """
+
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend: Counter backend; created from RATE_LIMIT_BACKEND on start if omitted
+        """
+        self.backend = backend
+        self.per_ip: Optional[SlidingWindowLimiter] = None
+        self.per_email: Optional[SlidingWindowLimiter] = None
+        if backend is not None:
+            self._create_limiters()
+
+    def _create_limiters(self):
+        """Create both limits on the current backend."""
+        self.per_ip = SlidingWindowLimiter(
+            "ip", LOGIN_IP_LIMIT, LOGIN_IP_WINDOW_SECONDS, self.backend
+        )
+        self.per_email = SlidingWindowLimiter(
+            "email", LOGIN_EMAIL_LIMIT, LOGIN_EMAIL_WINDOW_SECONDS, self.backend
+        )
+
+    def start(self):
+        """Create the configured backend. Called on application startup."""
+        if self.backend is None:
+            self.backend = create_backend()
+            self._create_limiters()
+
+    async def check(self, client_ip: str, email: str):
+        """
+        Count a login attempt against both limits.
+
+        Args:
+            client_ip: Address of the client
+            email: Email address being logged into
+
+        Raises:
+            RateLimitExceeded: If either limit is reached
+        """
+        if self.backend is None:
+            self.start()
+        await self.per_ip.hit(client_ip)
+        await self.per_email.hit(email.strip().lower())
+
+    async def shutdown(self):
+        """Release the backend. Called on application shutdown."""
+        if self.backend is not None:
+            await self.backend.aclose()
+
+    def stats(self) -> dict:
+        """
+        Get throttling counters.
+
+        Returns:
+            dict: Backend details and per-limit counters
+        """
+        if self.backend is None:
+            return {"backend": None}
+        return {
+            **self.backend.stats(),
+            "ip": self.per_ip.stats(),
+            "email": self.per_email.stats(),
+        }
+
+
+# Shared throttle used by the login endpoint
+login_throttle = LoginThrottle()
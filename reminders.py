@@ -0,0 +1,424 @@
+"""
+Appointment Reminder Scheduler
+
+This module handles:
+- Loading upcoming appointments incrementally, one time window at a time
+- Keeping due reminders in a min-heap ordered by fire time
+- Firing reminder emails (via the outbox) and reminder notifications at
+  configurable offsets before each appointment
+- Scheduling and unscheduling reminders as appointments are booked and
+  cancelled, without rescanning the appointments table
+
+Heap entries are plain integers packing the fire time, appointment id and
+offset index, so hundreds of thousands of reminders cost tens of bytes
+each. Cancelled appointments are removed lazily: their heap entries stay
+until popped and are skipped because the appointment is no longer
+registered at that time.
+"""
+
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+
+from database import AsyncSessionLocal, ReadSessionLocal
+from models import Appointment, EmailOutbox
+from email_outbox import enqueue_email
+from services import NotificationService
+
+# Reminder offsets before the appointment, in hours (e.g. "24,1")
+REMINDER_OFFSETS_HOURS = [
+    float(hours)
+    for hours in os.getenv("REMINDER_OFFSETS_HOURS", "24,1").split(",")
+    if hours.strip()
+]
+# How far ahead reminders are loaded into memory
+REMINDER_HORIZON_HOURS = float(os.getenv("REMINDER_HORIZON_HOURS", "12"))
+# Rows per query when loading, and reminders per transaction when firing
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+# Longest sleep between checks, so the horizon keeps moving while idle
+REMINDER_MAX_SLEEP_SECONDS = float(os.getenv("REMINDER_MAX_SLEEP_SECONDS", "30"))
+
+notification_service = NotificationService()
+
+# Heap entry layout: fire time (epoch seconds) | appointment id | offset index
+_OFFSET_BITS = 4
+_ID_BITS = 36
+_OFFSET_MASK = (1 << _OFFSET_BITS) - 1
+_ID_MASK = (1 << _ID_BITS) - 1
+_TIME_SHIFT = _ID_BITS + _OFFSET_BITS
+
+# Compact the heap once this share of its entries belongs to unscheduled appointments
+_COMPACT_RATIO = 0.5
+
+# How long shutdown waits for the batch being fired before cancelling the loop
+_SHUTDOWN_TIMEOUT_SECONDS = 10
+
+
+def _pack(fire_at: int, appointment_id: int, offset_index: int) -> int:
+    """Encode a reminder as one heap-ordered integer."""
+    return (fire_at << _TIME_SHIFT) | (appointment_id << _OFFSET_BITS) | offset_index
+
+
+def _unpack(entry: int) -> Tuple[int, int, int]:
+    """Decode a heap entry into (fire time, appointment id, offset index)."""
+    return entry >> _TIME_SHIFT, (entry >> _OFFSET_BITS) & _ID_MASK, entry & _OFFSET_MASK
+
+
+def _time_until(offset_seconds: int) -> str:
+    """Human-readable distance to the appointment, e.g. "in 24 hours"."""
+    if offset_seconds % 3600 == 0:
+        hours = offset_seconds // 3600
+        return f"in {hours} hour" if hours == 1 else f"in {hours} hours"
+    minutes = offset_seconds // 60
+    return f"in {minutes} minute" if minutes == 1 else f"in {minutes} minutes"
+
+
+def reminder_key(appointment_id: int, offset_seconds: int) -> str:
+    """Idempotency key of one appointment reminder email."""
+    return f"appointment-{appointment_id}-reminder-{offset_seconds}s"
+
+
+class ReminderScheduler:
+    """
+    Background task that sends appointment reminders.
+
+    Handles:
+    - Loading reminders that fire within the horizon, window by window
+    - Sleeping until the earliest reminder (or the next window load)
+    - Skipping reminders of cancelled appointments lazily
+    - Queueing the reminder email and storing a reminder notification
+    """
+
+    def __init__(
+        self,
+        offsets_hours: List[float] = REMINDER_OFFSETS_HOURS,
+        horizon_hours: float = REMINDER_HORIZON_HOURS,
+        batch_size: int = REMINDER_BATCH_SIZE,
+        on_sent: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+    ):
+        """
+        Args:
+            offsets_hours: Hours before each appointment to send a reminder
+            horizon_hours: How far ahead reminders are held in memory
+            batch_size: Rows per load query and reminders per transaction
+            on_sent: Coroutine called with the notifications of each batch
+                of reminders once it has committed
+        """
+        # Largest offset first, so offset index order matches firing order
+        self.offsets = sorted({int(hours * 3600) for hours in offsets_hours}, reverse=True)
+        if len(self.offsets) > _OFFSET_MASK + 1:
+            raise ValueError(f"At most {_OFFSET_MASK + 1} reminder offsets are supported")
+        self.horizon = int(horizon_hours * 3600)
+        self.batch_size = batch_size
+        self.on_sent = on_sent
+
+        self._heap: List[int] = []
+        # Appointment id -> appointment time (epoch seconds) for live appointments
+        self._appointments: Dict[int, int] = {}
+        # Fire times below this bound have been loaded into the heap
+        self._loaded_until: Optional[int] = None
+        self._stale = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+        # Counters
+        self.sent = 0
+        self.skipped = 0
+        self.loaded = 0
+
+    def start(self):
+        """Start the scheduler loop. Called on application startup."""
+        if self._task is None:
+            self._stopping = False
+            # Bound to the running loop on first use; a restart gets a new loop
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        """
+        Stop the scheduler. Reminders are reloaded from the database on startup.
+
+        The loop finishes the batch it is firing and exits on its own; it is
+        only cancelled if that takes longer than the shutdown timeout.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                async with asyncio.timeout(_SHUTDOWN_TIMEOUT_SECONDS):
+                    await self._task
+            except TimeoutError:
+                print("[WARNING] Reminder scheduler did not stop in time, cancelled it")
+            self._task = None
+
+    async def schedule(self, appointment_id: int, appointment_time: datetime):
+        """
+        Register a newly booked appointment's reminders.
+
+        Reminders firing beyond the loaded window are left to the loader.
+        A coroutine so that, when scheduled as a background task, it runs on
+        the event loop rather than in Starlette's threadpool.
+
+        Args:
+            appointment_id: ID of the appointment
+            appointment_time: When the appointment starts
+        """
+        if self._loaded_until is None:
+            return  # The initial load will pick it up
+        now = int(time.time())
+        appointment_at = int(appointment_time.timestamp())
+        if appointment_at <= now:
+            return
+        previous = self._heap[0] if self._heap else None
+        self._add(appointment_id, appointment_at, now, self._loaded_until, now)
+        if self._heap and self._heap[0] != previous:
+            self._wakeup.set()
+
+    async def unschedule(self, appointment_id: int):
+        """
+        Drop an appointment's pending reminders.
+
+        Heap entries are discarded lazily when they come due.
+
+        Args:
+            appointment_id: ID of the cancelled appointment
+        """
+        if self._appointments.pop(appointment_id, None) is not None:
+            self._stale += len(self.offsets)
+            if self._stale > len(self._heap) * _COMPACT_RATIO:
+                self._compact()
+
+    def _add(
+        self,
+        appointment_id: int,
+        appointment_at: int,
+        window_start: Optional[int],
+        window_end: int,
+        now: int,
+    ):
+        """
+        Push an appointment's reminders that fire within a window.
+
+        With no window start (initial load), reminders that are already due
+        collapse into the most recent one, so a restart never sends a burst
+        of outdated reminders. The appointment is only tracked while it has
+        reminders left to fire.
+        """
+        entries = []
+        later = False
+        overdue = None
+        for index, offset in enumerate(self.offsets):
+            fire_at = appointment_at - offset
+            if fire_at >= window_end:
+                later = True
+            elif window_start is None and fire_at <= now:
+                overdue = _pack(fire_at, appointment_id, index)
+            elif window_start is None or fire_at >= window_start:
+                entries.append(_pack(fire_at, appointment_id, index))
+        if overdue is not None:
+            entries.append(overdue)
+
+        if entries or later:
+            self._appointments[appointment_id] = appointment_at
+        for entry in entries:
+            heapq.heappush(self._heap, entry)
+
+    def _compact(self):
+        """Rebuild the heap without entries of unscheduled appointments."""
+        self._heap = [entry for entry in self._heap if self._is_live(*_unpack(entry))]
+        heapq.heapify(self._heap)
+        self._stale = 0
+
+    def _is_live(self, fire_at: int, appointment_id: int, offset_index: int) -> bool:
+        """Whether a heap entry still matches a registered appointment."""
+        return self._appointments.get(appointment_id) == fire_at + self.offsets[offset_index]
+
+    def pop_due(self, now: int) -> List[Tuple[int, int]]:
+        """
+        Remove reminders that are due, skipping stale entries.
+
+        Args:
+            now: Current time in epoch seconds
+
+        Returns:
+            List[Tuple[int, int]]: (appointment id, offset seconds) per due reminder
+        """
+        due = []
+        last_index = len(self.offsets) - 1
+        while self._heap and self._heap[0] >> _TIME_SHIFT <= now and len(due) < self.batch_size:
+            fire_at, appointment_id, offset_index = _unpack(heapq.heappop(self._heap))
+            if not self._is_live(fire_at, appointment_id, offset_index):
+                self._stale = max(0, self._stale - 1)
+                continue
+            due.append((appointment_id, self.offsets[offset_index]))
+            if offset_index == last_index:
+                # Last reminder for this appointment; stop tracking it
+                del self._appointments[appointment_id]
+        return due
+
+    async def _run(self):
+        """Load windows and fire due reminders until shut down."""
+        while not self._stopping:
+            try:
+                now = int(time.time())
+                if self._loaded_until is None or self._loaded_until - now < self.horizon // 2:
+                    await self._load_window(now)
+
+                due = self.pop_due(now)
+                if due:
+                    await self._fire(due)
+                    continue
+            except Exception as e:
+                print(f"[ERROR] Reminder scheduler failed: {str(e)}")
+
+            if self._stopping:
+                break
+            delay = REMINDER_MAX_SLEEP_SECONDS
+            if self._heap:
+                delay = min(delay, max(0, (self._heap[0] >> _TIME_SHIFT) - time.time()))
+            try:
+                async with asyncio.timeout(delay):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _load_window(self, now: int):
+        """
+        Load reminders firing before now + horizon that are not loaded yet.
+
+        Appointments are read in keyset-paginated batches of (time, id), so
+        each query is an index range scan regardless of table size.
+        """
+        window_start = self._loaded_until
+        window_end = now + self.horizon
+        # Advance first: appointments booked during the load are pushed by
+        # schedule(); any duplicate is dropped by the idempotency key check
+        self._loaded_until = window_end
+
+        lower = now if window_start is None else window_start + self.offsets[-1]
+        upper = window_end + self.offsets[0]
+        last = (datetime.fromtimestamp(lower), 0)
+        async with ReadSessionLocal() as session:
+            while True:
+                rows = (
+                    await session.execute(
+                        select(Appointment.id, Appointment.appointment_time)
+                        .where(
+                            Appointment.status == "confirmed",
+                            tuple_(Appointment.appointment_time, Appointment.id) > last,
+                            Appointment.appointment_time < datetime.fromtimestamp(upper),
+                        )
+                        .order_by(Appointment.appointment_time, Appointment.id)
+                        .limit(self.batch_size)
+                    )
+                ).all()
+                for appointment_id, appointment_time in rows:
+                    appointment_at = int(appointment_time.timestamp())
+                    if appointment_at > now:
+                        self._add(appointment_id, appointment_at, window_start, window_end, now)
+                self.loaded += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+                last = tuple(rows[-1])
+                await asyncio.sleep(0)  # Let requests run between batches
+
+    async def _fire(self, due: List[Tuple[int, int]]):
+        """Queue reminder emails and notifications for one batch of due reminders."""
+        keys = {
+            reminder_key(appointment_id, offset): (appointment_id, offset)
+            for appointment_id, offset in due
+        }
+        notifications = []
+        async with AsyncSessionLocal() as session:
+            appointments = {
+                appointment.id: appointment
+                for appointment in (
+                    await session.execute(
+                        select(Appointment).where(
+                            Appointment.id.in_({appointment_id for appointment_id, _ in due}),
+                            Appointment.status == "confirmed",
+                        )
+                    )
+                ).scalars()
+            }
+            already_queued = set(
+                (
+                    await session.execute(
+                        select(EmailOutbox.idempotency_key).where(
+                            EmailOutbox.idempotency_key.in_(keys)
+                        )
+                    )
+                ).scalars()
+            )
+
+            for key, (appointment_id, offset) in keys.items():
+                appointment = appointments.get(appointment_id)
+                if appointment is None or key in already_queued:
+                    self.skipped += 1
+                    continue
+
+                time_until = _time_until(offset)
+                await enqueue_email(
+                    session,
+                    "appointment_reminder",
+                    {
+                        "client_email": appointment.client_email,
+                        "client_name": appointment.client_name,
+                        "appointment_time": appointment.appointment_time,
+                        "time_until": time_until,
+                    },
+                    idempotency_key=key,
+                )
+                message = (
+                    f"Reminder: {appointment.client_name}'s appointment on "
+                    f"{appointment.appointment_time.strftime('%Y-%m-%d %H:%M')} is {time_until}"
+                )
+                await notification_service.create_notification(
+                    appointment_id=appointment.id,
+                    notification_type="reminder",
+                    message=message,
+                    db=session,
+                )
+                notifications.append(
+                    {
+                        "type": "reminder",
+                        "title": "Appointment Reminder",
+                        "message": message,
+                        "appointment_id": appointment.id,
+                        "client_name": appointment.client_name,
+                        "client_email": appointment.client_email,
+                        "appointment_time": appointment.appointment_time.isoformat(),
+                    }
+                )
+            await session.commit()
+
+        self.sent += len(notifications)
+        if notifications and self.on_sent is not None:
+            await self.on_sent(notifications)
+
+    def stats(self) -> dict:
+        """
+        Get scheduler counters.
+
+        Returns:
+            dict: Heap size, tracked appointments and reminder counters
+        """
+        next_fire = _unpack(self._heap[0])[0] if self._heap else None
+        return {
+            "scheduled": len(self._heap),
+            "appointments": len(self._appointments),
+            "loaded_until": datetime.fromtimestamp(self._loaded_until).isoformat()
+            if self._loaded_until
+            else None,
+            "next_reminder_at": datetime.fromtimestamp(next_fire).isoformat() if next_fire else None,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "loaded": self.loaded,
+        }
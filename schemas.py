@@ -7,7 +7,7 @@ This module defines:
 - Data transformation and validation rules
 """
 
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, validator
 from datetime import datetime
 from typing import Optional, List
 
@@ -111,6 +111,34 @@ class AvailableSlotResponse(BaseModel):
         }
 
 
+class DailyCapacityResponse(BaseModel):
+    """
+    Schema for a day's booking capacity.
+
+    Attributes:
+        date: The day (YYYY-MM-DD)
+        total_slots: Bookable slots on the day (0 on weekends)
+        free_slots: Slots still available
+        is_fully_booked: Whether the day has slots and none are free
+    """
+
+    date: str
+    total_slots: int
+    free_slots: int
+    is_fully_booked: bool
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "date": "2024-01-15",
+                "total_slots": 7,
+                "free_slots": 0,
+                "is_fully_booked": True,
+            }
+        }
+    )
+
+
 class NotificationResponse(BaseModel):
     """
     Schema for notification response data.
@@ -223,3 +251,5 @@ class AuthResponse(BaseModel):
     """Schema for authentication response."""
     message: str
     user: UserResponse
+    access_token: Optional[str] = None
+    token_type: str = "bearer"
@@ -6,17 +6,38 @@ This module contains the core business logic for:
 - Availability checking
 - Notification handling
 - Calendar operations
+- Per-day capacity counters
 
 Services are decoupled from FastAPI routes for better testability and reusability.
 """
 
 from datetime import datetime, timedelta, time, date
-from typing import List, Optional
-from sqlalchemy import select, and_, or_
+from typing import List, Optional, Set
+from sqlalchemy import select, and_, or_, bindparam, delete, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import Appointment, Owner, Notification
-from schemas import AvailableSlotResponse, CalendarEventResponse
+from models import Appointment, DailyCapacity, Owner, Notification
+from schemas import AvailableSlotResponse, CalendarEventResponse, DailyCapacityResponse
+
+# Hot queries, built once with bound parameters. Reusing the same statement
+# object skips rebuilding the construct and its cache key on every call,
+# and always hits the engine's compiled-statement cache.
+APPOINTMENT_BY_ID = select(Appointment).where(Appointment.id == bindparam("appointment_id"))
+# Non-cancelled appointments starting within [day_start, before)
+ACTIVE_APPOINTMENTS_BETWEEN = select(Appointment).where(
+    Appointment.status != "cancelled",
+    Appointment.appointment_time >= bindparam("day_start"),
+    Appointment.appointment_time < bindparam("before"),
+)
+# INSERT ... ON CONFLICT DO UPDATE, for the dialects that support it
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+ALL_NOTIFICATIONS = select(Notification).order_by(Notification.created_at.desc())
+# Capacity rows for days in [first_day, end_day)
+DAILY_CAPACITY_BETWEEN = select(DailyCapacity).where(
+    DailyCapacity.day >= bindparam("first_day"),
+    DailyCapacity.day < bindparam("end_day"),
+)
 
 
 class AppointmentService:
@@ -30,8 +51,15 @@ class AppointmentService:
     - Calendar views
     """
 
+    def __init__(self, capacity_service: Optional["CapacityService"] = None):
+        # Recounts the day of every booking and cancellation
+        self.capacity = capacity_service or CapacityService()
+
     async def create_appointment(
-        self, appointment_data, db: AsyncSession
+        self,
+        appointment_data,
+        db: AsyncSession,
+        day_appointments: Optional[List[Appointment]] = None,
     ) -> Appointment:
         """
         Create a new appointment in the database.
@@ -39,6 +67,8 @@ class AppointmentService:
         Args:
             appointment_data: AppointmentCreate schema
             db: Database session
+            day_appointments: The day's active appointments, if the caller
+                already read them for its conflict check
 
         Returns:
             Appointment: Created appointment object
@@ -56,9 +86,15 @@ class AppointmentService:
             notes=appointment_data.notes,
         )
 
+        # Flushing fills in the id and the client-side defaults, so no
+        # refresh (a second SELECT) is needed
         db.add(appointment)
         await db.flush()
-        await db.refresh(appointment)
+        if day_appointments is None:
+            day_appointments = await self.capacity.availability.get_day_appointments(
+                appointment_time.date(), db
+            )
+        await self.capacity.record_booking(appointment, day_appointments, db)
         return appointment
 
     async def get_all_appointments(self, db: AsyncSession) -> List[Appointment]:
@@ -89,9 +125,7 @@ class AppointmentService:
         Returns:
             Optional[Appointment]: Appointment object or None if not found
         """
-        result = await db.execute(
-            select(Appointment).where(Appointment.id == appointment_id)
-        )
+        result = await db.execute(APPOINTMENT_BY_ID, {"appointment_id": appointment_id})
         return result.scalar_one_or_none()
 
     async def delete_appointment(
@@ -111,8 +145,9 @@ class AppointmentService:
         if not appointment:
             return False
 
-        appointment.status = "cancelled"
-        await db.flush()
+        if appointment.status != "cancelled":
+            appointment.status = "cancelled"
+            await self.capacity.record_cancellation(appointment, db)
         return True
 
     async def get_calendar_view(self, db: AsyncSession) -> dict:
@@ -174,6 +209,7 @@ class AvailabilityService:
         Check if a specific time slot is available.
 
         Validates:
+        - Day is a weekday
         - Time is within business hours
         - Time is not during lunch break
         - No conflicting appointments exist
@@ -186,38 +222,66 @@ class AvailabilityService:
         Returns:
             bool: True if slot is available, False otherwise
         """
-        # Check business hours
-        if not self._is_within_business_hours(appointment_time):
+        # Check business hours and lunch break before reading anything
+        if not self._is_bookable_time(appointment_time):
             return False
 
-        # Check lunch break
-        if self._is_lunch_break(appointment_time):
-            return False
+        appointments = await self.get_day_appointments(appointment_time.date(), db)
+        return self.is_available(appointment_time, appointments)
 
-        # Check for conflicting appointments
-        end_time = appointment_time + timedelta(minutes=self.SESSION_DURATION)
-        
-        # Get all non-cancelled appointments
+    async def get_day_appointments(self, day: date, db: AsyncSession) -> List[Appointment]:
+        """
+        Get a day's non-cancelled appointments in one indexed range read.
+
+        Args:
+            day: Date to read
+            db: Database session
+
+        Returns:
+            List[Appointment]: Active appointments starting on that day
+        """
+        day_start = datetime.combine(day, time.min)
         result = await db.execute(
-            select(Appointment).where(
-                Appointment.status != "cancelled"
-            )
+            ACTIVE_APPOINTMENTS_BETWEEN,
+            {"day_start": day_start, "before": day_start + timedelta(days=1)},
         )
-        appointments = result.scalars().all()
-        
+        return result.scalars().all()
+
+    def is_available(
+        self, appointment_time: datetime, appointments: List[Appointment]
+    ) -> bool:
+        """
+        Check a slot against the day's appointments, without a query.
+
+        Args:
+            appointment_time: Requested appointment datetime
+            appointments: Active appointments on the same day
+
+        Returns:
+            bool: True if slot is available, False otherwise
+        """
+        if not self._is_bookable_time(appointment_time):
+            return False
+
         # Check if any appointment conflicts with the requested time
+        end_time = appointment_time + timedelta(minutes=self.SESSION_DURATION)
         for apt in appointments:
-            # Only check appointments on the same date
-            if apt.appointment_time.date() != appointment_time.date():
-                continue
-                
             apt_end = apt.appointment_time + timedelta(minutes=apt.duration_minutes)
             # Check if there's an overlap
             if apt.appointment_time < end_time and apt_end > appointment_time:
                 return False
-        
+
         return True
 
+    def _is_bookable_time(self, appointment_time: datetime) -> bool:
+        """Weekday, business hours and lunch break checks, which need no appointments."""
+        # No slots on weekends (5=Saturday, 6=Sunday), as in get_available_slots
+        if appointment_time.weekday() >= 5:
+            return False
+        return self._is_within_business_hours(
+            appointment_time
+        ) and not self._is_lunch_break(appointment_time)
+
     async def get_available_slots(
         self, slot_date: datetime.date, db: AsyncSession
     ) -> List[AvailableSlotResponse]:
@@ -251,6 +315,69 @@ class AvailabilityService:
         if slot_date < today or (slot_date - today).days > 30:
             return available_slots  # No slots outside 30-day window
 
+        for current_time in self._slot_times(slot_date):
+            # Check if slot is available
+            is_available = await self.check_availability(current_time, db)
+
+            slot_end = current_time + timedelta(minutes=self.SESSION_DURATION)
+
+            available_slots.append(
+                AvailableSlotResponse(
+                    time=current_time.isoformat(),
+                    end_time=slot_end.isoformat(),
+                    is_available=is_available,
+                )
+            )
+
+        return available_slots
+
+    async def get_slot_changes(
+        self, appointment_time: datetime, duration_minutes: int, db: AsyncSession
+    ) -> List[AvailableSlotResponse]:
+        """
+        Get the current state of the slots touched by an appointment.
+
+        Only slots overlapping the appointment window can change when it is
+        booked or cancelled, so this is the slot-level diff pushed to clients
+        instead of the full day returned by get_available_slots.
+
+        Args:
+            appointment_time: Start of the booked or cancelled appointment
+            duration_minutes: Duration of the appointment
+            db: Database session
+
+        Returns:
+            List[AvailableSlotResponse]: Affected slots with their new availability
+        """
+        changed_slots = []
+        appointment_end = appointment_time + timedelta(minutes=duration_minutes)
+
+        for current_time in self._slot_times(appointment_time.date()):
+            slot_end = current_time + timedelta(minutes=self.SESSION_DURATION)
+            if current_time >= appointment_end or slot_end <= appointment_time:
+                continue
+
+            is_available = await self.check_availability(current_time, db)
+            changed_slots.append(
+                AvailableSlotResponse(
+                    time=current_time.isoformat(),
+                    end_time=slot_end.isoformat(),
+                    is_available=is_available,
+                )
+            )
+
+        return changed_slots
+
+    def _slot_times(self, slot_date: date):
+        """
+        Generate the start time of every bookable slot on a date.
+
+        Args:
+            slot_date: Date to generate slots for
+
+        Yields:
+            datetime: Start time of each slot
+        """
         # Start from business hours start
         current_time = datetime.combine(slot_date, self.BUSINESS_START)
         business_end = datetime.combine(slot_date, self.BUSINESS_END)
@@ -265,23 +392,12 @@ class AvailabilityService:
                     break
                 continue
 
-            # Check if slot is available
-            is_available = await self.check_availability(current_time, db)
-
-            slot_end = current_time + timedelta(minutes=self.SESSION_DURATION)
-
-            available_slots.append(
-                AvailableSlotResponse(
-                    time=current_time.isoformat(),
-                    end_time=slot_end.isoformat(),
-                    is_available=is_available,
-                )
-            )
+            yield current_time
 
             # Move to next slot (session + break)
-            current_time = slot_end + timedelta(minutes=self.BREAK_DURATION)
-
-        return available_slots
+            current_time += timedelta(
+                minutes=self.SESSION_DURATION + self.BREAK_DURATION
+            )
 
     def _is_within_business_hours(self, appointment_time: datetime) -> bool:
         """
@@ -326,6 +442,219 @@ class AvailabilityService:
         return not (end_time <= lunch_start or apt_time >= lunch_end)
 
 
+class CapacityService:
+    """
+    Service maintaining per-day slot counts (the daily_capacity table).
+
+    Handles:
+    - Adjusting a day's counters when it is booked or cancelled
+    - Free slots per day for a range of days, in one indexed range read
+    - Rebuilding the counts from the appointments table
+    """
+
+    def __init__(self, availability_service: Optional[AvailabilityService] = None):
+        self.availability = availability_service or AvailabilityService()
+
+    def total_slots(self, day: date) -> int:
+        """
+        Count the bookable slots on a day.
+
+        Args:
+            day: Date to count
+
+        Returns:
+            int: Number of slots (0 on weekends, like get_available_slots)
+        """
+        if day.weekday() >= 5:
+            return 0
+        return sum(1 for _ in self.availability._slot_times(day))
+
+    def _blocked_slots(self, day: date, appointments: List[Appointment]) -> Set[datetime]:
+        """Start times of the day's slots overlapped by any of the appointments."""
+        if day.weekday() >= 5:
+            return set()
+        session = timedelta(minutes=self.availability.SESSION_DURATION)
+        # Same overlap rule as check_availability
+        return {
+            slot_start
+            for slot_start in self.availability._slot_times(day)
+            if any(
+                apt.appointment_time < slot_start + session and apt.end_time > slot_start
+                for apt in appointments
+            )
+        }
+
+    def _free_slots(self, day: date, appointments: List[Appointment]) -> int:
+        """Count the day's slots not overlapped by any of the appointments."""
+        return self.total_slots(day) - len(self._blocked_slots(day, appointments))
+
+    async def record_booking(
+        self, appointment: Appointment, day_appointments: List[Appointment], db: AsyncSession
+    ):
+        """
+        Count a new booking against its day in the caller's transaction.
+
+        Only the slots the booking blocks that no other appointment already
+        blocks stop being free; the counters change in one atomic statement.
+
+        Args:
+            appointment: The booked appointment
+            day_appointments: The day's active appointments, as read for
+                the conflict check (may or may not include the new one)
+            db: Database session
+        """
+        others = [apt for apt in day_appointments if apt.id != appointment.id]
+        await self._adjust(appointment, others, booked=True, db=db)
+
+    async def record_cancellation(self, appointment: Appointment, db: AsyncSession):
+        """
+        Release a cancelled appointment's slots in the caller's transaction.
+
+        Args:
+            appointment: The appointment being cancelled
+            db: Database session
+        """
+        day_appointments = await self.availability.get_day_appointments(
+            appointment.appointment_time.date(), db
+        )
+        others = [apt for apt in day_appointments if apt.id != appointment.id]
+        await self._adjust(appointment, others, booked=False, db=db)
+
+    async def _adjust(
+        self,
+        appointment: Appointment,
+        others: List[Appointment],
+        booked: bool,
+        db: AsyncSession,
+    ):
+        """
+        Apply a booking or cancellation to the day's row with one upsert.
+
+        An existing row is changed by deltas (free_slots - n, count + 1), so
+        concurrent changes to the same day add up instead of overwriting
+        each other. A missing row is written with the day's full counts.
+        """
+        day = appointment.appointment_time.date()
+        others_blocked = self._blocked_slots(day, others)
+        changed = len(self._blocked_slots(day, [appointment]) - others_blocked)
+        free_delta, count_delta = (-changed, 1) if booked else (changed, -1)
+
+        total = self.total_slots(day)
+        row = {
+            "day": day,
+            "total_slots": total,
+            "free_slots": total - len(others_blocked) - (changed if booked else 0),
+            "appointment_count": len(others) + (1 if booked else 0),
+            "updated_at": datetime.utcnow(),
+        }
+        table = DailyCapacity.__table__
+        changes = {
+            "free_slots": table.c.free_slots + free_delta,
+            "appointment_count": table.c.appointment_count + count_delta,
+            "updated_at": row["updated_at"],
+        }
+
+        dialect = db.get_bind().dialect.name
+        if dialect in UPSERT_INSERTS:
+            await db.execute(
+                UPSERT_INSERTS[dialect](table)
+                .values(**row)
+                .on_conflict_do_update(index_elements=[table.c.day], set_=changes)
+            )
+            return
+        result = await db.execute(update(table).where(table.c.day == day).values(**changes))
+        if result.rowcount == 0:
+            await db.execute(insert(table).values(**row))
+
+    async def get_daily_capacity(
+        self, first_day: date, days: int, db: AsyncSession
+    ) -> List[DailyCapacityResponse]:
+        """
+        Get free slots per day for a range of days.
+
+        Args:
+            first_day: First day of the range
+            days: Number of days
+            db: Database session
+
+        Returns:
+            List[DailyCapacityResponse]: One entry per day, in date order
+        """
+        result = await db.execute(
+            DAILY_CAPACITY_BETWEEN,
+            {"first_day": first_day, "end_day": first_day + timedelta(days=days)},
+        )
+        rows = {row.day: row for row in result.scalars()}
+
+        capacity = []
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            row = rows.get(day)
+            # Days without a row have never been booked
+            total = row.total_slots if row else self.total_slots(day)
+            free = row.free_slots if row else total
+            capacity.append(
+                DailyCapacityResponse(
+                    date=day.isoformat(),
+                    total_slots=total,
+                    free_slots=free,
+                    is_fully_booked=total > 0 and free == 0,
+                )
+            )
+        return capacity
+
+    async def rebuild(self, first_day: date, db: AsyncSession) -> int:
+        """
+        Recompute every day's counts from first_day on from the appointments.
+
+        Used by the migration that introduced the table, and after changing
+        business hours (which changes the slots of every day). Does not
+        commit.
+
+        Args:
+            first_day: First day to rebuild
+            db: Database session
+
+        Returns:
+            int: Number of days with bookings written
+        """
+        await db.execute(delete(DailyCapacity).where(DailyCapacity.day >= first_day))
+
+        appointments = await db.stream_scalars(
+            select(Appointment)
+            .where(
+                Appointment.status != "cancelled",
+                Appointment.appointment_time >= datetime.combine(first_day, time.min),
+            )
+            .order_by(Appointment.appointment_time)
+        )
+        written = 0
+        day, day_appointments = None, []
+        async for appointment in appointments:
+            appointment_day = appointment.appointment_time.date()
+            if appointment_day != day and day_appointments:
+                db.add(self._capacity_row(day, day_appointments))
+                written += 1
+                day_appointments = []
+            day = appointment_day
+            day_appointments.append(appointment)
+        if day_appointments:
+            db.add(self._capacity_row(day, day_appointments))
+            written += 1
+
+        await db.flush()
+        return written
+
+    def _capacity_row(self, day: date, appointments: List[Appointment]) -> DailyCapacity:
+        """Build a day's capacity row from its active appointments."""
+        return DailyCapacity(
+            day=day,
+            total_slots=self.total_slots(day),
+            free_slots=self._free_slots(day, appointments),
+            appointment_count=len(appointments),
+        )
+
+
 class NotificationService:
     """
     Service for managing notifications.
@@ -365,7 +694,6 @@ class NotificationService:
 
         db.add(notification)
         await db.flush()
-        await db.refresh(notification)
         return notification
 
     async def get_all_notifications(self, db: AsyncSession) -> List[Notification]:
@@ -378,9 +706,7 @@ class NotificationService:
         Returns:
             List[Notification]: List of all notifications
         """
-        result = await db.execute(
-            select(Notification).order_by(Notification.created_at.desc())
-        )
+        result = await db.execute(ALL_NOTIFICATIONS)
         return result.scalars().all()
 
     async def get_unread_notifications(self, db: AsyncSession) -> List[Notification]:
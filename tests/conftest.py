@@ -0,0 +1,28 @@
+"""
+Shared test setup.
+
+The app reads its settings from the environment at import time, so they
+are set here, before any test module imports it: a throwaway SQLite
+database, the X-Query-Count header, password hashing in-process and no
+real email provider.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_database_dir = tempfile.mkdtemp(prefix="ecoharvest-tests-")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite+aiosqlite:///{_database_dir}/appointments.db",
+    QUERY_COUNT_HEADER="true",
+    PASSWORD_HASH_WORKERS="0",
+    JWT_SECRET_KEY="test-signing-key-that-is-long-enough-for-hs256",
+    # No provider: emails queued by the app fail and stay in the outbox
+    RESEND_API_KEY="",
+    RESEND_API_URL="http://127.0.0.1:9/emails",
+    RESEND_RATE_LIMIT_PER_SECOND="0",
+)
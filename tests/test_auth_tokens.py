@@ -0,0 +1,120 @@
+"""
+Access token checks on authenticated endpoints.
+
+Covers `/api/me/appointments` rejecting missing, malformed, foreign and
+expired bearer tokens (including expiry of a token whose claims are
+already cached), and a password reset revoking every access token issued
+before it, on this worker and on one that reads the version from the
+database.
+"""
+
+import time
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+
+import main
+from password_reset import reset_token
+from main import access_tokens
+
+PASSWORD = "correct-horse-battery"
+
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _register(client: TestClient, email: str) -> str:
+    response = client.post(
+        "/api/auth/register", json={"name": "Jo Doe", "email": email, "password": PASSWORD}
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def _login(client: TestClient, email: str, password: str = PASSWORD) -> str:
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_missing_or_invalid_tokens_are_rejected(client):
+    token = _register(client, "invalid@tokens.example.com")
+    assert client.get("/api/me/appointments", headers=_bearer(token)).status_code == 200
+
+    missing = client.get("/api/me/appointments")
+    assert missing.status_code == 401
+    assert missing.json()["detail"] == "Not authenticated"
+    assert missing.headers["WWW-Authenticate"] == "Bearer"
+
+    claims = jwt.get_unverified_claims(token)
+    for bad in [
+        "not-a-token",
+        token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB"),
+        jwt.encode(claims, "some-other-key-that-is-long-enough-for-hs256", algorithm="HS256"),
+    ]:
+        response = client.get("/api/me/appointments", headers=_bearer(bad))
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Invalid or expired token"
+
+
+def test_expired_tokens_are_rejected(client, monkeypatch):
+    _register(client, "expired@tokens.example.com")
+
+    # Issued already expired: rejected by signature verification
+    monkeypatch.setattr(access_tokens, "expire_seconds", -10)
+    expired = _login(client, "expired@tokens.example.com")
+    monkeypatch.undo()
+    assert client.get("/api/me/appointments", headers=_bearer(expired)).status_code == 401
+
+    # Verified and cached while valid, then rejected once expired
+    monkeypatch.setattr(access_tokens, "expire_seconds", 1)
+    token = _login(client, "expired@tokens.example.com")
+    assert client.get("/api/me/appointments", headers=_bearer(token)).status_code == 200
+    hits = access_tokens.stats()["cache_hits"]
+    # Signature verification counts whole seconds, so wait until it agrees
+    time.sleep(jwt.get_unverified_claims(token)["exp"] + 1.1 - time.time())
+    assert client.get("/api/me/appointments", headers=_bearer(token)).status_code == 401
+    assert access_tokens.stats()["cache_hits"] == hits
+
+def test_password_reset_revokes_earlier_tokens(client, monkeypatch):
+    email = "reset@tokens.example.com"
+    references = []
+    issue_reset_token = main.issue_reset_token
+
+    async def record_reference(db, email):
+        references.append(await issue_reset_token(db, email))
+        return references[-1]
+
+    monkeypatch.setattr(main, "issue_reset_token", record_reference)
+
+    registered = _register(client, email)
+    logged_in = _login(client, email)
+    # Claims of this one are cached before the reset
+    assert client.get("/api/me/appointments", headers=_bearer(logged_in)).status_code == 200
+
+    assert client.post("/api/auth/forgot-password", json={"email": email}).status_code == 200
+    reset = client.post(
+        "/api/auth/reset-password",
+        json={"token": reset_token(references[-1]), "new_password": "new-password-123"},
+    )
+    assert reset.status_code == 200
+
+    for old in (registered, logged_in):
+        response = client.get("/api/me/appointments", headers=_bearer(old))
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Invalid or expired token"
+
+    token = _login(client, email, "new-password-123")
+    assert client.get("/api/me/appointments", headers=_bearer(token)).status_code == 200
+
+    # Another worker has no cached version and reads it from the database
+    access_tokens._versions.clear()
+    assert client.get("/api/me/appointments", headers=_bearer(logged_in)).status_code == 401
+    assert client.get("/api/me/appointments", headers=_bearer(token)).status_code == 200
@@ -0,0 +1,98 @@
+"""
+Daily capacity counters through booking and cancellation.
+
+Checks /api/daily-capacity after each step, so the counters kept by the
+write paths stay equal to the day's real free slots.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def _next(weekday: int, days_ahead: int) -> date:
+    """The first day with the given weekday at least `days_ahead` days from today."""
+    day = date.today() + timedelta(days=days_ahead)
+    return day + timedelta(days=(weekday - day.weekday()) % 7)
+
+
+def _book(client: TestClient, day: date, time: str):
+    return client.post(
+        "/api/appointments",
+        json={
+            "client_name": "Jo Doe",
+            "client_email": "capacity@example.com",
+            "appointment_time": f"{day.isoformat()}T{time}:00",
+        },
+    )
+
+
+def _capacity(client: TestClient, day: date) -> dict:
+    response = client.get("/api/daily-capacity", params={"days": 31})
+    assert response.status_code == 200
+    return next(entry for entry in response.json() if entry["date"] == day.isoformat())
+
+
+def test_booking_and_cancelling_update_the_counters(client):
+    # A Wednesday clear of the days the other test modules book
+    day = _next(2, 14)
+    assert _capacity(client, day) == {
+        "date": day.isoformat(),
+        "total_slots": 7,
+        "free_slots": 7,
+        "is_fully_booked": False,
+    }
+
+    # Appointments last two hours, so each blocks two of the hourly slots
+    first = _book(client, day, "08:00")
+    assert first.status_code == 201
+    assert _capacity(client, day)["free_slots"] == 5
+
+    second = _book(client, day, "10:20")
+    assert second.status_code == 201
+    assert _capacity(client, day)["free_slots"] == 3
+
+    # The afternoon's three slots: 14:00 blocks two, 16:20 the last one
+    assert _book(client, day, "14:00").status_code == 201
+    third = _book(client, day, "16:20")
+    assert third.status_code == 201
+    assert _capacity(client, day) == {
+        "date": day.isoformat(),
+        "total_slots": 7,
+        "free_slots": 0,
+        "is_fully_booked": True,
+    }
+
+    assert client.delete(f"/api/appointments/{third.json()['id']}").status_code == 204
+    assert _capacity(client, day)["free_slots"] == 1
+
+    assert client.delete(f"/api/appointments/{first.json()['id']}").status_code == 204
+    assert _capacity(client, day)["free_slots"] == 3
+
+    # Cancelling twice releases nothing more
+    assert client.delete(f"/api/appointments/{first.json()['id']}").status_code == 204
+    capacity = _capacity(client, day)
+    assert capacity["free_slots"] == 3
+    assert not capacity["is_fully_booked"]
+
+
+def test_weekend_slots_cannot_be_booked(client):
+    saturday = _next(5, 1)
+
+    response = _book(client, saturday, "10:00")
+    assert response.status_code == 409
+    assert _capacity(client, saturday) == {
+        "date": saturday.isoformat(),
+        "total_slots": 0,
+        "free_slots": 0,
+        "is_fully_booked": False,
+    }
@@ -0,0 +1,276 @@
+"""
+Email outbox delivery against the mock Resend server.
+
+Covers retries after a provider failure, deferral while the transport
+queue is full, idempotent re-delivery after a crash between sending
+and recording the result, and admin digest windows: aligned in UTC
+whatever the host time zone, and keeping their key when a late row joins.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+
+import email_outbox
+import email_service
+from benchmarks.mock_resend_server import MockResendServer
+from database import AsyncSessionLocal, close_db, init_db
+from email_outbox import (
+    ADMIN_NOTIFICATION_TYPE,
+    STATUS_PENDING,
+    STATUS_SENDING,
+    STATUS_SENT,
+    EmailOutboxDispatcher,
+    enqueue_email,
+)
+from email_service import ResendTransport
+from models import EmailOutbox
+
+
+def _run(monkeypatch, scenario, failure_rate: float = 0, **transport_options):
+    """
+    Run `scenario(dispatcher, provider, transport)` on a fresh event loop,
+    with an empty outbox and the transport pointed at a mock provider.
+    """
+    monkeypatch.setattr(email_service, "RESEND_API_KEY", "test")
+
+    async def main():
+        provider = MockResendServer(failure_rate=failure_rate)
+        await provider.start()
+        transport = ResendTransport(
+            api_url=f"{provider.url}/emails",
+            batch_api_url=f"{provider.url}/emails/batch",
+            rate_limit=0,
+            **transport_options,
+        )
+        monkeypatch.setattr(email_outbox, "resend_transport", transport)
+        try:
+            await init_db()
+            async with AsyncSessionLocal() as session:
+                await session.execute(delete(EmailOutbox))
+                await session.commit()
+            await scenario(EmailOutboxDispatcher(), provider, transport)
+        finally:
+            await transport.aclose()
+            await provider.stop()
+            # The pooled connections belong to this event loop
+            await close_db()
+
+    asyncio.run(main())
+
+
+async def _enqueue(*keys: str):
+    """Queue one confirmation email per idempotency key."""
+    async with AsyncSessionLocal() as session:
+        for key in keys:
+            await enqueue_email(
+                session,
+                "appointment_confirmation",
+                {
+                    "client_email": f"{key}@example.com",
+                    "client_name": "Jo Doe",
+                    "appointment_time": datetime(2030, 1, 7, 9, 0),
+                    "notes": None,
+                },
+                idempotency_key=key,
+            )
+        await session.commit()
+
+
+async def _enqueue_admin(*keys: str):
+    """Queue one admin notification per idempotency key."""
+    async with AsyncSessionLocal() as session:
+        for key in keys:
+            await enqueue_email(
+                session,
+                ADMIN_NOTIFICATION_TYPE,
+                {
+                    "client_name": "Jo Doe",
+                    "client_email": f"{key}@example.com",
+                    "client_phone": "Not provided",
+                    "appointment_time": datetime(2030, 1, 7, 9, 0),
+                    "notes": None,
+                },
+                idempotency_key=key,
+            )
+        await session.commit()
+
+
+async def _rows() -> dict:
+    """Outbox rows by idempotency key."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(EmailOutbox))
+        return {row.idempotency_key: row for row in result.scalars()}
+
+
+async def _set_rows(**values):
+    """Overwrite columns on every outbox row."""
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(EmailOutbox).values(**values))
+        await session.commit()
+
+
+def test_failed_send_is_retried(monkeypatch):
+    async def scenario(dispatcher, provider, transport):
+        await _enqueue("retry")
+
+        assert await dispatcher.dispatch_batch() == 1
+        row = (await _rows())["retry"]
+        assert row.status == STATUS_PENDING
+        assert row.attempts == 1
+        assert row.last_error
+        assert row.next_attempt_at > datetime.utcnow()
+        assert provider.failures == 1
+
+        # Not due again until its backoff has passed
+        assert await dispatcher.dispatch_batch() == 0
+
+        provider.failure_rate = 0
+        await _set_rows(next_attempt_at=datetime.utcnow())
+        assert await dispatcher.dispatch_batch() == 1
+        row = (await _rows())["retry"]
+        assert row.status == STATUS_SENT
+        assert row.attempts == 2
+        assert row.last_error is None
+        assert provider.emails == 1
+        assert dispatcher.failed_attempts == 1
+
+    _run(monkeypatch, scenario, failure_rate=1)
+
+
+def test_busy_transport_defers_without_using_an_attempt(monkeypatch):
+    monkeypatch.setattr(email_outbox, "OUTBOX_USE_BATCH_API", False)
+
+    async def scenario(dispatcher, provider, transport):
+        await _enqueue("first", "second")
+
+        # Room for one request: the second send is refused while the first
+        # is in flight
+        assert await dispatcher.dispatch_batch() == 2
+        rows = await _rows()
+        sent = [row for row in rows.values() if row.status == STATUS_SENT]
+        deferred = [row for row in rows.values() if row.status == STATUS_PENDING]
+        assert len(sent) == 1 and len(deferred) == 1
+        assert deferred[0].attempts == 0
+        assert deferred[0].last_error is None
+        assert deferred[0].next_attempt_at > datetime.utcnow()
+        assert transport.rejected == 1
+        assert dispatcher.deferred == 1
+        assert provider.emails == 1
+
+        await _set_rows(next_attempt_at=datetime.utcnow())
+        assert await dispatcher.dispatch_batch() == 1
+        assert {row.status for row in (await _rows()).values()} == {STATUS_SENT}
+        assert provider.emails == 2
+
+    _run(monkeypatch, scenario, max_pending=1)
+
+
+def test_full_transport_leaves_rows_unclaimed(monkeypatch):
+    async def scenario(dispatcher, provider, transport):
+        await _enqueue("waiting")
+
+        assert await dispatcher.dispatch_batch() == 0
+        row = (await _rows())["waiting"]
+        assert row.status == STATUS_PENDING
+        assert row.attempts == 0
+        assert provider.requests == 0
+
+    _run(monkeypatch, scenario, max_pending=0)
+
+
+def test_resent_email_is_delivered_once(monkeypatch):
+    async def scenario(dispatcher, provider, transport):
+        await _enqueue("once")
+        assert await dispatcher.dispatch_batch() == 1
+
+        # A crash after sending but before recording leaves the row leased;
+        # once the lease expires it is sent again under the same key
+        await _set_rows(
+            status=STATUS_SENDING,
+            next_attempt_at=datetime.utcnow() - timedelta(seconds=1),
+        )
+        assert await dispatcher.dispatch_batch() == 1
+        assert (await _rows())["once"].status == STATUS_SENT
+        assert provider.requests == 2
+        assert provider.emails == 1
+
+    _run(monkeypatch, scenario)
+
+
+def test_resent_batch_keeps_its_key_and_is_delivered_once(monkeypatch):
+    async def scenario(dispatcher, provider, transport):
+        await _enqueue("a", "b", "c")
+        assert await dispatcher.dispatch_batch() == 3
+        batch_keys = {row.batch_key for row in (await _rows()).values()}
+        assert len(batch_keys) == 1 and None not in batch_keys
+        assert provider.requests == 1
+        assert provider.emails == 3
+
+        await _set_rows(
+            status=STATUS_SENDING,
+            next_attempt_at=datetime.utcnow() - timedelta(seconds=1),
+        )
+        assert await dispatcher.dispatch_batch() == 3
+        rows = await _rows()
+        assert {row.batch_key for row in rows.values()} == batch_keys
+        assert {row.status for row in rows.values()} == {STATUS_SENT}
+        assert provider.requests == 2
+        assert provider.emails == 3
+
+    _run(monkeypatch, scenario)
+
+
+def test_late_row_does_not_change_a_digest_key(monkeypatch):
+    monkeypatch.setattr(email_outbox, "ADMIN_DIGEST_WINDOW_SECONDS", 60)
+
+    async def scenario(dispatcher, provider, transport):
+        await _enqueue_admin("first", "second")
+        window_key = (await _rows())["first"].batch_key
+        await _set_rows(next_attempt_at=datetime.utcnow())
+        assert await dispatcher.dispatch_batch() == 2
+        sealed = {row.batch_key for row in (await _rows()).values()}
+        assert len(sealed) == 1 and sealed != {window_key}
+        assert provider.emails == 1
+
+        # The digest was accepted but its result was lost, and a row that
+        # committed late joins the same window before the retry
+        await _set_rows(
+            status=STATUS_SENDING,
+            next_attempt_at=datetime.utcnow() - timedelta(seconds=1),
+        )
+        await _enqueue_admin("late")
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.idempotency_key == "late")
+                .values(batch_key=window_key, next_attempt_at=datetime.utcnow())
+            )
+            await session.commit()
+
+        # The digest is resent under its first key and deduplicated; the
+        # late row goes out on its own
+        assert await dispatcher.dispatch_batch() == 3
+        rows = await _rows()
+        assert {row.status for row in rows.values()} == {STATUS_SENT}
+        assert rows["first"].batch_key == rows["second"].batch_key
+        assert rows["late"].batch_key not in (rows["first"].batch_key, window_key)
+        assert provider.requests == 3
+        assert provider.emails == 2
+
+    _run(monkeypatch, scenario)
+
+
+def test_digest_windows_align_in_utc(monkeypatch):
+    monkeypatch.setattr(email_outbox, "ADMIN_DIGEST_WINDOW_SECONDS", 3600)
+    # Half an hour off UTC: local-time arithmetic would end windows at :30
+    monkeypatch.setenv("TZ", "Asia/Kolkata")
+    time.tzset()
+    try:
+        window_end = email_outbox._digest_window_end(datetime(2030, 1, 7, 9, 20))
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    assert window_end == datetime(2030, 1, 7, 10, 0)
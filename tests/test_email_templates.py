@@ -0,0 +1,74 @@
+"""
+Email template rendering.
+
+The HTML and plain-text bodies of each email are separate f-strings; these
+tests check that every text alternative matches the text derived from its
+HTML body, and that field values are escaped in the HTML only.
+"""
+
+import pytest
+
+import email_templates
+from email_templates import html_to_text
+
+# A value with every character that needs escaping in HTML
+TRICKY = "O'Brien <b>&\"co\""
+
+EMAILS = {
+    "password_reset": lambda value: email_templates.password_reset(
+        f"http://localhost:8000/reset-password?token=abc&name={value}"
+    ),
+    "appointment_cancellation": lambda value: email_templates.appointment_cancellation(
+        value, "January 15, 2030 at 10:00 AM", f"Reason: {value}"
+    ),
+    "appointment_reminder": lambda value: email_templates.appointment_reminder(
+        value, "January 15, 2030 at 10:00 AM", "in 24 hours"
+    ),
+    "admin_appointment_notification": lambda value: email_templates.admin_appointment_notification(
+        value, "jo@example.com", "+1 555 0100", "January 15, 2030 at 10:00 AM", value
+    ),
+    "admin_appointment_notification_without_notes": lambda value: (
+        email_templates.admin_appointment_notification(
+            value, "jo@example.com", "+1 555 0100", "January 15, 2030 at 10:00 AM"
+        )
+    ),
+    "appointment_confirmation": lambda value: email_templates.appointment_confirmation(
+        value, "jo@example.com", "January 15, 2030 at 10:00 AM", value
+    ),
+    "appointment_confirmation_without_notes": lambda value: (
+        email_templates.appointment_confirmation(
+            value, "jo@example.com", "January 15, 2030 at 10:00 AM"
+        )
+    ),
+}
+
+
+@pytest.mark.parametrize("value", ["Jo Doe", TRICKY])
+@pytest.mark.parametrize("name", EMAILS)
+def test_text_matches_the_html(name, value):
+    message = EMAILS[name](value)
+    assert message["text"] == html_to_text(message["html"])
+
+
+@pytest.mark.parametrize("name", EMAILS)
+def test_fields_are_escaped_in_html_only(name):
+    message = EMAILS[name](TRICKY)
+    assert TRICKY not in message["html"]
+    assert "O&#x27;Brien &lt;b&gt;&amp;&quot;co&quot;" in message["html"]
+    assert TRICKY in message["text"]
+
+
+def test_digest_lists_every_row():
+    rows = [
+        ("January 15, 2030 at 10:00 AM", "Jo Doe", "jo@example.com", "Not provided", ""),
+        ("January 16, 2030 at 02:00 PM", TRICKY, "al@example.com", "+1 555 0100", "Gate B"),
+    ]
+    message = email_templates.admin_appointment_digest(rows)
+
+    assert message["subject"] == "🌾 2 New Appointment Bookings"
+    assert message["html"].count("<tr>") == 3
+    assert "O&#x27;Brien &lt;b&gt;&amp;&quot;co&quot;" in message["html"]
+    assert (
+        "- January 15, 2030 at 10:00 AM: Jo Doe <jo@example.com>, phone Not provided \n"
+        f"- January 16, 2030 at 02:00 PM: {TRICKY} <al@example.com>, phone +1 555 0100 Gate B\n"
+    ) in message["text"]
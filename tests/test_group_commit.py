@@ -0,0 +1,157 @@
+"""
+Group commit of concurrent bookings.
+
+Runs real bookings through GroupCommitter: each unit in its own savepoint,
+one commit per group, a conflicting unit failing alone, and shutdown
+committing the gathered group and failing work still queued.
+"""
+
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from database import AsyncSessionLocal, close_db, init_db
+from group_commit import GroupCommitter
+from main import book_appointment
+from models import Appointment
+from schemas import AppointmentCreate
+
+
+def _run(scenario):
+    """Run `scenario()` on a fresh event loop with a migrated database."""
+
+    async def main():
+        try:
+            await init_db()
+            await scenario()
+        finally:
+            # The pooled connections belong to this event loop
+            await close_db()
+
+    asyncio.run(main())
+
+
+def _monday(weeks_ahead: int) -> date:
+    """A Monday `weeks_ahead` weeks out, clear of the other test modules' days."""
+    day = date.today() + timedelta(weeks=weeks_ahead)
+    return day - timedelta(days=day.weekday())
+
+
+def _booking(day: date, hour: int, email: str):
+    """A unit of work booking `email` at `hour` on `day`."""
+    data = AppointmentCreate(
+        client_name="Jo Doe",
+        client_email=email,
+        appointment_time=datetime.combine(day, datetime.min.time())
+        .replace(hour=hour)
+        .isoformat(),
+    )
+    return lambda session: book_appointment(data, session)
+
+
+async def _booked(*emails: str) -> set:
+    """Emails among `emails` with a committed appointment."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Appointment.client_email).where(Appointment.client_email.in_(emails))
+        )
+        return set(result.scalars())
+
+
+def test_conflict_rolls_back_only_its_own_unit():
+    day = _monday(5)
+
+    async def scenario():
+        committer = GroupCommitter(enabled=True, window_ms=200, max_batch=8)
+        committer.start()
+        try:
+            # The second booking takes the first one's slot
+            results = await asyncio.gather(
+                committer.submit(_booking(day, 8, "first@group.example.com")),
+                committer.submit(_booking(day, 8, "taken@group.example.com")),
+                committer.submit(_booking(day, 14, "third@group.example.com")),
+                return_exceptions=True,
+            )
+        finally:
+            await committer.shutdown()
+
+        first, conflict, third = results
+        assert isinstance(first, Appointment) and isinstance(third, Appointment)
+        assert isinstance(conflict, HTTPException)
+        assert conflict.status_code == 409
+
+        assert committer.groups == 1
+        assert committer.committed == 2
+        assert committer.failed == 1
+        emails = ("first@group.example.com", "taken@group.example.com", "third@group.example.com")
+        assert await _booked(*emails) == {emails[0], emails[2]}
+
+    _run(scenario)
+
+
+def test_shutdown_commits_the_gathering_group():
+    day = _monday(6)
+
+    async def scenario():
+        committer = GroupCommitter(enabled=True, window_ms=5000, max_batch=8)
+        committer.start()
+        emails = {8: "morning@gather.example.com", 14: "afternoon@gather.example.com"}
+        pending = [
+            asyncio.create_task(committer.submit(_booking(day, hour, email)))
+            for hour, email in emails.items()
+        ]
+        await asyncio.sleep(0.05)
+
+        # The shutdown marker ends the window early; the group still commits
+        started = time.perf_counter()
+        await committer.shutdown()
+        assert time.perf_counter() - started < 1
+
+        assert all(isinstance(task.result(), Appointment) for task in pending)
+        assert committer.groups == 1
+        assert await _booked(*emails.values()) == set(emails.values())
+
+    _run(scenario)
+
+
+def test_shutdown_fails_work_queued_behind_the_marker():
+    day = _monday(7)
+
+    async def scenario():
+        committer = GroupCommitter(enabled=True, window_ms=0, max_batch=8)
+        committer.start()
+
+        # Hold the first group open while more work queues up behind it
+        release = asyncio.Event()
+        book_first = _booking(day, 8, "first@drain.example.com")
+
+        async def slow_booking(session):
+            appointment = await book_first(session)
+            await release.wait()
+            return appointment
+
+        first = asyncio.create_task(committer.submit(slow_booking))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(
+            committer.submit(_booking(day, 14, "queued@drain.example.com"))
+        )
+        await asyncio.sleep(0.05)
+
+        stopping = asyncio.create_task(committer.shutdown())
+        await asyncio.sleep(0.05)
+        with pytest.raises(RuntimeError):
+            await committer.submit(_booking(day, 16, "late@drain.example.com"))
+        release.set()
+        await stopping
+
+        assert isinstance(await first, Appointment)
+        with pytest.raises(RuntimeError, match="shut down"):
+            await queued
+        emails = ("first@drain.example.com", "queued@drain.example.com", "late@drain.example.com")
+        assert await _booked(*emails) == {emails[0]}
+
+    _run(scenario)
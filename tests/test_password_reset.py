@@ -0,0 +1,126 @@
+"""
+Password reset tokens and their emails.
+
+Covers single-use redemption under concurrency, expiry, and that neither
+the tokens table nor the email outbox holds a usable token.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+
+from database import AsyncSessionLocal, close_db, init_db
+from email_outbox import EMAIL_BUILDERS, STATUS_DEAD, EmailOutboxDispatcher, enqueue_email
+from models import EmailOutbox, PasswordResetToken
+from password_reset import (
+    issue_reset_token,
+    redeem_reset_token,
+    reset_token,
+    verify_reset_token,
+)
+
+
+def _run(scenario):
+    """Run `scenario()` on a fresh event loop with a migrated database."""
+
+    async def main():
+        try:
+            await init_db()
+            await scenario()
+        finally:
+            # The pooled connections belong to this event loop
+            await close_db()
+
+    asyncio.run(main())
+
+
+async def _issue(email: str) -> str:
+    """Issue and commit a token, returning the token from the reset link."""
+    async with AsyncSessionLocal() as session:
+        reference = await issue_reset_token(session, email)
+        await session.commit()
+    return reset_token(reference)
+
+
+async def _redeem(token: str) -> bool:
+    async with AsyncSessionLocal() as session:
+        redeemed = await redeem_reset_token(session, token)
+        await session.commit()
+    return redeemed
+
+
+def test_concurrent_redeems_succeed_once():
+    async def scenario():
+        token = await _issue("race@reset.example.com")
+
+        results = await asyncio.gather(_redeem(token), _redeem(token))
+        assert sorted(results) == [False, True]
+        assert not await _redeem(token)
+
+    _run(scenario)
+
+
+def test_expired_token_is_not_redeemed():
+    async def scenario():
+        token = await _issue("expired@reset.example.com")
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(PasswordResetToken)
+                .where(PasswordResetToken.email == "expired@reset.example.com")
+                .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await session.commit()
+
+            assert await verify_reset_token(session, token) is None
+        assert not await _redeem(token)
+
+    _run(scenario)
+
+
+def test_outbox_holds_only_a_reference_to_the_token():
+    email = "link@reset.example.com"
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(EmailOutbox))
+            reference = await issue_reset_token(session, email)
+            await enqueue_email(
+                session,
+                "password_reset",
+                {"email": email, "reset_reference": reference},
+                idempotency_key="password-reset-link",
+            )
+            await session.commit()
+
+            row = (await session.execute(select(EmailOutbox))).scalar_one()
+            stored = (
+                await session.execute(
+                    select(PasswordResetToken.token_hash).where(
+                        PasswordResetToken.email == email
+                    )
+                )
+            ).scalar_one()
+
+            # Neither table holds the token itself
+            token = reset_token(reference)
+            assert token not in row.payload
+            assert token != stored
+
+            # The link built at send time carries a token that verifies
+            message = EMAIL_BUILDERS[row.email_type](**json.loads(row.payload))
+            assert message["to"] == email
+            assert f"token={token}" in message["html"]
+            assert await verify_reset_token(session, token) == email
+
+        # No provider is configured, so the only attempt fails and the row
+        # is dead-lettered with its reference cleared
+        dispatcher = EmailOutboxDispatcher(max_attempts=1)
+        assert await dispatcher.dispatch_batch() == 1
+        async with AsyncSessionLocal() as session:
+            row = (await session.execute(select(EmailOutbox))).scalar_one()
+            assert row.status == STATUS_DEAD
+            assert row.payload == "{}"
+
+    _run(scenario)
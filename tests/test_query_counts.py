@@ -0,0 +1,101 @@
+"""
+Statements per request, read from the X-Query-Count header.
+
+Pins the statement counts of the hottest endpoints so a change that
+brings back a refresh() round trip or an N+1 loop fails here.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def _weekday(days_ahead: int) -> date:
+    """The first weekday at least `days_ahead` days from today."""
+    day = date.today() + timedelta(days=days_ahead)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+def _book(client: TestClient, day: date, hour: int, email: str = "jo@example.com"):
+    return client.post(
+        "/api/appointments",
+        json={
+            "client_name": "Jo Doe",
+            "client_email": email,
+            "appointment_time": f"{day.isoformat()}T{hour:02d}:00:00",
+        },
+    )
+
+
+def _query_count(response) -> int:
+    return int(response.headers["X-Query-Count"])
+
+
+def test_booking_query_count(client):
+    day = _weekday(2)
+
+    # BEGIN, the day's appointments (conflict check), appointment, capacity
+    # upsert, notification and the two outbox emails
+    first = _book(client, day, 8)
+    assert first.status_code == 201
+    assert _query_count(first) == 7
+
+    # A second booking on the same day updates the existing capacity row
+    # with the same upsert
+    second = _book(client, day, 10)
+    assert second.status_code == 201
+    assert _query_count(second) == 7
+
+    # A taken slot stops after the conflict check
+    conflict = _book(client, day, 8)
+    assert conflict.status_code == 409
+    assert _query_count(conflict) == 2
+
+
+def test_available_slots_query_count(client):
+    day = _weekday(4)
+
+    empty = client.get("/api/available-slots", params={"date": day.isoformat()})
+    assert empty.status_code == 200
+    # One availability check per slot of the day
+    assert _query_count(empty) == 7
+
+    # Bookings on the day don't add statements
+    assert _book(client, day, 8).status_code == 201
+    assert _book(client, day, 14).status_code == 201
+    booked = client.get("/api/available-slots", params={"date": day.isoformat()})
+    assert booked.status_code == 200
+    assert _query_count(booked) == _query_count(empty)
+
+
+def test_my_appointments_query_count(client):
+    email = "me@example.com"
+    for days_ahead, hour in ((5, 9), (6, 11), (6, 15)):
+        assert _book(client, _weekday(days_ahead), hour, email).status_code == 201
+
+    registered = client.post(
+        "/api/auth/register",
+        json={"name": "Me Myself", "email": email, "password": "secret123"},
+    )
+    assert registered.status_code == 200
+    token = registered.json()["access_token"]
+
+    # The user comes from the verified token, so listing is one SELECT
+    # however many appointments there are
+    response = client.get(
+        "/api/me/appointments", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert _query_count(response) == 1
@@ -0,0 +1,86 @@
+"""
+Login throttling on the memory backend.
+
+Runs the limiter against a fixed clock so the sliding-window estimate and
+the `retry_after` it reports are exact, then checks that the login
+endpoint answers a limited attempt with 429 and a matching Retry-After.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import rate_limit
+from rate_limit import LoginThrottle, MemoryBackend, RateLimitExceeded, SlidingWindowLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable clock for the rate limit module, starting on a window boundary."""
+    now = SimpleNamespace(value=600.0)
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def _retry_after(limiter: SlidingWindowLimiter, key: str):
+    """Seconds the limiter asks to wait for `key`, or None if the hit is allowed."""
+    try:
+        asyncio.run(limiter.hit(key))
+    except RateLimitExceeded as e:
+        return e.retry_after
+    return None
+
+
+def test_retry_after_follows_the_sliding_window(clock):
+    limiter = SlidingWindowLimiter("ip", 2, 60, MemoryBackend())
+
+    assert _retry_after(limiter, "10.0.0.1") is None
+    assert _retry_after(limiter, "10.0.0.1") is None
+
+    # Full at the start of the window: wait for the whole window to pass
+    assert _retry_after(limiter, "10.0.0.1") == 60
+    clock.value = 630
+    assert _retry_after(limiter, "10.0.0.1") == 30
+
+    # The next window still carries the previous count at full weight for
+    # its first second, then lets one attempt through
+    clock.value = 660
+    assert _retry_after(limiter, "10.0.0.1") == 1
+    clock.value = 661
+    assert _retry_after(limiter, "10.0.0.1") is None
+
+    # One attempt now plus the previous window's decaying weight: below the
+    # limit once half of the previous window has slid out, 29s from here
+    assert _retry_after(limiter, "10.0.0.1") == 29
+
+    # Other keys are counted separately
+    assert _retry_after(limiter, "10.0.0.2") is None
+    assert limiter.stats()["allowed"] == 4
+    assert limiter.stats()["limited"] == 4
+
+
+def test_login_answers_429_with_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "LOGIN_EMAIL_LIMIT", 2)
+    monkeypatch.setattr(rate_limit, "LOGIN_EMAIL_WINDOW_SECONDS", 300.0)
+    monkeypatch.setattr(main, "login_throttle", LoginThrottle(MemoryBackend()))
+
+    credentials = {"email": "locked@throttle.example.com", "password": "wrong-password"}
+    with TestClient(main.app) as client:
+        for _ in range(2):
+            assert client.post("/api/auth/login", json=credentials).status_code == 401
+
+        limited = client.post("/api/auth/login", json=credentials)
+        assert limited.status_code == 429
+        assert limited.headers["Retry-After"] == "300"
+
+        # Halfway through the window the wait is halved
+        clock.value += 150
+        limited = client.post("/api/auth/login", json=credentials)
+        assert limited.status_code == 429
+        assert limited.headers["Retry-After"] == "150"
+
+        stats = client.get("/api/health").json()["login_rate_limit"]
+        assert stats["email"]["limited"] == 2
@@ -0,0 +1,195 @@
+"""
+Reminder scheduling.
+
+Covers the packed heap entries, firing order as appointments are
+scheduled, rescheduled and unscheduled, lazy removal with compaction,
+overdue reminders collapsing into one after a restart, and the outbox
+check that keeps a restarted scheduler from sending a reminder twice.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from database import AsyncSessionLocal, close_db, init_db
+from models import Appointment, EmailOutbox, Notification
+from reminders import ReminderScheduler, _pack, _unpack, reminder_key
+
+HOUR = 3600
+
+
+def _run(scenario):
+    """Run `scenario()` on a fresh event loop with a migrated database."""
+
+    async def main():
+        try:
+            await init_db()
+            await scenario()
+        finally:
+            # The pooled connections belong to this event loop
+            await close_db()
+
+    asyncio.run(main())
+
+
+def _scheduler(now: int) -> ReminderScheduler:
+    """A scheduler with 24h and 1h reminders whose first window is loaded."""
+    scheduler = ReminderScheduler(offsets_hours=[24, 1], horizon_hours=48)
+    scheduler._loaded_until = now + scheduler.horizon
+    return scheduler
+
+
+def _schedule(scheduler: ReminderScheduler, appointment_id: int, appointment_at: int):
+    asyncio.run(scheduler.schedule(appointment_id, datetime.fromtimestamp(appointment_at)))
+
+
+def test_packed_entries_round_trip_in_firing_order():
+    entries = [
+        (1_900_000_000, 7, 1),
+        (1_900_000_000, 7, 0),
+        (1_900_000_000, 2**36 - 1, 0),
+        (1_899_999_999, 123456, 15),
+    ]
+    for entry in entries:
+        assert _unpack(_pack(*entry)) == entry
+
+    # Ordered by fire time, then appointment id, then offset index
+    packed = [_pack(*entry) for entry in sorted(entries)]
+    assert sorted(_pack(*entry) for entry in entries) == packed
+
+
+def test_schedule_and_reschedule_fire_in_time_order():
+    now = int(time.time())
+    scheduler = _scheduler(now)
+
+    _schedule(scheduler, 1, now + 30 * HOUR)  # fires at +6h and +29h
+    _schedule(scheduler, 2, now + 3 * HOUR)  # 24h reminder already past; fires at +2h
+    _schedule(scheduler, 3, now + 10 * HOUR)  # fires at +9h
+
+    # Moving appointment 3 leaves its old entry in the heap, skipped when popped
+    _schedule(scheduler, 3, now + 27 * HOUR)  # fires at +3h and +26h
+    assert len(scheduler._heap) == 6
+
+    assert scheduler.pop_due(now + HOUR) == []
+    assert scheduler.pop_due(now + 10 * HOUR) == [(2, HOUR), (3, 24 * HOUR), (1, 24 * HOUR)]
+    assert scheduler.pop_due(now + 30 * HOUR) == [(3, HOUR), (1, HOUR)]
+    assert scheduler._heap == []
+    # Appointments are forgotten after their last reminder
+    assert scheduler._appointments == {}
+
+
+def test_schedule_is_a_no_op_before_the_first_load_and_for_past_appointments():
+    now = int(time.time())
+    scheduler = ReminderScheduler(offsets_hours=[24, 1], horizon_hours=48)
+    _schedule(scheduler, 1, now + 30 * HOUR)
+    assert scheduler._heap == []
+
+    scheduler._loaded_until = now + scheduler.horizon
+    _schedule(scheduler, 2, now - HOUR)
+    # Beyond the loaded window: left to the next load, but still tracked
+    _schedule(scheduler, 3, now + 80 * HOUR)
+    assert scheduler._heap == []
+    assert scheduler._appointments == {3: now + 80 * HOUR}
+
+
+def test_unschedule_is_lazy_until_compaction():
+    now = int(time.time())
+    scheduler = _scheduler(now)
+    for appointment_id in range(1, 5):
+        _schedule(scheduler, appointment_id, now + (30 + appointment_id) * HOUR)
+    assert len(scheduler._heap) == 8
+
+    # Entries stay in the heap until half of it is stale
+    asyncio.run(scheduler.unschedule(1))
+    asyncio.run(scheduler.unschedule(2))
+    assert len(scheduler._heap) == 8
+    assert scheduler._stale == 4
+
+    # Unscheduling twice does not count twice
+    asyncio.run(scheduler.unschedule(2))
+    assert scheduler._stale == 4
+
+    # Stale entries are skipped when popped
+    assert scheduler.pop_due(now + 9 * HOUR) == [(3, 24 * HOUR)]
+    assert scheduler._stale == 2
+
+    asyncio.run(scheduler.unschedule(3))
+    assert scheduler._stale == 0
+    assert sorted(_unpack(entry)[1] for entry in scheduler._heap) == [4, 4]
+    assert scheduler.pop_due(now + 40 * HOUR) == [(4, 24 * HOUR), (4, HOUR)]
+
+
+def test_overdue_reminders_collapse_on_the_initial_load():
+    now = int(time.time())
+    scheduler = ReminderScheduler(offsets_hours=[48, 24, 1], horizon_hours=12)
+
+    # Both the 48h and 24h reminders came due while the server was down;
+    # only the latest of them is sent, followed by the 1h reminder
+    scheduler._add(1, now + 5 * HOUR, None, now + scheduler.horizon, now)
+    assert [_unpack(entry) for entry in sorted(scheduler._heap)] == [
+        (now - 19 * HOUR, 1, 1),
+        (now + 4 * HOUR, 1, 2),
+    ]
+
+    # A later window load does not collapse anything
+    scheduler._add(2, now + 30 * HOUR, now + 6 * HOUR, now + 24 * HOUR, now)
+    assert scheduler.pop_due(now + 24 * HOUR) == [(1, 24 * HOUR), (1, HOUR), (2, 24 * HOUR)]
+
+
+def test_restart_does_not_send_a_reminder_twice():
+    async def scenario():
+        # Due for its 1h reminder (and past its 24h one) when the server starts
+        appointment_time = datetime.now().replace(microsecond=0) + timedelta(minutes=30)
+        async with AsyncSessionLocal() as session:
+            appointment = Appointment(
+                client_name="Jo Doe",
+                client_email="restart@reminders.example.com",
+                appointment_time=appointment_time,
+                status="confirmed",
+            )
+            session.add(appointment)
+            await session.commit()
+            appointment_id = appointment.id
+
+        sent = []
+
+        async def on_sent(notifications):
+            sent.extend(notifications)
+
+        for _ in range(2):
+            scheduler = ReminderScheduler(
+                offsets_hours=[24, 1], horizon_hours=12, on_sent=on_sent
+            )
+            now = int(time.time())
+            await scheduler._load_window(now)
+            due = [item for item in scheduler.pop_due(now) if item[0] == appointment_id]
+            assert due == [(appointment_id, HOUR)]
+            await scheduler._fire(due)
+
+        # The second scheduler found the reminder in the outbox and skipped it
+        assert scheduler.sent == 0
+        assert scheduler.skipped == 1
+        assert [notification["appointment_id"] for notification in sent] == [appointment_id]
+
+        async with AsyncSessionLocal() as session:
+            keys = (
+                await session.execute(
+                    select(EmailOutbox.idempotency_key).where(
+                        EmailOutbox.idempotency_key.like(f"appointment-{appointment_id}-reminder-%")
+                    )
+                )
+            ).scalars().all()
+            assert keys == [reminder_key(appointment_id, HOUR)]
+            reminders = (
+                await session.execute(
+                    select(func.count(Notification.id)).where(
+                        Notification.appointment_id == appointment_id,
+                        Notification.notification_type == "reminder",
+                    )
+                )
+            ).scalar_one()
+            assert reminders == 1
+
+    _run(scenario)
@@ -0,0 +1,74 @@
+"""
+Real-time notifications over `/ws/notifications`.
+
+Checks the keepalive exchange the frontend takes part in (the server pings
+a quiet client, the client's pong keeps it connected, and a client that
+stops answering is closed), and that a booking's new-appointment and
+slot update messages reach a connected client once the booking has
+committed.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+from websocket_manager import ConnectionManager
+
+
+def _tuesday(weeks_ahead: int) -> date:
+    """A Tuesday `weeks_ahead` weeks out, clear of the other test modules' days."""
+    day = date.today() + timedelta(weeks=weeks_ahead)
+    return day + timedelta(days=(1 - day.weekday()) % 7)
+
+
+def test_pongs_keep_a_client_connected(monkeypatch):
+    manager = ConnectionManager(ping_interval=0.1, idle_timeout=0.5)
+    monkeypatch.setattr(main, "connection_manager", manager)
+
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws/notifications") as websocket:
+            # Answered pings keep the socket open well past the idle timeout
+            for _ in range(8):
+                assert websocket.receive_json() == {"type": "ping"}
+                websocket.send_json({"type": "pong"})
+
+            # A client that stops answering is closed as idle
+            with pytest.raises(WebSocketDisconnect) as closed:
+                while True:
+                    assert websocket.receive_json() == {"type": "ping"}
+            assert closed.value.code == 1001
+
+        stats = manager.stats()
+        assert stats["messages_received"] == 8
+        assert stats["idle_timeouts"] == 1
+        assert manager.active_connections == 0
+
+
+def test_booking_reaches_a_connected_client_after_commit():
+    day = _tuesday(9)
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws/notifications") as websocket:
+            booked = client.post(
+                "/api/appointments",
+                json={
+                    "client_name": "Jo Doe",
+                    "client_email": "live@websocket.example.com",
+                    "appointment_time": f"{day.isoformat()}T08:00:00",
+                },
+            )
+            assert booked.status_code == 201
+
+            notification = websocket.receive_json()
+            assert notification["type"] == "new_appointment"
+            assert notification["appointment_id"] == booked.json()["id"]
+
+            # Read after commit on a separate session, so the booked slots
+            # already show as taken
+            update = websocket.receive_json()
+            assert update["type"] == "slots_update"
+            assert update["date"] == day.isoformat()
+            slots = {slot["time"]: slot["is_available"] for slot in update["slots"]}
+            assert slots[f"{day.isoformat()}T08:00:00"] is False
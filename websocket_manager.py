@@ -0,0 +1,274 @@
+"""
+WebSocket Connection Management
+
+This module handles:
+- O(1) registration and removal of live WebSocket connections
+- Server-driven ping/pong keepalive with idle timeouts
+- Broadcasting messages to every connected client
+- Graceful drain of connections on shutdown
+- Connection-level metrics (active sockets, message rates, drops)
+
+A single background task sweeps the registry for keepalive, so idle sockets
+cost one dict entry each rather than a timer or task per connection.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+# Keepalive configuration
+WS_PING_INTERVAL_SECONDS = float(os.getenv("WS_PING_INTERVAL_SECONDS", "25"))
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "70"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+
+PING_MESSAGE = json.dumps({"type": "ping"})
+
+
+class _Connection:
+    """Registry entry for one WebSocket connection."""
+
+    __slots__ = ("last_seen", "last_ping")
+
+    def __init__(self, now: float):
+        self.last_seen = now
+        self.last_ping = 0.0
+
+
+class ConnectionManager:
+    """
+    Registry and keepalive manager for WebSocket connections.
+
+    Handles:
+    - Accepting and tracking connections
+    - Pinging quiet clients and dropping ones that stop answering
+    - Broadcasting JSON messages
+    - Draining connections on shutdown
+    """
+
+    def __init__(
+        self,
+        ping_interval: float = WS_PING_INTERVAL_SECONDS,
+        idle_timeout: float = WS_IDLE_TIMEOUT_SECONDS,
+        send_timeout: float = WS_SEND_TIMEOUT_SECONDS,
+    ):
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self.send_timeout = send_timeout
+
+        self._connections: Dict[WebSocket, _Connection] = {}
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Counters
+        self.total_connections = 0
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.dropped_connections = 0
+        self.idle_timeouts = 0
+        self.pings_sent = 0
+
+        # Rate window, advanced by each keepalive sweep
+        self._rate_window_start = time.monotonic()
+        self._rate_window_sent = 0
+        self._rate_window_received = 0
+        self.send_rate = 0.0
+        self.receive_rate = 0.0
+
+    @property
+    def active_connections(self) -> int:
+        """Number of currently registered connections."""
+        return len(self._connections)
+
+    async def connect(self, websocket: WebSocket):
+        """
+        Accept a WebSocket and add it to the registry.
+
+        Args:
+            websocket: Incoming WebSocket connection
+        """
+        await websocket.accept()
+        self._connections[websocket] = _Connection(time.monotonic())
+        self.total_connections += 1
+
+    def disconnect(self, websocket: WebSocket):
+        """
+        Remove a WebSocket from the registry. Safe to call more than once.
+
+        Args:
+            websocket: Connection to remove
+        """
+        self._connections.pop(websocket, None)
+
+    async def listen(self, websocket: WebSocket):
+        """
+        Receive loop for a registered connection.
+
+        Any inbound frame (including pong replies) counts as activity.
+        Returns when the client disconnects or the socket is closed by the
+        keepalive sweep or shutdown.
+
+        Args:
+            websocket: Registered connection to read from
+        """
+        try:
+            while True:
+                await websocket.receive_text()
+                connection = self._connections.get(websocket)
+                if connection is None:
+                    break
+                connection.last_seen = time.monotonic()
+                self.messages_received += 1
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            if websocket in self._connections:
+                self.dropped_connections += 1
+                print(f"[ERROR] WebSocket receive failed: {str(e)}")
+        finally:
+            self.disconnect(websocket)
+
+    async def broadcast(self, message: dict):
+        """
+        Send a message to every connected client.
+
+        The message is serialized once and written to all sockets
+        concurrently; sockets that fail or time out are dropped.
+
+        Args:
+            message: Dictionary containing the message data
+        """
+        if not self._connections:
+            return
+        await self._send_to_all(json.dumps(message), list(self._connections))
+
+    async def _send_to_all(self, text: str, websockets):
+        """Send pre-serialized text to the given sockets, dropping failures."""
+        results = await asyncio.gather(
+            *(self._send(websocket, text) for websocket in websockets)
+        )
+        self.messages_sent += sum(results)
+
+    async def _send(self, websocket: WebSocket, text: str) -> bool:
+        """Send to one socket with a timeout; drop it on failure."""
+        try:
+            await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+            return True
+        except Exception:
+            if websocket in self._connections:
+                self.dropped_connections += 1
+                self.disconnect(websocket)
+                await self._close(websocket, code=1011)
+            return False
+
+    async def _close(self, websocket: WebSocket, code: int):
+        """Close a socket, ignoring errors from already-dead connections."""
+        try:
+            await asyncio.wait_for(websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+
+    def start(self):
+        """Start the keepalive sweep. Called on application startup."""
+        self._closing = False
+        if self._keepalive_task is None:
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+
+    async def _keepalive_loop(self):
+        """Periodically ping quiet connections and drop idle ones."""
+        # Sweep often enough that pings and timeouts are never late by more
+        # than a fraction of their interval
+        sweep_interval = max(min(self.ping_interval, self.idle_timeout) / 4, 0.05)
+        while not self._closing:
+            await asyncio.sleep(sweep_interval)
+            try:
+                await self._sweep()
+            except Exception as e:
+                print(f"[ERROR] WebSocket keepalive sweep failed: {str(e)}")
+
+    async def _sweep(self):
+        """Run one keepalive pass over the registry."""
+        now = time.monotonic()
+        self._update_rates(now)
+
+        expired = []
+        to_ping = []
+        for websocket, connection in self._connections.items():
+            idle_for = now - connection.last_seen
+            if idle_for >= self.idle_timeout:
+                expired.append(websocket)
+            elif (
+                idle_for >= self.ping_interval
+                and now - connection.last_ping >= self.ping_interval
+            ):
+                connection.last_ping = now
+                to_ping.append(websocket)
+
+        for websocket in expired:
+            self.disconnect(websocket)
+        self.idle_timeouts += len(expired)
+        self.dropped_connections += len(expired)
+        if expired:
+            await asyncio.gather(
+                *(self._close(websocket, code=1001) for websocket in expired)
+            )
+
+        if to_ping:
+            await self._send_to_all(PING_MESSAGE, to_ping)
+            self.pings_sent += len(to_ping)
+
+    def _update_rates(self, now: float):
+        """Recompute per-second message rates since the previous sweep."""
+        elapsed = now - self._rate_window_start
+        if elapsed <= 0:
+            return
+        self.send_rate = (self.messages_sent - self._rate_window_sent) / elapsed
+        self.receive_rate = (
+            self.messages_received - self._rate_window_received
+        ) / elapsed
+        self._rate_window_start = now
+        self._rate_window_sent = self.messages_sent
+        self._rate_window_received = self.messages_received
+
+    async def shutdown(self):
+        """
+        Stop the keepalive sweep and close every connection.
+        Called on application shutdown.
+        """
+        self._closing = True
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+
+        websockets = list(self._connections)
+        self._connections.clear()
+        if websockets:
+            await asyncio.gather(
+                *(self._close(websocket, code=1001) for websocket in websockets)
+            )
+
+    def stats(self) -> dict:
+        """
+        Get connection-level metrics.
+
+        Returns:
+            dict: Gauges and counters for the connection registry
+        """
+        return {
+            "active_connections": self.active_connections,
+            "total_connections": self.total_connections,
+            "messages_sent": self.messages_sent,
+            "messages_received": self.messages_received,
+            "send_rate_per_second": round(self.send_rate, 2),
+            "receive_rate_per_second": round(self.receive_rate, 2),
+            "pings_sent": self.pings_sent,
+            "idle_timeouts": self.idle_timeouts,
+            "dropped_connections": self.dropped_connections,
+        }